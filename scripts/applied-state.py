@@ -0,0 +1,91 @@
+"""Report which catalog tweaks are in effect on a machine from its .reg exports.
+
+Pass one or more exports, such as
+
+    reg export HKLM hklm.reg
+    reg export HKCU hkcu.reg
+    python scripts/applied-state.py hklm.reg hkcu.reg
+
+Every tweak's registry entries are checked against the values the
+exports hold (see reg_snapshot): a tweak is applied, partially applied,
+at its default, custom, or unknown when no export covers its hives.
+Only the keys a tweak references are decoded, so full hive exports are
+read in one streaming pass without loading them as text.
+
+--format json prints one machine-readable report for fleet tooling.
+"""
+import argparse, json, sys, time
+
+from catalog_loader import load_catalog
+from reg_snapshot import STATES, checks, read_snapshot, tweak_states, wanted_keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('snapshots', nargs='+', metavar='FILE.reg', help='regedit or reg export output')
+    parser.add_argument('--profile', help='only tweaks in this profile')
+    parser.add_argument('--status', help='comma-separated statuses to list (default: all of %s)' % ', '.join(STATES))
+    parser.add_argument('--user', metavar='KEY',
+                        help='read this key, like HKEY_USERS\\<SID>, as HKEY_CURRENT_USER')
+    parser.add_argument('--format', choices=('text', 'json'), default='text', help='report format')
+    args = parser.parse_args()
+
+    statuses = args.status.split(',') if args.status else STATES
+    unknown = set(statuses) - set(STATES)
+    if unknown:
+        parser.error('unknown statuses: %s' % ', '.join(sorted(unknown)))
+
+    tweaks = load_catalog(sections=('tweaks',)).tweaks
+    if args.profile:
+        tweaks = [tweak for tweak in tweaks if args.profile in tweak.profiles]
+    tweak_checks, skipped = checks(tweaks)
+    wanted = wanted_keys(tweak_checks)
+
+    start = time.perf_counter()
+    values, hives = {}, set()
+    total = [0, 0, 0]
+    for path in args.snapshots:
+        _, _, stats = read_snapshot(path, wanted, values, hives, args.user)
+        total = [a + b for a, b in zip(total, stats)]
+    elapsed = time.perf_counter() - start
+    results = tweak_states(tweak_checks, values, hives)
+    counts = {status: 0 for status in STATES}
+    for _, status, _ in results:
+        counts[status] += 1
+
+    if args.format == 'json':
+        json.dump({
+            'snapshots': args.snapshots,
+            'hives': sorted(hives),
+            'counts': counts,
+            'script-only': len(tweaks) - len(tweak_checks),
+            'tweaks': [{
+                'id': tweak.id,
+                'status': status,
+                'entries': [{'value': label, 'state': state, 'found': found} for label, state, found in states],
+            } for tweak, status, states in results if status in statuses],
+            'skipped': [{'id': tweak_id, 'value': label, 'reason': reason} for tweak_id, label, reason in skipped],
+        }, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+        return
+
+    for tweak, status, states in results:
+        if status not in statuses:
+            continue
+        applied = sum(1 for _, state, _ in states if state == 'applied')
+        print('  %-8s %-48s %d/%d' % (status, tweak.id, applied, len(states)))
+        if status in ('partial', 'custom'):
+            for label, state, found in states:
+                if state != 'applied':
+                    print('             %-8s %s = %s' % (state, label, found if found is not None else '(absent)'))
+    for tweak_id, label, reason in skipped:
+        print('  WARN   %s: %s not checked: %s' % (tweak_id, label, reason))
+    print('Read %d snapshots (%.1f MB, %d keys, %d referenced) in %.2f s' % (
+        len(args.snapshots), total[0] / 1e6, total[1], total[2], elapsed))
+    print('%d tweaks: %s; %d script-only not checked' % (
+        len(results), ', '.join('%d %s' % (counts[status], status) for status in STATES),
+        len(tweaks) - len(tweak_checks)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Check and benchmark reg_snapshot on a large synthetic .reg export.
+
+Picks a state for every catalog tweak (applied, default, custom or,
+with several entries, partial), writes the matching values with
+randomized key case, hex wrapping and escaped names into a regedit-style
+UTF-16 export padded with made-up keys to the given size, then reads it
+back and checks that exactly the written values were found. Reports the
+throughput and the peak Python heap, which stays small because only the
+referenced keys are decoded.
+
+Usage: python scripts/bench-applied-state.py [megabytes] [seed]
+"""
+import os, random, sys, tempfile, time, tracemalloc
+
+from catalog_loader import load_catalog
+from reg_bundle import reg_key
+from reg_snapshot import STATES, checks, read_snapshot, tweak_states, wanted_keys
+from synthetic import reg_export
+
+megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 100
+seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+rng = random.Random(seed)
+
+tweak_checks, _ = checks(load_catalog(sections=('tweaks',)).tweaks)
+writes = {}
+spelled = {}
+written = {}
+for tweak, entries in tweak_checks:
+    state = rng.choice(('applied', 'default', 'custom') + (('partial',) if len(entries) > 1 else ()))
+    for n, (label, key, name, data, default) in enumerate(entries):
+        if (key, name) in written:
+            # Another tweak already set this value
+            continue
+        entry_state = ('applied' if n == 0 else 'default') if state == 'partial' else state
+        value = {'applied': data, 'default': default,
+                 'custom': '"custom %d"' % n if data.startswith('"') else 'dword:0000beef'}[entry_state]
+        if value is None:
+            continue
+        original = next(e for e in tweak.registry if reg_key(e['key']).lower() == key)
+        export_key = spelled.setdefault(key, rng.choice((str.upper, str.lower, str))(reg_key(original['key'])))
+        export_name = next((str(e['name']) for e in tweak.registry
+                            if str(e.get('name') or '').lower() == name and name), '')
+        writes.setdefault(export_key, []).append((export_name, value))
+        written[key, name] = value
+
+# About 570 bytes of UTF-16 per made-up key
+noise = int(megabytes * 1e6 / 570)
+path = os.path.join(tempfile.mkdtemp(prefix='perch-reg-'), 'snapshot.reg')
+try:
+    start = time.perf_counter()
+    reg_export(path, writes, noise, seed)
+    print('Wrote %.1f MB export with %d referenced values in %.1f s' % (
+        os.path.getsize(path) / 1e6, len(written), time.perf_counter() - start))
+
+    wanted = wanted_keys(tweak_checks)
+    start = time.perf_counter()
+    values, hives, (size, keys, read) = read_snapshot(path, wanted)
+    elapsed = time.perf_counter() - start
+    if values != written:
+        missing = set(written.items()) - set(values.items())
+        extra = set(values.items()) - set(written.items())
+        print('MISMATCH: %d values not found, %d unexpected, e.g. %s' % (
+            len(missing), len(extra), sorted(missing or extra)[:3]))
+        sys.exit(1)
+
+    tracemalloc.start()
+    read_snapshot(path, wanted)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+finally:
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+counts = {status: 0 for status in STATES}
+for _, status, _ in tweak_states(tweak_checks, values, hives):
+    counts[status] += 1
+print('Read %d keys (%d referenced) in %.2f s: %.0f MB/s, peak heap %.0f KB' % (
+    keys, read, elapsed, size / 1e6 / elapsed, peak / 1e3))
+print('Tweaks: %s' % ', '.join('%d %s' % (counts[status], status) for status in STATES))
@@ -0,0 +1,94 @@
+"""Compare the catalog bundle with the YAML files a client fetches today.
+
+Sizes are raw and gzip-compressed (as served by GitHub Pages). Lookups
+fetch single entries by section and id: the YAML path parses index.yaml to find the
+file and then parses the entry; the bundle path memory-maps the bundle
+and decodes one entry. Also times decoding the whole catalog both ways.
+
+Usage: python scripts/bench-bundle.py [lookups] [repeat]
+"""
+import gzip, os, random, sys, tempfile, time
+
+import yaml
+
+from catalog_bundle import Bundle, build_bundle, catalog_dir, read_entries
+
+_Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def read(relpath):
+    with open(os.path.join(catalog_dir, relpath), 'rb') as f:
+        return f.read()
+
+
+def yaml_lookup(keys):
+    index = yaml.load(read('index.yaml'), Loader=_Loader)
+    paths = {}
+    for section, entries in index.items():
+        for entry in entries:
+            paths[section, entry['id']] = entry.get('path', '%s/%s.yaml' % (section, entry['id']))
+    return [yaml.load(read(paths[key]), Loader=_Loader) for key in keys]
+
+
+def bundle_lookup(path, keys):
+    with Bundle(path) as bundle:
+        return [bundle.get(*key) for key in keys]
+
+
+def yaml_all(relpaths):
+    return [yaml.load(read(relpath), Loader=_Loader) for relpath in relpaths]
+
+
+def bundle_all(path):
+    with Bundle(path) as bundle:
+        return [bundle.get(*key) for key in bundle.keys()]
+
+
+def best_of(fn, *args, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+lookups = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+entries = read_entries()
+data = build_bundle(entries)
+fd, bundle_path = tempfile.mkstemp(suffix='.bundle')
+with os.fdopen(fd, 'wb') as f:
+    f.write(data)
+
+try:
+    relpaths = ['index.yaml'] + [relpath for _, _, relpath, _ in entries]
+    yaml_raw = sum(len(read(relpath)) for relpath in relpaths)
+    yaml_gz = sum(len(gzip.compress(read(relpath))) for relpath in relpaths)
+    print('Size (%d entries):' % len(entries))
+    print('  YAML files:  %8d bytes, %8d gzipped (%d requests)' % (yaml_raw, yaml_gz, len(relpaths)))
+    print('  bundle:      %8d bytes, %8d gzipped (1 request)' % (len(data), len(gzip.compress(data))))
+
+    keys = random.Random(0).sample([(section, entry_id) for section, entry_id, _, _ in entries],
+                                   min(lookups, len(entries)))
+    if yaml_lookup(keys) != bundle_lookup(bundle_path, keys):
+        print('MISMATCH between YAML and bundle lookups')
+        sys.exit(1)
+
+    yaml_time = best_of(yaml_lookup, keys, repeat=repeat)
+    bundle_time = best_of(bundle_lookup, bundle_path, keys, repeat=repeat)
+    print('Lookup of %d entries:' % len(keys))
+    print('  YAML:        %8.2f ms' % (yaml_time * 1000))
+    print('  bundle:      %8.2f ms' % (bundle_time * 1000))
+    print('  speedup:     %8.2fx' % (yaml_time / bundle_time))
+
+    yaml_time = best_of(yaml_all, relpaths[1:], repeat=repeat)
+    bundle_time = best_of(bundle_all, bundle_path, repeat=repeat)
+    print('Decode all entries:')
+    print('  YAML:        %8.2f ms' % (yaml_time * 1000))
+    print('  bundle:      %8.2f ms' % (bundle_time * 1000))
+    print('  speedup:     %8.2fx' % (yaml_time / bundle_time))
+finally:
+    os.remove(bundle_path)
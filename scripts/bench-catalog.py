@@ -0,0 +1,244 @@
+"""Benchmark the Python catalog pipeline on a synthetic large catalog.
+
+Builds a throwaway tree with a copy of scripts/ and a synthetic catalog/
+(see synthetic: by default 10k apps, 5k tweaks and 500 fonts spread over a
+categories.yaml with a five-level made-up subtree) plus a synthetic
+Sophia.psm1 and WinUtil tweaks.json. Then runs every pipeline step in it
+as its own process, the way deploy.yml and the importers do: once with an
+empty .cache (cold), then --repeat times warm. Only names the importers
+have metadata for are converted; the other functions and tweaks are read
+and skipped, which is what a larger upstream file costs.
+
+Per step the results record the cold and best warm wall time, the peak
+resident memory (on platforms with os.wait4) and the exit status; for
+the importers also the stage timings from their instrument report. They
+are written as JSON to .cache/bench/catalog.json or --output. Keep one
+as a baseline and pass it to --compare: steps that got slower or bigger
+than --threshold are reported and the exit status is 1.
+
+    python scripts/bench-catalog.py --output baseline.json
+    python scripts/bench-catalog.py --compare baseline.json
+"""
+import argparse, json, os, platform, shutil, subprocess, sys, tempfile, time
+
+import yaml
+
+from catalog_loader import load_catalog, root
+from sophia import sophia_meta
+from synthetic import (category_leaves, sophia_module, synthetic_categories, synthetic_entries, winutil_export,
+                       write_catalog)
+from winutil import tweak_meta
+
+BASELINE_VERSION = 1
+
+scripts_dir = os.path.dirname(os.path.abspath(__file__))
+
+# (name, arguments); {inputs} and {timings} are filled in per run
+STEPS = (
+    ('import-sophia', ['import-sophia.py', '{inputs}/sophia.psm1', '--force', '--timings', '{timings}']),
+    ('import-winutil', ['import-winutil.py', '{inputs}/winutil-tweaks.json', '--force', '--timings', '{timings}']),
+    ('import-sources', ['import-sources.py', 'sophia:{inputs}/sophia.psm1', 'winutil:{inputs}/winutil-tweaks.json',
+                        '--dry-run', '--timings', '{timings}']),
+    ('generate-index', ['generate-index.py']),
+    ('validate-catalog', ['validate-catalog.py']),
+    ('check-registry-conflicts', ['check-registry-conflicts.py']),
+    ('build-bundle', ['build-bundle.py']),
+    ('build-search-index', ['build-search-index.py', '--sections', 'apps,fonts,tweaks']),
+    ('build-reg-bundles', ['build-reg-bundles.py']),
+)
+
+
+def make_tree(directory, args):
+    """Lay out scripts/, catalog/ and inputs/ for a synthetic run below *directory*."""
+    os.makedirs(os.path.join(directory, 'scripts'))
+    for filename in os.listdir(scripts_dir):
+        if filename.endswith('.py'):
+            shutil.copy2(os.path.join(scripts_dir, filename), os.path.join(directory, 'scripts', filename))
+
+    with open(os.path.join(root, 'catalog', 'categories.yaml'), 'r', encoding='utf-8') as f:
+        categories = synthetic_categories(yaml.safe_load(f), args.depth, args.fanout, args.seed)
+    leaves = category_leaves(categories)
+    catalog = load_catalog()
+    entries = []
+    for section, size in (('apps', args.apps), ('fonts', args.fonts), ('tweaks', args.tweaks)):
+        entries.extend(synthetic_entries(catalog.sections[section], size, leaves, args.seed))
+    catalog_dir = os.path.join(directory, 'catalog')
+    os.makedirs(catalog_dir)
+    write_catalog(catalog_dir, entries, categories)
+    # The real catalog's accepted registry conflicts, so the checker's exit status means the same
+    os.makedirs(os.path.join(catalog_dir, 'metadata'))
+    shutil.copy2(os.path.join(root, 'catalog', 'metadata', 'registry-conflicts.yaml'),
+                 os.path.join(catalog_dir, 'metadata'))
+
+    inputs = os.path.join(directory, 'inputs')
+    os.makedirs(inputs)
+    with open(os.path.join(inputs, 'sophia.psm1'), 'w', encoding='utf-8') as f:
+        f.write(sophia_module(args.functions, sorted(sophia_meta)))
+    with open(os.path.join(inputs, 'winutil-tweaks.json'), 'w', encoding='utf-8') as f:
+        f.write(winutil_export(args.winutil, sorted(tweak_meta), args.seed))
+    return len(leaves)
+
+
+def run(directory, argv, log):
+    """Run one step in *directory*; return (seconds, peak RSS bytes or None, exit status)."""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable] + argv, cwd=directory, stdout=log, stderr=subprocess.STDOUT)
+    if hasattr(os, 'wait4'):
+        _, status, usage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is in KiB, except on macOS
+        peak = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    else:
+        process.wait()
+        seconds = time.perf_counter() - start
+        peak = None
+    return seconds, peak, process.returncode
+
+
+def bench_step(directory, name, arguments, repeat):
+    timings = os.path.join(directory, 'timings', name + '.json')
+    argv = [os.path.join('scripts', arguments[0])] + [
+        a.format(inputs='inputs', timings=timings) for a in arguments[1:]]
+    shutil.rmtree(os.path.join(directory, '.cache'), ignore_errors=True)
+    log_path = os.path.join(directory, 'logs', name + '.log')
+    runs = []
+    with open(log_path, 'w') as log:
+        for _ in range(repeat + 1):
+            runs.append(run(directory, argv, log))
+    result = {
+        'cold': round(runs[0][0], 6),
+        'warm': round(min(seconds for seconds, _, _ in runs[1:]), 6) if repeat else None,
+        'peak': max((peak for _, peak, _ in runs if peak is not None), default=None),
+        'status': runs[0][2],
+    }
+    if '{timings}' in arguments:
+        with open(timings, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        result['stages'] = {stage: value['seconds'] for stage, value in report['stages'].items()}
+    return result, log_path
+
+
+def compare(baseline, results, threshold, min_seconds):
+    """Return (step, measure, old, new) for every step that regressed beyond *threshold*."""
+    regressions = []
+    for name, new in results['steps'].items():
+        old = baseline['steps'].get(name)
+        if not old:
+            continue
+        for measure in ('cold', 'warm'):
+            if old.get(measure) and new.get(measure) and new[measure] - old[measure] > max(
+                    old[measure] * threshold, min_seconds):
+                regressions.append((name, measure, old[measure], new[measure]))
+        if old.get('peak') and new.get('peak') and new['peak'] > old['peak'] * (1 + threshold):
+            regressions.append((name, 'peak', old['peak'], new['peak']))
+        if old.get('status') == 0 and new.get('status') != 0:
+            regressions.append((name, 'status', old['status'], new['status']))
+    return regressions
+
+
+def format_measure(measure, value):
+    if measure == 'peak':
+        return '%.1f MiB' % (value / 1048576)
+    if measure == 'status':
+        return 'exit %d' % value
+    return '%.1f ms' % (value * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--apps', type=int, default=10000, help='apps in the synthetic catalog (default: %(default)s)')
+    parser.add_argument('--tweaks', type=int, default=5000, help='tweaks (default: %(default)s)')
+    parser.add_argument('--fonts', type=int, default=500, help='fonts (default: %(default)s)')
+    parser.add_argument('--depth', type=int, default=5, help='levels in the synthetic category subtree (default: %(default)s)')
+    parser.add_argument('--fanout', type=int, default=4, help='children per synthetic category (default: %(default)s)')
+    parser.add_argument('--functions', type=int, default=2000, help='functions in the synthetic Sophia.psm1 (default: %(default)s)')
+    parser.add_argument('--winutil', type=int, default=1000, help='tweaks in the synthetic tweaks.json (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='seed for every generator (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3, help='warm runs per step (default: %(default)s)')
+    parser.add_argument('--steps', help='comma-separated steps to run (default: all of %s)' % ', '.join(
+        name for name, _ in STEPS))
+    parser.add_argument('-o', '--output', default=os.path.join(root, '.cache', 'bench', 'catalog.json'),
+                        help='results file (default: .cache/bench/catalog.json)')
+    parser.add_argument('--compare', metavar='BASELINE', help='flag regressions against an earlier results file')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative slowdown or memory growth that counts as a regression (default: %(default)s)')
+    parser.add_argument('--min-ms', type=float, default=20,
+                        help='ignore slowdowns smaller than this many ms (default: %(default)s)')
+    parser.add_argument('--keep', action='store_true', help='keep the synthetic tree and print where it is')
+    args = parser.parse_args()
+
+    steps = STEPS
+    if args.steps:
+        wanted = args.steps.split(',')
+        unknown = set(wanted) - {name for name, _ in STEPS}
+        if unknown:
+            parser.error('unknown steps: %s' % ', '.join(sorted(unknown)))
+        steps = [step for step in STEPS if step[0] in wanted]
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    directory = tempfile.mkdtemp(prefix='perch-bench-')
+    try:
+        start = time.perf_counter()
+        categories = make_tree(directory, args)
+        os.makedirs(os.path.join(directory, 'timings'))
+        os.makedirs(os.path.join(directory, 'logs'))
+        print('Synthetic catalog: %d apps, %d tweaks, %d fonts, %d leaf categories; '
+              'Sophia.psm1 %d functions, tweaks.json %d tweaks (%.1f s to generate)' % (
+                  args.apps, args.tweaks, args.fonts, categories, args.functions, args.winutil,
+                  time.perf_counter() - start))
+
+        params = {key: getattr(args, key) for key in
+                  ('apps', 'tweaks', 'fonts', 'depth', 'fanout', 'functions', 'winutil', 'seed', 'repeat')}
+        results = {
+            'version': BASELINE_VERSION,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'params': params,
+            'steps': {},
+        }
+        print('\n  %-26s %10s %10s %10s  %s' % ('step', 'cold ms', 'warm ms', 'peak MiB', 'stages (ms)'))
+        for name, arguments in steps:
+            result, log_path = bench_step(directory, name, arguments, args.repeat)
+            results['steps'][name] = result
+            print('  %-26s %10.1f %10s %10s  %s%s' % (
+                name, result['cold'] * 1000,
+                '%.1f' % (result['warm'] * 1000) if result['warm'] is not None else '-',
+                '%.1f' % (result['peak'] / 1048576) if result['peak'] else '-',
+                ', '.join('%s %.0f' % (stage, seconds * 1000) for stage, seconds in result.get('stages', {}).items()),
+                '' if result['status'] == 0 else ' (exit %d)' % result['status']))
+            if result['status'] != 0:
+                with open(log_path, 'r', errors='replace') as f:
+                    for line in f.read().splitlines()[-3:]:
+                        print('      | %s' % line)
+    finally:
+        if args.keep:
+            print('\nKept the synthetic tree in %s' % directory)
+        else:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+        f.write('\n')
+    print('\nResults: %s' % os.path.relpath(args.output))
+
+    if baseline:
+        if baseline.get('params') != params:
+            print('WARN: %s was recorded with different parameters: %s' % (args.compare, baseline.get('params')))
+        regressions = compare(baseline, results, args.threshold, args.min_ms / 1000)
+        for name, measure, old, new in regressions:
+            print('  REGRESSION  %-26s %-6s %s -> %s' % (
+                name, measure, format_measure(measure, old), format_measure(measure, new)))
+        print('%d regressions against %s (threshold %d%%)' % (
+            len(regressions), args.compare, args.threshold * 100))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""Benchmark the GitHub star sync against a local stub API.
+
+The stub answers /repos/<owner>/<name> with a deterministic star count
+and ETag after a fixed latency, answers If-None-Match with 304, and can
+enforce a GitHub-style rate limit. The benchmark reports wall-clock time
+as the number of repositories and the concurrency grow, the cost of a
+revalidation pass, and a run that has to wait out the rate limit.
+
+--serve PORT only runs the stub, for trying sync-github-stars.py:
+
+    python scripts/bench-github-stars.py --serve 8765
+    python scripts/sync-github-stars.py --api-url http://127.0.0.1:8765
+"""
+import argparse, hashlib, json, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from github_stars import FETCHED, NOT_MODIFIED, sync_stars
+
+
+def expected_stars(repo):
+    return int(hashlib.sha256(repo.encode('utf-8')).hexdigest()[:6], 16)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, port=0, latency=0.02, limit=None, window=1.0):
+        super().__init__(('127.0.0.1', port), StubHandler)
+        self.latency = latency
+        self.limit = limit
+        self.window = window
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.window_start = time.time()
+        self.window_used = 0
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d' % self.server_address[1]
+
+    def take(self):
+        """Count a request against the limit; return (allowed, remaining, reset)."""
+        with self.lock:
+            self.requests += 1
+            if self.limit is None:
+                return True, 5000, int(time.time()) + 3600
+            now = time.time()
+            if now - self.window_start >= self.window:
+                self.window_start = now
+                self.window_used = 0
+            reset = int(self.window_start + self.window) + 1
+            if self.window_used >= self.limit:
+                return False, 0, reset
+            self.window_used += 1
+            return True, self.limit - self.window_used, reset
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        repo = self.path.partition('/repos/')[2]
+        etag = '"%s"' % hashlib.sha1(repo.encode('utf-8')).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            # Conditional hits do not count against the limit
+            self.reply(304, b'', etag)
+            return
+        allowed, remaining, reset = self.server.take()
+        if not allowed:
+            self.reply(403, b'{"message": "API rate limit exceeded"}', None, remaining, reset)
+            return
+        body = json.dumps({'full_name': repo, 'stargazers_count': expected_stars(repo)}).encode('utf-8')
+        self.reply(200, body, etag, remaining, reset)
+
+    def reply(self, status, body, etag, remaining=None, reset=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        if remaining is not None:
+            self.send_header('X-RateLimit-Remaining', str(remaining))
+            self.send_header('X-RateLimit-Reset', str(reset))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(server, repos, cache, concurrency):
+    start_time = time.perf_counter()
+    results = sync_stars(repos, cache, server.url, concurrency=concurrency, max_wait=10)
+    elapsed = time.perf_counter() - start_time
+    for repo, (outcome, stars, _, _) in results.items():
+        if outcome not in (FETCHED, NOT_MODIFIED) or stars != expected_stars(repo):
+            print('MISMATCH for %s: %s %r' % (repo, outcome, stars))
+            sys.exit(1)
+    return elapsed, [r[0] for r in results.values()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--serve', type=int, metavar='PORT', help='only run the stub API on PORT')
+    parser.add_argument('--latency', type=float, default=0.02, help='stub response latency in seconds')
+    parser.add_argument('--sizes', default='16,64,256', help='repository counts to time')
+    parser.add_argument('--concurrency', default='1,8,32', help='concurrency levels to time')
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        server = StubServer(args.serve, args.latency)
+        print('Stub GitHub API on %s' % server.url)
+        server.serve_forever()
+        return
+
+    sizes = [int(n) for n in args.sizes.split(',')]
+    levels = [int(n) for n in args.concurrency.split(',')]
+    server = start(StubServer(latency=args.latency))
+
+    print('Wall-clock ms, %d ms stub latency:' % (args.latency * 1000))
+    print('  %8s %s' % ('repos', ''.join('%12s' % ('j=%d' % j) for j in levels)))
+    for size in sizes:
+        repos = ['owner%d/repo%d' % (n % 17, n) for n in range(size)]
+        row = [run(server, repos, {}, j)[0] for j in levels]
+        print('  %8d %s' % (size, ''.join('%12.1f' % (t * 1000) for t in row)))
+
+    repos = ['owner%d/repo%d' % (n % 17, n) for n in range(sizes[-1])]
+    cache = {}
+    first, _ = run(server, repos, cache, levels[-1])
+    before = server.requests
+    second, outcomes = run(server, repos, cache, levels[-1])
+    print('\nRevalidation of %d repos (j=%d): %.1f ms first pass, %.1f ms with ETags, %d/%d not modified, '
+          '%d counted against the limit' % (len(repos), levels[-1], first * 1000, second * 1000,
+                                            outcomes.count(NOT_MODIFIED), len(repos), server.requests - before))
+    server.shutdown()
+
+    limited = start(StubServer(latency=args.latency, limit=40, window=1.0))
+    repos = ['owner/limited%d' % n for n in range(100)]
+    elapsed, outcomes = run(limited, repos, {}, levels[-1])
+    print('Rate limit of 40 requests/s, %d repos: %.1f ms, %d fetched, %d requests' % (
+        len(repos), elapsed * 1000, outcomes.count(FETCHED), limited.requests))
+    limited.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Benchmark the logo pipeline against a local fixture server.
+
+The fixture serves /favicon/<domain> and /avatar/<owner> with a generated
+128 px PNG after a fixed latency; domains starting with "missing" get a
+404 so the avatar fallback is exercised. The benchmark times fetching at
+several thread counts, a cold and a warm atlas build of the real
+catalog/logos, and compares what a gallery page downloads with and
+without the atlas.
+
+--serve PORT only runs the fixture, for trying sync-logos.py offline
+(see its docstring for the URL templates).
+"""
+import argparse, hashlib, io, sys, tempfile, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from logos import SCALES, TILE, build_sprites, fetch_logos, read_originals
+
+
+def fixture_png(name):
+    from PIL import Image, ImageDraw
+    digest = hashlib.sha256(name.encode('utf-8')).digest()
+    image = Image.new('RGBA', (128, 128), tuple(digest[:3]) + (255,))
+    ImageDraw.Draw(image).ellipse((16, 16, 112, 112), fill=tuple(digest[3:6]) + (255,))
+    out = io.BytesIO()
+    image.save(out, format='PNG')
+    return out.getvalue()
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, port=0, latency=0.05):
+        super().__init__(('127.0.0.1', port), FixtureHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d' % self.server_address[1]
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+        kind, _, name = self.path.strip('/').partition('/')
+        if kind not in ('favicon', 'avatar') or not name or name.startswith('missing'):
+            self.send_error(404)
+            return
+        body = fixture_png(name)
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--serve', type=int, metavar='PORT', help='only run the fixture server on PORT')
+    parser.add_argument('--latency', type=float, default=0.05, help='fixture response latency in seconds')
+    parser.add_argument('--entries', type=int, default=100, help='entries to fetch')
+    parser.add_argument('--jobs', default='1,4,16', help='thread counts to time')
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        server = FixtureServer(args.serve, args.latency)
+        print('Logo fixture server on %s' % server.url)
+        server.serve_forever()
+        return
+
+    server = FixtureServer(latency=args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    favicon_url = server.url + '/favicon/{domain}'
+    avatar_url = server.url + '/avatar/{owner}'
+    # Every fifth entry has no usable favicon and falls back to its GitHub avatar
+    entries = [('app%d' % n, 'https://%sapp%d.example/' % ('missing-' if n % 5 == 0 else '', n),
+                'https://github.com/owner%d/app%d' % (n, n)) for n in range(args.entries)]
+
+    print('Fetching %d logos, %d ms fixture latency:' % (len(entries), args.latency * 1000))
+    for jobs in [int(j) for j in args.jobs.split(',')]:
+        start = time.perf_counter()
+        results = list(fetch_logos(entries, jobs, favicon_url, avatar_url))
+        elapsed = time.perf_counter() - start
+        sources = [source for _, source, _ in results]
+        if None in sources or sources.count('github') != len(range(0, args.entries, 5)):
+            print('unexpected fetch results: %r' % sources)
+            sys.exit(1)
+        print('  j=%-3d %8.1f ms' % (jobs, elapsed * 1000))
+    server.shutdown()
+
+    originals = read_originals()
+    with tempfile.TemporaryDirectory() as cache:
+        start = time.perf_counter()
+        files, stats = build_sprites(originals, cache=cache)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        again, warm_stats = build_sprites(originals, cache=cache)
+        warm = time.perf_counter() - start
+    if files != again or warm_stats['resized']:
+        print('warm build differs from cold build')
+        sys.exit(1)
+    print('\nAtlas build for %d logos: %.1f ms cold (%d tiles resized), %.1f ms warm (%d tiles from cache)' % (
+        len(originals), cold * 1000, stats['resized'], warm * 1000, warm_stats['cached']))
+
+    atlases = sorted(name for name in files if name.startswith('atlas-'))
+    print('\nPer page load:')
+    print('  originals: %4d requests, %8d bytes' % (len(originals), sum(map(len, originals.values()))))
+    for scale, name in zip(SCALES, atlases):
+        print('  %dx atlas: %4d request,  %8d bytes (%d px tiles)' % (scale, 1, len(files[name]), TILE * scale))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Benchmark the gallery search index against a linear scan as the catalog grows.
+
+Synthetic catalogs are made from the real apps: each copy gets made-up
+words added to its name, tags and description, so the vocabulary grows
+with the catalog the way it would with real entries. For every size the
+benchmark reports the index build time and artifact size, then the
+median latency of representative queries through the index and through a
+scan over every entry's words, checking that both return the same ids.
+"""
+import argparse, gzip, statistics, sys, time
+
+from catalog_loader import load_catalog
+from search_index import LinearScan, SearchIndex, build_index, dumps
+from synthetic import synthetic_entries
+
+QUERIES = ('code', 'python', 'git', 'vis stu', 'terminal emulator', 'net run', 'font', 'zzz')
+
+
+def median_us(search, query, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        search(query)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='300,3000,30000', help='catalog sizes to time')
+    parser.add_argument('--repeat', type=int, default=21, help='timed runs per query')
+    args = parser.parse_args()
+
+    apps = load_catalog().apps
+    print('%8s %10s %10s %10s  %s' % ('entries', 'build ms', 'bytes', 'gzipped', 'query: index us / scan us'))
+    for size in [int(n) for n in args.sizes.split(',')]:
+        entries = synthetic_entries(apps, size)
+        start = time.perf_counter()
+        index = build_index(entries)
+        build = time.perf_counter() - start
+        data = dumps(index).encode('utf-8')
+
+        search, scan = SearchIndex(index), LinearScan(entries)
+        cells = []
+        for query in QUERIES:
+            if search.search(query) != scan.search(query):
+                print('Index and scan disagree on %r at %d entries' % (query, size))
+                sys.exit(1)
+            cells.append('%s %.0f/%.0f' % (query, median_us(search.search, query, args.repeat),
+                                           median_us(scan.search, query, max(3, args.repeat // 4))))
+        print('%8d %10.1f %10d %10d  %s' % (size, build * 1000, len(data), len(gzip.compress(data)), ', '.join(cells)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark the Sophia tokenizer against the old DOTALL regex.
+
+Builds synthetic Sophia.psm1 modules (see synthetic.sophia_module), runs
+both parsers over them and checks they find the same functions and
+registry entries. Two modules are timed: a typical one, and the same one
+followed by *disabled* commented-out blocks that no function follows.
+From each of those the regex's lazy help match runs on to the end of the
+file before giving up, so its time grows with the square of the number
+of blocks, while the tokenizer reads every line once.
+
+It also checks sophia.parse_function_registry on a synthetic module:
+each function yields the values of its non-default parameter set, and a
+function whose only writing set is the default one yields nothing.
+
+Usage: python scripts/bench-sophia-tokenizer.py [functions] [repeat] [disabled]
+"""
+import io, re, sys, time
+
+from sophia import parse_function_registry
+from sophia_tokenizer import iter_functions
+from synthetic import sophia_module
+
+# The regex the importers used before sophia_tokenizer
+func_pattern = re.compile(
+    r'<#\s*\n(.*?)\n\s*#>\s*\n\s*function\s+(\w+)\s*\n(.*?)(?=\n<#\s*\n|\n#region\s|\Z)',
+    re.DOTALL
+)
+
+reg_pattern = re.compile(
+    r'New-ItemProperty\s+-Path\s+"?([^"\n]+?)"?\s+-Name\s+"?([^"\n]+?)"?\s+'
+    r'-(?:PropertyType|Type)\s+(\w+)\s+-Value\s+"?([^"\s]+?)"?\s+-Force'
+)
+
+
+def regex_path(content):
+    result = []
+    for match in func_pattern.finditer(content):
+        regs = [m.groups() for m in reg_pattern.finditer(match.group(3))]
+        result.append((match.group(2), regs))
+    return result
+
+
+def tokenizer_path(content):
+    result = []
+    for func in iter_functions(io.StringIO(content)):
+        regs = [m.groups() for m in reg_pattern.finditer(func.body)]
+        result.append((func.name, regs))
+    return result
+
+
+def best_of(fn, arg, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+functions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+disabled = int(sys.argv[3]) if len(sys.argv) > 3 else functions // 2
+
+print('%d functions, best of %d' % (functions, repeat))
+print('  %-36s %10s %10s %8s' % ('module', 'regex ms', 'tokens ms', 'speedup'))
+for label, content in (('typical', sophia_module(functions)),
+                       ('+ %d disabled blocks' % disabled, sophia_module(functions, disabled=disabled))):
+    regex_time, regex_result = best_of(regex_path, content, repeat)
+    token_time, token_result = best_of(tokenizer_path, content, repeat)
+    if regex_result != token_result:
+        print('MISMATCH in %s: regex found %d functions, tokenizer %d' % (label, len(regex_result), len(token_result)))
+        sys.exit(1)
+    print('  %-36s %10.2f %10.2f %7.2fx' % (
+        '%s (%.0f KiB)' % (label, len(content) / 1024), regex_time * 1000, token_time * 1000, regex_time / token_time))
+
+for func in iter_functions(io.StringIO(sophia_module(2, default_only=2))):
+    values = [entry['value'] for entry in parse_function_registry(func.body, func.name, func.help)]
+    expected = [] if func.name.startswith('Removal') else [1, 'On']
+    if values != expected:
+        print('MISMATCH in registry extraction for %s: %r, expected %r' % (func.name, values, expected))
+        sys.exit(1)
+print('Registry extraction: non-default sets taken, default-only functions skipped')
@@ -0,0 +1,185 @@
+"""Check and benchmark the shared tweak YAML emitter.
+
+Renders randomized tweaks full of YAML-hostile strings (numbers, booleans,
+indicators, quotes, backslashes, control characters) and checks that
+PyYAML reads every document back to exactly the values that went in. Then
+times the emitter against the per-line formatting the importers used
+before tweak_yaml on a synthetic batch of typical tweaks.
+
+Usage: python scripts/bench-tweak-yaml.py [tweaks] [repeat] [seed]
+"""
+import random, sys, time
+
+import yaml
+
+import tweak_yaml
+
+_Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Strings YAML would read as something else, or not at all, when left plain
+TRICKY = [
+    '', ' ', 'yes', 'No', 'off', 'ON', 'y', 'n', '~', 'null', 'true', 'False', '=',
+    '0', '01', '-1', '+1', '1_000', '0x1F', '0o17', '0b101', '1.5', '.5', '1.', '1e5', '-1.5e-3',
+    '.inf', '-.Inf', '.nan', '1:20', '2024-01-01', '- a', '? x', 'a: b', 'a #b', '#x', '&a', '*a',
+    '!tag', '|', '>', '%x', '@x', '`x', "'x'", '"x"', 'C:\\Windows', '\\\\server\\share', 'a\\"b',
+    ' lead', 'trail ', 'tab\there', 'line\nbreak', 'nel\x85', 'ls\u2028', 'bom\ufeff', 'bell\x07',
+    'ctl\x9f', 'caf\xe9', '\U0001f600', '{0}', '[1, 2]', 'a,b',
+]
+ALPHABET = 'abcXYZ019 -_.:,#\'"\\{}[]&*!|>%@`?~=\t\n\x85\u2028\xe9'
+
+
+def random_string(rng):
+    if rng.random() < 0.5:
+        return rng.choice(TRICKY)
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 12)))
+
+
+def random_scalar(rng):
+    r = rng.random()
+    if r < 0.15:
+        return None
+    if r < 0.35:
+        return rng.choice([0, 1, -1, 4294967295, 2 ** 63])
+    return random_string(rng)
+
+
+def random_tweak(rng):
+    return {
+        'name': random_string(rng) or 'x',
+        'category': random_string(rng) or 'x',
+        'tags': [random_string(rng) or 'x' for _ in range(rng.randint(0, 3))],
+        'description': random_string(rng),
+        'reversible': rng.random() < 0.8,
+        'profiles': [random_string(rng) or 'x' for _ in range(rng.randint(0, 2))],
+        'windows-versions': rng.sample([10, 11], rng.randint(0, 2)),
+        'source': random_string(rng) or 'x',
+        'registry': [{
+            'key': random_string(rng) or 'x',
+            'name': random_scalar(rng),
+            'value': random_scalar(rng),
+            'type': random_string(rng) or 'x',
+            'default-value': random_scalar(rng),
+        } for _ in range(rng.randint(1, 3))],
+    }
+
+
+def round_trip(count, seed):
+    rng = random.Random(seed)
+    for n in range(count):
+        tweak = random_tweak(rng)
+        text = tweak_yaml.render_tweak(tweak)
+        try:
+            loaded = yaml.load(text, Loader=_Loader)
+        except yaml.YAMLError as e:
+            return n, tweak, text, 'does not parse: %s' % e
+        expected = dict(tweak, type='tweak')
+        if loaded != expected:
+            return n, tweak, text, 'read back as %r' % loaded
+    return None
+
+
+# The formatting the importers used before tweak_yaml
+def legacy_format_value(v):
+    if v is None:
+        return 'null'
+    if isinstance(v, int):
+        return str(v)
+    if isinstance(v, str):
+        if v == '':
+            return '""'
+        if '\\' in v:
+            return "'%s'" % v.replace("'", "''")
+        if any(c in v for c in ':{}[],"\'&#*?|-><!%@`'):
+            return '"%s"' % v.replace('"', '\\"')
+        return v
+    return str(v)
+
+
+def legacy_render(tweak):
+    lines = []
+    lines.append('type: tweak')
+    lines.append('name: %s' % legacy_format_value(tweak['name']))
+    lines.append('category: %s' % tweak['category'])
+    lines.append('tags: [%s]' % ', '.join(tweak['tags']))
+    lines.append('description: "%s"' % tweak['description'].replace('"', '\\"'))
+    lines.append('reversible: true')
+    lines.append('profiles: [%s]' % ', '.join(tweak['profiles']))
+    lines.append('windows-versions: [%s]' % ', '.join(str(v) for v in tweak['windows-versions']))
+    lines.append('source: %s' % tweak['source'])
+    lines.append('registry:')
+    for entry in tweak['registry']:
+        lines.append('  - key: %s' % entry['key'])
+        lines.append('    name: %s' % legacy_format_value(entry['name']))
+        lines.append('    value: %s' % legacy_format_value(entry['value']))
+        lines.append('    type: %s' % entry['type'])
+        lines.append('    default-value: %s' % legacy_format_value(entry['default-value']))
+    lines.append('')
+    return '\n'.join(lines)
+
+
+def typical_tweaks(count, seed):
+    """Tweaks shaped like the importers' output, sharing hives and value names."""
+    rng = random.Random(seed)
+    keys = ['HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\Advanced',
+            'HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\DataCollection',
+            'HKCU\\Control Panel\\Desktop', 'HKLM\\SYSTEM\\CurrentControlSet\\Control\\Power']
+    names = ['Enabled', 'HideFileExt', 'AllowTelemetry', 'ShowTaskViewButton', 'MenuShowDelay', '(Default)']
+    values = [0, 1, 2, 'Deny', 'C:\\Windows\\Temp', '{645FF040-5081-101B-9F08-00AA002F954E}']
+    return [{
+        'name': 'Synthetic tweak %d' % n,
+        'category': 'Explorer/Context Menu',
+        'tags': ['explorer', 'synthetic'],
+        'description': 'Synthetic "tweak" number %d for the benchmark' % n,
+        'profiles': ['power-user'],
+        'windows-versions': [10, 11],
+        'source': 'sophia-script',
+        'registry': [{
+            'key': rng.choice(keys),
+            'name': rng.choice(names),
+            'value': rng.choice(values),
+            'type': rng.choice(['dword', 'string']),
+            'default-value': rng.choice([None, 0, 1]),
+        } for _ in range(rng.randint(1, 4))],
+    } for n in range(count)]
+
+
+def best_of(fn, tweaks, repeat, before=None):
+    best = None
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        for tweak in tweaks:
+            fn(tweak)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def cold_caches():
+    tweak_yaml.format_value.cache_clear()
+    tweak_yaml.format_plain.cache_clear()
+    tweak_yaml._flow_list.cache_clear()
+
+
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+failure = round_trip(count, seed)
+if failure:
+    n, tweak, text, problem = failure
+    print('ROUND-TRIP FAILURE in tweak %d: %s' % (n, problem))
+    print(repr(tweak))
+    print(text)
+    sys.exit(1)
+print('Round-trip: %d randomized tweaks read back unchanged' % count)
+
+tweaks = typical_tweaks(count, seed)
+legacy_time = best_of(legacy_render, tweaks, repeat)
+emitter_time = best_of(tweak_yaml.render_tweak, tweaks, repeat, before=cold_caches)
+
+print('Rendering %d typical tweaks:' % count)
+print('  legacy:    %8.2f ms' % (legacy_time * 1000))
+print('  emitter:   %8.2f ms' % (emitter_time * 1000))
+print('  speedup:   %8.2fx' % (legacy_time / emitter_time))
@@ -0,0 +1,42 @@
+"""Build the binary catalog bundle Perch clients download instead of YAML.
+
+Reads every app, font and tweak entry and writes build/catalog.bundle
+(see catalog_bundle for the format). copy-catalog.mjs ships it next to
+the YAML as dist/catalog/catalog.bundle. The written bundle is read back
+and every entry compared with its YAML before the command succeeds.
+"""
+import argparse, os, sys
+
+from catalog_bundle import Bundle, build_bundle, read_entries
+from catalog_loader import catalog_dir, root
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-o', '--output', default=os.path.join(root, 'build', 'catalog.bundle'),
+                        help='bundle path (default: build/catalog.bundle)')
+    args = parser.parse_args()
+
+    entries = read_entries()
+    data = build_bundle(entries)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'wb') as f:
+        f.write(data)
+
+    with Bundle(args.output) as bundle:
+        if len(bundle) != len(entries):
+            print('Bundle holds %d entries, expected %d' % (len(bundle), len(entries)))
+            sys.exit(1)
+        for section, entry_id, relpath, document in entries:
+            if bundle.get(section, entry_id) != document or bundle.path(section, entry_id) != relpath:
+                print('Bundle mismatch for %s' % relpath)
+                sys.exit(1)
+
+    yaml_bytes = sum(os.path.getsize(os.path.join(catalog_dir, relpath)) for _, _, relpath, _ in entries)
+    yaml_bytes += os.path.getsize(os.path.join(catalog_dir, 'index.yaml'))
+    print('Wrote %s: %d entries, %d bytes (YAML: %d bytes)' % (
+        os.path.relpath(args.output), len(entries), len(data), yaml_bytes))
+
+
+if __name__ == '__main__':
+    main()
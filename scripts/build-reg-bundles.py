@@ -0,0 +1,80 @@
+"""Build one .reg file and its undo file per tweak profile and Windows version.
+
+Writes build/reg/<profile>-win<version>.reg, <profile>-win<version>-undo.reg
+and a manifest.json listing each bundle's tweaks, script-only tweaks left
+out and SHA-256 (see reg_bundle for the file layout). copy-catalog.mjs
+publishes them as dist/catalog/reg/, so a machine can be provisioned
+with a single ``reg import``.
+
+Every written bundle is read back and checked for key and value order
+and for an undo entry restoring each value; --check does the same for
+the files already in the output directory and fails when they are out
+of date.
+"""
+import argparse, glob, json, os, sys
+
+from catalog_loader import load_catalog, root
+from reg_bundle import build_bundles, check_bundle
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-o', '--output', default=os.path.join(root, 'build', 'reg'),
+                        help='output directory (default: build/reg)')
+    parser.add_argument('--check', action='store_true', help='verify the existing bundles instead of writing')
+    args = parser.parse_args()
+
+    tweaks = load_catalog(sections=('tweaks',)).tweaks
+    files, manifest, writes, conflicts, skipped = build_bundles(tweaks)
+    files['manifest.json'] = (json.dumps(manifest, indent=2) + '\n').encode('utf-8')
+
+    for tweak_id, label, reason in conflicts:
+        print('  WARN   %s: %s %s' % (tweak_id, label, reason))
+    for tweak_id, label, reason in skipped:
+        print('  WARN   %s: %s left out: %s' % (tweak_id, label, reason))
+
+    if args.check:
+        stale = []
+        for name, data in sorted(files.items()):
+            try:
+                with open(os.path.join(args.output, name), 'rb') as f:
+                    if f.read() != data:
+                        stale.append(name)
+            except FileNotFoundError:
+                stale.append(name)
+        if stale:
+            print('Out of date in %s: %s; run: python scripts/build-reg-bundles.py' % (
+                os.path.relpath(args.output), ', '.join(stale)))
+            sys.exit(1)
+    else:
+        os.makedirs(args.output, exist_ok=True)
+        for path in glob.glob(os.path.join(args.output, '*.reg')):
+            if os.path.basename(path) not in files:
+                os.remove(path)
+        for name, data in files.items():
+            with open(os.path.join(args.output, name), 'wb') as f:
+                f.write(data)
+
+    problems = []
+    for bundle in manifest['bundles']:
+        with open(os.path.join(args.output, bundle['file']), 'rb') as f:
+            apply_data = f.read()
+        with open(os.path.join(args.output, bundle['undo']), 'rb') as f:
+            undo_data = f.read()
+        name = bundle['file'][:-len('.reg')]
+        problems.extend('%s: %s' % (name, problem) for problem in check_bundle(writes[name], apply_data, undo_data))
+    for problem in problems:
+        print('  ERROR  %s' % problem)
+    if problems:
+        sys.exit(1)
+
+    for bundle in manifest['bundles']:
+        print('  %-24s %3d tweaks, %3d values in %3d keys, %d script-only tweaks left out' % (
+            bundle['file'], len(bundle['tweaks']), bundle['values'], bundle['keys'], len(bundle['scripts'])))
+    print('%s %d bundles in %s (%d conflicts, %d values left out)' % (
+        'Checked' if args.check else 'Wrote', len(manifest['bundles']), os.path.relpath(args.output),
+        len(conflicts), len(skipped)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Build the prefix search index the gallery page loads for its app search.
+
+Writes public/search-index.json (see search_index for the format), which
+Astro copies into the site. index.astro fetches it the first time the
+search box is used and falls back to scanning the cards until it has
+arrived. Before writing, a spread of words from the entries, and their
+two-letter prefixes, are searched in the new index and compared with a
+linear scan.
+"""
+import argparse, gzip, os, sys
+
+from catalog_loader import SECTIONS, load_catalog, root
+from search_index import LinearScan, SearchIndex, build_index, dumps, entry_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-o', '--output', default=os.path.join(root, 'public', 'search-index.json'),
+                        help='index path (default: public/search-index.json)')
+    parser.add_argument('--sections', default='apps',
+                        help='comma-separated catalog sections to index (default: %(default)s)')
+    args = parser.parse_args()
+
+    sections = args.sections.split(',')
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        parser.error('unknown sections: %s' % ', '.join(sorted(unknown)))
+    catalog = load_catalog()
+    entries = [entry for section in sections for entry in catalog.sections[section]]
+    index = build_index(entries)
+
+    search, scan = SearchIndex(index), LinearScan(entries)
+    words = sorted(set().union(*map(entry_tokens, entries)))
+    for word in words[::max(1, len(words) // 200)]:
+        for query in (word, word[:2]):
+            if search.search(query) != scan.search(query):
+                print('Index mismatch for query %r' % query)
+                sys.exit(1)
+
+    text = dumps(index)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    data = text.encode('utf-8')
+    print('Wrote %s: %d entries, %d prefixes, %d posting lists, %d bytes (%d gzipped)' % (
+        os.path.relpath(args.output), len(entries), len(index['terms']), len(index['lists']),
+        len(data), len(gzip.compress(data))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Query, index and validate the catalog through the shared entry cache.
+
+Every subcommand loads the catalog with catalog_loader, so on a warm
+cache no YAML is parsed:
+
+    python scripts/catalog-cli.py stats
+    python scripts/catalog-cli.py show vlc
+    python scripts/catalog-cli.py find --category Languages/Python --profile developer
+    python scripts/catalog-cli.py index --check
+    python scripts/catalog-cli.py validate --format json
+
+``find`` and ``show`` print JSON with --format json.
+"""
+import argparse, json, os, sys, time
+
+from catalog_index import check_index, index_path, render_index, render_shards, shards_dir, write_shards
+from catalog_loader import SECTIONS, cache_path, load_catalog
+from catalog_validator import Schema, report, validate_catalog
+
+
+def entry_summary(entry):
+    return {'id': entry.id, 'section': entry.section, 'path': entry.relpath, 'name': entry.name,
+            'category': entry.category, 'tags': list(entry.tags), 'profiles': list(entry.profiles)}
+
+
+def cmd_stats(catalog, args):
+    print('%d entries (%d parsed, %d from cache), %d unreadable' % (
+        len(catalog), catalog.reread, len(catalog) - catalog.reread, len(catalog.errors)))
+    for section in SECTIONS:
+        print('  %-7s %d' % (section, len(catalog.sections[section])))
+    for label, table in (('categories', catalog.by_category), ('tags', catalog.by_tag),
+                         ('profiles', catalog.by_profile)):
+        top = sorted(table.items(), key=lambda item: (-len(item[1]), item[0]))[:5]
+        print('%d %s; most used: %s' % (len(table), label, ', '.join('%s (%d)' % (k, len(v)) for k, v in top)))
+
+
+def cmd_show(catalog, args):
+    entry = catalog.get(args.id, args.section)
+    if entry is None:
+        print('No entry with id %r' % args.id, file=sys.stderr)
+        return 1
+    if args.format == 'json':
+        json.dump(dict(entry_summary(entry), data=entry.data), sys.stdout, indent=2, default=str)
+        sys.stdout.write('\n')
+    else:
+        with open(os.path.join(args.catalog, entry.relpath), 'r', encoding='utf-8') as f:
+            sys.stdout.write('# %s\n%s' % (entry.relpath, f.read()))
+    return 0
+
+
+def cmd_find(catalog, args):
+    entries = catalog.find(args.section, args.category, args.tag, args.profile)
+    if args.format == 'json':
+        json.dump([entry_summary(entry) for entry in entries], sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        for entry in entries:
+            print('%-40s %s' % (entry.relpath, entry.name))
+        print('%d entries' % len(entries), file=sys.stderr)
+    return 0
+
+
+def cmd_index(catalog, args):
+    output, counts = render_index(catalog)
+    if args.check:
+        return 0 if check_index(output, os.path.join(args.catalog, 'index.yaml')) else 1
+    with open(os.path.join(args.catalog, 'index.yaml'), 'w', encoding='utf-8', newline='') as f:
+        f.write(output)
+    print('Generated index.yaml: %d apps, %d fonts, %d tweaks' % (counts['apps'], counts['fonts'], counts['tweaks']))
+    if args.shards:
+        files = render_shards(catalog)
+        write_shards(files, args.shards)
+        print('Wrote %d shard pages to %s' % (len(files) - 1, os.path.relpath(args.shards)))
+    return 0
+
+
+def cmd_validate(catalog, args):
+    schema = Schema.load(os.path.join(args.catalog, 'categories.yaml'))
+    issues = validate_catalog(catalog, schema, None if args.no_index else os.path.join(args.catalog, 'index.yaml'))
+    return 1 if report(issues, catalog, time.perf_counter() - args.start, args.format) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--catalog', default=os.path.dirname(index_path), help='catalog directory')
+    parser.add_argument('--no-cache', action='store_true', help='re-read every entry and leave the cache alone')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='reader threads')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('stats', help='entry counts and index sizes').set_defaults(run=cmd_stats)
+
+    show = commands.add_parser('show', help='print one entry')
+    show.add_argument('id')
+    show.set_defaults(run=cmd_show)
+
+    find = commands.add_parser('find', help='list entries matching every filter')
+    find.add_argument('--category', help='category, including its subcategories')
+    find.add_argument('--tag')
+    find.add_argument('--profile')
+    find.set_defaults(run=cmd_find)
+
+    for sub in (show, find):
+        sub.add_argument('--section', choices=SECTIONS)
+        sub.add_argument('--format', choices=('text', 'json'), default='text')
+
+    index = commands.add_parser('index', help='regenerate catalog/index.yaml')
+    index.add_argument('--check', action='store_true', help='fail if index.yaml is not up to date')
+    index.add_argument('--shards', nargs='?', const=shards_dir, help='also write per-category shards (default: build/index)')
+    index.set_defaults(run=cmd_index)
+
+    validate = commands.add_parser('validate', help='validate every entry')
+    validate.add_argument('--format', choices=('text', 'json'), default='text')
+    validate.add_argument('--no-index', action='store_true', help='skip the index.yaml cross-check')
+    validate.set_defaults(run=cmd_validate)
+
+    args = parser.parse_args()
+    args.start = time.perf_counter()
+    catalog = load_catalog(args.catalog, None if args.no_cache else cache_path, jobs=args.jobs)
+    sys.exit(args.run(catalog, args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+"""Compact binary bundle of every catalog entry, for Perch clients.
+
+One file replaces index.yaml plus the individual entry YAMLs. Every
+string (keys, categories, tags, registry path segments such as hives) is
+stored once in a string table, and a sorted offset index lets a client
+memory-map the bundle and decode a single entry without reading the rest.
+Entries are looked up by section and id, since an app and a tweak may
+share an id.
+
+Layout, little-endian:
+
+  header    magic 'PRCB', u16 version, u16 reserved, u32 entry count,
+            u32 string count, u32 index offset, u32 data offset
+  strings   u32 end offset per string, then the UTF-8 bytes back to back
+  index     per entry, sorted by section and then id bytes: u32 section
+            string, u32 id string, u32 path string, u32 data offset,
+            u32 data length
+  data      one encoded document per entry
+
+A document value is a tag byte followed by its payload, with unsigned
+LEB128 varints for counts and string numbers:
+
+  0 null  1 false  2 true  3 int (zigzag varint)  4 float (f64)
+  5 string (string number)  6 registry-style path (count, string numbers
+  of the backslash-separated segments)  7 list (count, values)
+  8 map (count, then string number of the key and the value per pair)
+"""
+import bisect, collections, mmap, struct
+
+from catalog_loader import catalog_dir, load_catalog
+
+MAGIC = b'PRCB'
+VERSION = 2
+
+_header = struct.Struct('<4sHHIIII')
+_record = struct.Struct('<IIIII')
+_u32 = struct.Struct('<I')
+_f64 = struct.Struct('<d')
+
+NULL, FALSE, TRUE, INT, FLOAT, STR, PATH, LIST, MAP = range(9)
+
+
+def _strings(value, counts):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            counts[str(key)] += 1
+            _strings(item, counts)
+    elif isinstance(value, list):
+        for item in value:
+            _strings(item, counts)
+    elif isinstance(value, str):
+        if '\\' in value:
+            counts.update(value.split('\\'))
+        else:
+            counts[value] += 1
+    elif value is not None and not isinstance(value, (bool, int, float)):
+        counts[str(value)] += 1
+
+
+def _varint(n, out):
+    while n >= 0x80:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _encode(value, table, out):
+    if value is None:
+        out.append(NULL)
+    elif value is True:
+        out.append(TRUE)
+    elif value is False:
+        out.append(FALSE)
+    elif isinstance(value, int):
+        out.append(INT)
+        _varint(value * 2 if value >= 0 else -value * 2 - 1, out)
+    elif isinstance(value, float):
+        out.append(FLOAT)
+        out += _f64.pack(value)
+    elif isinstance(value, dict):
+        out.append(MAP)
+        _varint(len(value), out)
+        for key, item in value.items():
+            _varint(table[str(key)], out)
+            _encode(item, table, out)
+    elif isinstance(value, list):
+        out.append(LIST)
+        _varint(len(value), out)
+        for item in value:
+            _encode(item, table, out)
+    elif isinstance(value, str) and '\\' in value:
+        segments = value.split('\\')
+        out.append(PATH)
+        _varint(len(segments), out)
+        for segment in segments:
+            _varint(table[segment], out)
+    else:
+        # Timestamps and other scalars travel as their string form
+        out.append(STR)
+        _varint(table[str(value)], out)
+
+
+def read_entries(directory=catalog_dir):
+    """Return ``(section, id, relpath, document)`` for every catalog entry, documents parsed like js-yaml."""
+    return [(entry.section, entry.id, entry.relpath, entry.data) for entry in load_catalog(directory)]
+
+
+def build_bundle(entries):
+    """Return the bundle bytes for *entries*, ``(section, id, relpath, document)`` tuples."""
+    entries = sorted(entries, key=lambda e: (e[0].encode('utf-8'), e[1].encode('utf-8')))
+    counts = collections.Counter()
+    for section, entry_id, relpath, document in entries:
+        counts[section] += 1
+        counts[entry_id] += 1
+        counts[relpath] += 1
+        _strings(document, counts)
+    # Most used strings get the lowest numbers, which encode in one byte
+    strings = sorted(counts, key=lambda s: (-counts[s], s))
+    table = {s: n for n, s in enumerate(strings)}
+
+    blob = bytearray()
+    ends = bytearray()
+    for s in strings:
+        blob += s.encode('utf-8')
+        ends += _u32.pack(len(blob))
+
+    data = bytearray()
+    records = bytearray()
+    for section, entry_id, relpath, document in entries:
+        start = len(data)
+        _encode(document, table, data)
+        records += _record.pack(table[section], table[entry_id], table[relpath], start, len(data) - start)
+
+    index_offset = _header.size + len(ends) + len(blob)
+    index_offset += -index_offset % 4
+    data_offset = index_offset + len(records)
+    out = bytearray(_header.pack(MAGIC, VERSION, 0, len(entries), len(strings), index_offset, data_offset))
+    out += ends
+    out += blob
+    out += bytes(index_offset - len(out))
+    out += records
+    out += data
+    return bytes(out)
+
+
+class Bundle:
+    """Read-only view of a bundle file, memory-mapped and decoded on demand."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self._count, self._string_count, self._index, self._data = _header.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError('%s is not a version %d catalog bundle' % (path, VERSION))
+        self._blob = _header.size + 4 * self._string_count
+        self._cache = [None] * self._string_count
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def _span(self, n):
+        start = _u32.unpack_from(self._map, _header.size + 4 * (n - 1))[0] if n else 0
+        end = _u32.unpack_from(self._map, _header.size + 4 * n)[0]
+        return self._blob + start, self._blob + end
+
+    def _string(self, n):
+        s = self._cache[n]
+        if s is None:
+            start, end = self._span(n)
+            s = self._cache[n] = self._map[start:end].decode('utf-8')
+        return s
+
+    def _record(self, i):
+        return _record.unpack_from(self._map, self._index + i * _record.size)
+
+    def _bytes(self, n):
+        start, end = self._span(n)
+        return self._map[start:end]
+
+    def _sort_key(self, i):
+        record = self._record(i)
+        return self._bytes(record[0]), self._bytes(record[1])
+
+    def find(self, section, entry_id):
+        """Return the index record of one entry; KeyError when missing.
+
+        The record is ``(section, id, path, data offset, data length)``,
+        with strings given by their number in the string table.
+        """
+        key = section.encode('utf-8'), entry_id.encode('utf-8')
+        i = bisect.bisect_left(range(self._count), key, key=self._sort_key)
+        if i < self._count and self._sort_key(i) == key:
+            return self._record(i)
+        raise KeyError((section, entry_id))
+
+    def __contains__(self, key):
+        try:
+            self.find(*key)
+        except KeyError:
+            return False
+        return True
+
+    def keys(self):
+        """Return the ``(section, id)`` of every entry, in index order."""
+        return [(self._string(record[0]), self._string(record[1]))
+                for record in map(self._record, range(self._count))]
+
+    def path(self, section, entry_id):
+        """Return the entry's path relative to catalog/, e.g. ``apps/7zip.yaml``."""
+        return self._string(self.find(section, entry_id)[2])
+
+    def get(self, section, entry_id):
+        """Decode and return the document of one entry; KeyError when missing."""
+        _, _, _, offset, _ = self.find(section, entry_id)
+        return self._decode(self._data + offset)[0]
+
+    def _varint(self, pos):
+        n = shift = 0
+        while True:
+            b = self._map[pos]
+            pos += 1
+            n |= (b & 0x7f) << shift
+            if b < 0x80:
+                return n, pos
+            shift += 7
+
+    def _decode(self, pos):
+        tag = self._map[pos]
+        pos += 1
+        if tag == MAP:
+            count, pos = self._varint(pos)
+            value = {}
+            for _ in range(count):
+                key, pos = self._varint(pos)
+                value[self._string(key)], pos = self._decode(pos)
+            return value, pos
+        if tag == STR:
+            n, pos = self._varint(pos)
+            return self._string(n), pos
+        if tag == LIST:
+            count, pos = self._varint(pos)
+            value = []
+            for _ in range(count):
+                item, pos = self._decode(pos)
+                value.append(item)
+            return value, pos
+        if tag == INT:
+            n, pos = self._varint(pos)
+            return (n >> 1) ^ -(n & 1), pos
+        if tag == PATH:
+            count, pos = self._varint(pos)
+            segments = []
+            for _ in range(count):
+                n, pos = self._varint(pos)
+                segments.append(self._string(n))
+            return '\\'.join(segments), pos
+        if tag == FLOAT:
+            return _f64.unpack_from(self._map, pos)[0], pos + 8
+        if tag in (NULL, FALSE, TRUE):
+            return (None, False, True)[tag], pos
+        raise ValueError('bad value tag %d at offset %d' % (tag, pos - 1))
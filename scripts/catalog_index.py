@@ -0,0 +1,160 @@
+"""Rendering of catalog/index.yaml, shared by generate-index.py and catalog-cli.py.
+
+Produces the same bytes as generate-index.mjs: the rows are formatted with
+node_compat.dump_scalar and each section is sorted with locale_key, like
+``localeCompare``. The entries come from catalog_loader, so rendering on a
+warm entry cache does not parse any YAML.
+
+The same rows are also split into shards, one per section and top-level
+category (``apps/Languages``, ``tweaks/Privacy``), each cut into pages of
+at most ``PAGE_SIZE`` rows. A shard page is a small index.yaml holding
+one section. manifest.json lists every page with its row count and
+SHA-256, so a client fetches only the categories it shows and refetches
+a page only when its hash changes. catalog_loader.read_index reads
+either layout.
+"""
+import difflib, glob, hashlib, json, os, re, sys
+
+from catalog_loader import SECTIONS, catalog_dir, root
+from node_compat import dump_scalar, locale_key
+
+index_path = os.path.join(catalog_dir, 'index.yaml')
+shards_dir = os.path.join(root, 'build', 'index')
+
+SHARD_VERSION = 1
+PAGE_SIZE = 100
+UNCATEGORIZED = 'Uncategorized'
+
+HEADER = '# Auto-generated from catalog entries. Do not edit manually.\n# Run: node scripts/generate-index.mjs\n\n'
+
+
+def index_entry(subdir, relpath, content):
+    """Return the index fields for one catalog file, in generate-index.mjs order."""
+    entry_id = os.path.splitext(os.path.basename(relpath))[0]
+    entry = [('id', entry_id)]
+    # Keys missing from the file are left out, like undefined in js-yaml
+    for key in ('name', 'category', 'tags'):
+        if key in content:
+            entry.append((key, content[key]))
+    if content.get('kind'):
+        entry.append(('kind', content['kind']))
+    if content.get('profiles'):
+        entry.append(('profiles', content['profiles']))
+    if content.get('hidden'):
+        entry.append(('hidden', True))
+    # Include path when file is in a subdirectory (not flat)
+    if relpath != '%s/%s.yaml' % (subdir, entry_id):
+        entry.append(('path', relpath))
+    return entry
+
+
+def render_row(entry):
+    lines = []
+    for key, value in entry:
+        if isinstance(value, list):
+            value = '[%s]' % ', '.join(dump_scalar(item, inblock=False) for item in value)
+        else:
+            value = dump_scalar(value)
+        lines.append('%s %s: %s\n' % ('  -' if not lines else '   ', key, value))
+    return ''.join(lines)
+
+
+def index_row(entry):
+    """Return ``(sort key, row text)`` for one catalog entry."""
+    fields = index_entry(entry.section, entry.relpath, entry.data)
+    return locale_key(dict(fields).get('name')), render_row(fields)
+
+
+def sorted_rows(catalog, section):
+    """Return ``(entry, row text)`` for a section in index order."""
+    rows = []
+    for entry in catalog.sections[section]:
+        key, text = index_row(entry)
+        rows.append((key, entry, text))
+    # list.sort is stable, matching Array.prototype.sort for equal names
+    rows.sort(key=lambda row: row[0])
+    return [(entry, text) for _, entry, text in rows]
+
+
+def _render_section(section, texts):
+    if texts:
+        return '%s:\n%s' % (section, ''.join(texts))
+    return '%s: []\n' % section
+
+
+def join_index(texts):
+    """Return the index text for ``{section: [row text, ...]}`` with the rows in index order."""
+    return HEADER + ''.join(_render_section(section, texts.get(section) or ()) for section in SECTIONS)
+
+
+def render_index(catalog):
+    """Return the index text for *catalog* and the number of entries per section."""
+    texts = {section: [text for _, text in sorted_rows(catalog, section)] for section in SECTIONS}
+    return join_index(texts), {section: len(catalog.sections[section]) for section in SECTIONS}
+
+
+def shard_name(section, category, page):
+    slug = re.sub(r'[^a-z0-9]+', '-', category.lower()).strip('-') or 'other'
+    return '%s-%s%s.yaml' % (section, slug, '-%d' % page if page > 1 else '')
+
+
+def render_shards(catalog, page_size=PAGE_SIZE):
+    """Return ``{filename: text}`` for every shard page plus manifest.json."""
+    files = {}
+    shards = []
+    for section in SECTIONS:
+        groups = {}
+        for entry, text in sorted_rows(catalog, section):
+            top = entry.category.split('/')[0] if entry.category else UNCATEGORIZED
+            groups.setdefault(top, []).append(text)
+        for category in sorted(groups, key=locale_key):
+            texts = groups[category]
+            pages = -(-len(texts) // page_size)
+            for page in range(1, pages + 1):
+                chunk = texts[(page - 1) * page_size:page * page_size]
+                name = shard_name(section, category, page)
+                if name in files:
+                    # Two categories with the same slug, like "C#" and "C"
+                    name = '%s-%s.yaml' % (name[:-5], hashlib.sha1(category.encode('utf-8')).hexdigest()[:8])
+                files[name] = HEADER + _render_section(section, chunk)
+                shards.append({
+                    'section': section,
+                    'category': category,
+                    'page': page,
+                    'pages': pages,
+                    'file': name,
+                    'count': len(chunk),
+                    'sha256': hashlib.sha256(files[name].encode('utf-8')).hexdigest(),
+                })
+    manifest = {
+        'version': SHARD_VERSION,
+        'counts': {section: len(catalog.sections[section]) for section in SECTIONS},
+        'shards': shards,
+    }
+    files['manifest.json'] = json.dumps(manifest, indent=2) + '\n'
+    return files
+
+
+def write_shards(files, directory=shards_dir):
+    """Write the render_shards *files* to *directory*, removing pages that no longer exist."""
+    os.makedirs(directory, exist_ok=True)
+    for stale in glob.glob(os.path.join(directory, '*.yaml')):
+        if os.path.basename(stale) not in files:
+            os.remove(stale)
+    for name, text in files.items():
+        with open(os.path.join(directory, name), 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+
+
+def check_index(output, path=index_path):
+    """Print a diff and return False when *path* does not hold *output*."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        current = f.read()
+    if current == output:
+        print('catalog/index.yaml is up to date')
+        return True
+    sys.stdout.writelines(difflib.unified_diff(
+        current.splitlines(keepends=True), output.splitlines(keepends=True),
+        'a/catalog/index.yaml', 'b/catalog/index.yaml'))
+    print('catalog/index.yaml is out of date; run: python scripts/generate-index.py')
+    return False
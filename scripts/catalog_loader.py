@@ -0,0 +1,300 @@
+"""Parsed catalog entries shared by the Python build scripts and importers.
+
+``load_catalog`` reads catalog/{apps,fonts,tweaks}/**/*.yaml into App, Font
+and Tweak objects and indexes them by id, category, tag and profile. Each
+file is parsed once: the entries are pickled to .cache/catalog-entries.pickle
+keyed by relative path, mtime and size, so a warm run only stats the tree
+and unpickles. Changed files are re-parsed in a thread pool.
+
+Documents are parsed with node_compat.load, so values mean what they mean
+to the site build. Files that fail to parse are reported in
+``Catalog.errors`` instead of raising, for validate-catalog.py.
+
+``read_index`` builds a Catalog from the published index instead, either
+the monolithic index.yaml or the sharded layout written by
+generate-index.py (see catalog_index). Its entries only carry the index
+fields, which is what clients without the entry files have.
+"""
+import hashlib, json, os, pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+from node_compat import load, locale_key
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+catalog_dir = os.path.join(root, 'catalog')
+cache_path = os.path.join(root, '.cache', 'catalog-entries.pickle')
+
+# Bump when the entry classes or the cache layout change
+CACHE_VERSION = 1
+
+SECTIONS = ('apps', 'fonts', 'tweaks')
+
+
+def collect_files(directory):
+    results = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith('.yaml'):
+                results.append(os.path.join(dirpath, filename))
+    return results
+
+
+def walk_key(relpath):
+    """Sort key putting relative paths in ``collect_files`` order.
+
+    A directory's own files come before its subdirectories, each sorted by
+    name, as os.walk yields them.
+    """
+    parts = relpath.split('/')
+    return tuple((1, part) for part in parts[:-1]) + ((0, parts[-1]),)
+
+
+def _strings(value):
+    return tuple(v for v in value if isinstance(v, str)) if isinstance(value, list) else ()
+
+
+class Entry:
+    """Fields shared by every catalog entry.
+
+    ``id`` is the file name without .yaml, ``relpath`` the path below
+    catalog/ with forward slashes. ``name`` and ``category`` are None when
+    missing; ``tags`` and ``profiles`` are tuples of strings. ``data`` is the
+    parsed document as read.
+    """
+    __slots__ = ('id', 'relpath', 'name', 'category', 'tags', 'profiles', 'hidden', 'data')
+    section = None
+
+    def __init__(self, relpath, data):
+        self.id = os.path.splitext(os.path.basename(relpath))[0]
+        self.relpath = relpath
+        self.data = data
+        self.name = data.get('name')
+        category = data.get('category')
+        self.category = category if isinstance(category, str) else None
+        self.tags = _strings(data.get('tags'))
+        self.profiles = _strings(data.get('profiles'))
+        self.hidden = bool(data.get('hidden'))
+
+    def __repr__(self):
+        return '<%s %s>' % (type(self).__name__, self.relpath)
+
+
+class App(Entry):
+    """An app; ``kind`` is app, cli-tool, runtime or dotfile, ``links`` a dict."""
+    __slots__ = ('kind', 'links')
+    section = 'apps'
+
+    def __init__(self, relpath, data):
+        super().__init__(relpath, data)
+        self.kind = data.get('kind')
+        self.links = data.get('links') if isinstance(data.get('links'), dict) else {}
+
+
+class Font(Entry):
+    __slots__ = ('links',)
+    section = 'fonts'
+
+    def __init__(self, relpath, data):
+        super().__init__(relpath, data)
+        self.links = data.get('links') if isinstance(data.get('links'), dict) else {}
+
+
+class Tweak(Entry):
+    """A tweak; ``registry`` is a tuple of registry entry dicts, ``source`` the importer that wrote it."""
+    __slots__ = ('registry', 'source', 'script')
+    section = 'tweaks'
+
+    def __init__(self, relpath, data):
+        super().__init__(relpath, data)
+        registry = data.get('registry')
+        self.registry = tuple(e for e in registry if isinstance(e, dict)) if isinstance(registry, list) else ()
+        self.source = data.get('source')
+        self.script = data.get('script')
+
+
+ENTRY_TYPES = {'apps': App, 'fonts': Font, 'tweaks': Tweak}
+
+
+class Catalog:
+    """Loaded entries per section with lookup indexes.
+
+    ``by_category`` also files every entry under each parent of its
+    category, so ``find(category='Languages')`` includes
+    ``Languages/.NET/Runtimes``.
+    """
+
+    def __init__(self, entries, errors=None, reread=0):
+        self.errors = errors or {}
+        self.reread = reread
+        self.sections = {section: [] for section in SECTIONS}
+        self.by_id = {section: {} for section in SECTIONS}
+        self.by_category = {}
+        self.by_tag = {}
+        self.by_profile = {}
+        for entry in entries:
+            self.sections[entry.section].append(entry)
+            self.by_id[entry.section].setdefault(entry.id, entry)
+            if entry.category:
+                parts = entry.category.split('/')
+                for n in range(1, len(parts) + 1):
+                    self.by_category.setdefault('/'.join(parts[:n]), []).append(entry)
+            for tag in entry.tags:
+                self.by_tag.setdefault(tag, []).append(entry)
+            for profile in entry.profiles:
+                self.by_profile.setdefault(profile, []).append(entry)
+
+    @property
+    def apps(self):
+        return self.sections['apps']
+
+    @property
+    def fonts(self):
+        return self.sections['fonts']
+
+    @property
+    def tweaks(self):
+        return self.sections['tweaks']
+
+    def __iter__(self):
+        for section in SECTIONS:
+            yield from self.sections[section]
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.sections.values())
+
+    def get(self, entry_id, section=None):
+        for name in (section,) if section else SECTIONS:
+            entry = self.by_id[name].get(entry_id)
+            if entry is not None:
+                return entry
+        return None
+
+    def find(self, section=None, category=None, tag=None, profile=None):
+        """Return the entries matching every given filter, in catalog order."""
+        candidates = None
+        for table, key in ((self.by_category, category), (self.by_tag, tag), (self.by_profile, profile)):
+            if key is None:
+                continue
+            matches = table.get(key, ())
+            candidates = set(map(id, matches)) if candidates is None else candidates & set(map(id, matches))
+        return [entry for entry in (self.sections[section] if section else self)
+                if candidates is None or id(entry) in candidates]
+
+
+def parse_entry(job):
+    """Return ``(relpath, entry, error)`` for one file; runs in the reader pool."""
+    directory, section, relpath = job
+    try:
+        with open(os.path.join(directory, relpath), 'r', encoding='utf-8') as f:
+            data = load(f)
+    except yaml.YAMLError as e:
+        return relpath, None, 'YAML parse error: %s' % ' '.join(str(e).split())
+    except UnicodeDecodeError as e:
+        return relpath, None, 'not valid UTF-8: %s' % e
+    except OSError as e:
+        return relpath, None, 'cannot read: %s' % (e.strerror or e)
+    if not isinstance(data, dict):
+        return relpath, None, 'expected a mapping at the top level'
+    return relpath, ENTRY_TYPES[section](relpath, data), None
+
+
+def _read_cache(path, directory):
+    try:
+        with open(path, 'rb') as f:
+            cached = pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return {}
+    # One cache file serves one catalog tree
+    if cached.get('version') != CACHE_VERSION or cached.get('directory') != directory:
+        return {}
+    return cached['files']
+
+
+def load_catalog(directory=catalog_dir, cache=cache_path, sections=SECTIONS, jobs=None):
+    """Return the ``Catalog`` under *directory*; pass ``cache=None`` to ignore the cache.
+
+    ``Catalog.reread`` is the number of files that had to be parsed.
+    """
+    directory = os.path.abspath(directory)
+    if cache == cache_path and directory != catalog_dir:
+        # Other trees (copies, benchmarks) get their own file instead of evicting the main one
+        cache = '%s-%s.pickle' % (cache[:-len('.pickle')], hashlib.sha1(directory.encode('utf-8')).hexdigest()[:10])
+    cached = _read_cache(cache, directory) if cache else {}
+    files = {}
+    stale = []
+    for section in sections:
+        for filepath in collect_files(os.path.join(directory, section)):
+            relpath = os.path.relpath(filepath, directory).replace('\\', '/')
+            st = os.stat(filepath)
+            hit = cached.get(relpath)
+            if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+                files[relpath] = hit
+            else:
+                files[relpath] = (st.st_mtime_ns, st.st_size, None, None)
+                stale.append((directory, section, relpath))
+
+    if stale:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            for relpath, entry, error in pool.map(parse_entry, stale):
+                mtime, size = files[relpath][:2]
+                files[relpath] = (mtime, size, entry, error)
+        if cache:
+            # Keep entries of sections not loaded this time
+            keep = {relpath: hit for relpath, hit in cached.items()
+                    if relpath not in files and relpath.split('/', 1)[0] not in sections}
+            keep.update(files)
+            os.makedirs(os.path.dirname(cache), exist_ok=True)
+            tmp = '%s.%d.tmp' % (cache, os.getpid())
+            with open(tmp, 'wb') as f:
+                pickle.dump({'version': CACHE_VERSION, 'directory': directory, 'files': keep}, f,
+                            pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache)
+
+    return Catalog([hit[2] for hit in files.values() if hit[2] is not None],
+                   {relpath: hit[3] for relpath, hit in files.items() if hit[3]}, len(stale))
+
+
+def _index_entries(section, rows):
+    entries = []
+    for row in rows or ():
+        relpath = row.get('path') or '%s/%s.yaml' % (section, row['id'])
+        entries.append(ENTRY_TYPES[section](relpath, row))
+    return entries
+
+
+def read_index(path, sections=SECTIONS, verify=True):
+    """Return a ``Catalog`` of the index rows at *path*.
+
+    *path* is an index.yaml file or a directory with the shards'
+    manifest.json; from shards only the pages of *sections* are read. With
+    *verify* a page whose SHA-256 differs from the manifest raises
+    ValueError. Both layouts give the entries of a section in the same
+    order: by name, and entries with equal names in walk order.
+    """
+    if not os.path.isdir(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            index = load(f) or {}
+        return Catalog([entry for section in sections for entry in _index_entries(section, index.get(section))])
+
+    with open(os.path.join(path, 'manifest.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    rows = {section: [] for section in sections}
+    for shard in manifest['shards']:
+        if shard['section'] not in rows:
+            continue
+        with open(os.path.join(path, shard['file']), 'rb') as f:
+            data = f.read()
+        if verify and hashlib.sha256(data).hexdigest() != shard['sha256']:
+            raise ValueError('%s does not match its manifest hash' % shard['file'])
+        rows[shard['section']].extend((load(data) or {}).get(shard['section']) or ())
+    entries = []
+    for section in sections:
+        # Shards are grouped by category; the monolithic index is sorted by name,
+        # stably over the walk order of the files (see catalog_index.sorted_rows)
+        rows[section].sort(key=lambda row: (locale_key(str(row.get('name', ''))), walk_key(
+            row.get('path') or '%s/%s.yaml' % (section, row['id']))))
+        entries.extend(_index_entries(section, rows[section]))
+    return Catalog(entries)
@@ -0,0 +1,298 @@
+"""Catalog entry validation shared by validate-catalog.py, catalog-cli.py and the importers.
+
+The rules of validate-catalog.mjs are described once per entry kind in
+``RULES`` and compiled, together with the flattened category set from
+catalog/categories.yaml, into a ``Schema``: a tuple of small check
+functions per kind with their allowed values bound as frozensets. Checking
+a document is then one pass over that tuple with no per-call setup, so the
+importers can validate every generated tweak in memory before it is
+written.
+
+Documents are read with node_compat.load, so values mean what they mean to
+the site build (``yes`` is a string, not a boolean). ``validate_catalog``
+checks a whole catalog_loader ``Catalog``, which on a warm entry cache
+involves no YAML parsing at all.
+"""
+import json, os, sys
+from collections import namedtuple
+
+import yaml
+
+from catalog_loader import SECTIONS, catalog_dir
+from node_compat import load
+
+categories_path = os.path.join(catalog_dir, 'categories.yaml')
+
+ERROR, WARN = 'error', 'warn'
+
+Issue = namedtuple('Issue', 'level file message')
+
+# Entry kind for each top-level catalog directory
+KINDS = {'apps': 'app', 'fonts': 'font', 'tweaks': 'tweak'}
+
+APP_KINDS = ('app', 'cli-tool', 'runtime', 'dotfile')
+PROFILES = ('developer', 'power-user', 'casual', 'gamer', 'creative')
+OS = ('windows', 'linux', 'macos')
+REGISTRY_TYPES = ('dword', 'string', 'qword', 'expandstring', 'multistring', 'binary')
+
+# (rule, field, level, argument) in the order validate-catalog.mjs reports them
+RULES = {
+    'app': (
+        ('required', 'name', ERROR, None),
+        ('required', 'category', ERROR, None),
+        ('nonempty', 'tags', WARN, None),
+        ('present', 'description', WARN, None),
+        ('enum', 'kind', ERROR, APP_KINDS),
+        ('each', 'profiles', ERROR, PROFILES),
+        ('each', 'os', ERROR, OS),
+        ('category', 'category', WARN, None),
+        ('install', 'install', WARN, None),
+        ('github', 'links', WARN, None),
+    ),
+    'font': (
+        ('required', 'name', ERROR, None),
+        ('required', 'category', ERROR, None),
+        ('present', 'install', WARN, None),
+        ('category', 'category', WARN, None),
+    ),
+    'tweak': (
+        ('required', 'name', ERROR, None),
+        ('required', 'category', ERROR, None),
+        ('nonempty', 'tags', WARN, None),
+        ('present', 'description', WARN, None),
+        ('action', 'registry', ERROR, None),
+        ('registry', 'registry', ERROR, REGISTRY_TYPES),
+        ('category', 'category', WARN, None),
+        ('each', 'profiles', ERROR, PROFILES),
+    ),
+}
+
+
+def flatten_categories(tree, prefix=''):
+    """Return every category path in the categories.yaml *tree*, like ``Languages/.NET/Runtimes``."""
+    result = set()
+    for key, value in (tree or {}).items():
+        full = '%s/%s' % (prefix, key) if prefix else str(key)
+        result.add(full)
+        if isinstance(value, dict) and value.get('children'):
+            result |= flatten_categories(value['children'], full)
+    return result
+
+
+def _nonempty(value):
+    # JavaScript's `!value?.length`: only strings and arrays have a length
+    return isinstance(value, (str, list)) and len(value) > 0
+
+
+def _compile_rule(rule, field, level, arg, categories):
+    if rule == 'required':
+        message = 'missing required field: %s' % field
+
+        def check(content, add):
+            if not content.get(field):
+                add(level, message)
+    elif rule == 'present':
+        message = 'missing: %s' % field
+
+        def check(content, add):
+            if not content.get(field):
+                add(level, message)
+    elif rule == 'nonempty':
+        message = 'missing or empty: %s' % field
+
+        def check(content, add):
+            if not _nonempty(content.get(field)):
+                add(level, message)
+    elif rule == 'enum':
+        allowed = frozenset(arg)
+        valid = ', '.join(arg)
+
+        def check(content, add):
+            value = content.get(field)
+            if value and value not in allowed:
+                add(level, "invalid %s: '%s' (valid: %s)" % (field, value, valid))
+    elif rule == 'each':
+        allowed = frozenset(arg)
+        singular = field[:-1] if field.endswith('s') else field
+
+        def check(content, add):
+            values = content.get(field)
+            if not values:
+                return
+            if not isinstance(values, list):
+                add(level, '%s must be a list' % field)
+                return
+            for value in values:
+                if value not in allowed:
+                    add(level, "invalid %s: '%s'" % (singular, value))
+    elif rule == 'category':
+        def check(content, add):
+            value = content.get(field)
+            if value and value not in categories:
+                add(level, "category '%s' not in categories.yaml" % value)
+    elif rule == 'install':
+        def check(content, add):
+            if content.get('kind') != 'dotfile' and not content.get(field):
+                add(level, 'non-dotfile app has no install section')
+    elif rule == 'github':
+        def check(content, add):
+            links = content.get(field)
+            github = links.get('github') if isinstance(links, dict) else None
+            if github and not (isinstance(github, str) and github.startswith('https://github.com/')):
+                add(level, "suspicious github link: '%s'" % github)
+    elif rule == 'action':
+        def check(content, add):
+            if not _nonempty(content.get(field)) and not content.get('script'):
+                add(level, 'tweak must have registry entries or a script')
+    elif rule == 'registry':
+        types = frozenset(arg)
+
+        def check(content, add):
+            entries = content.get(field)
+            if not isinstance(entries, list):
+                return
+            for entry in entries:
+                if not isinstance(entry, dict):
+                    add(level, 'registry entry must be a mapping')
+                    continue
+                if not entry.get('key'):
+                    add(level, 'registry entry missing: key')
+                # A null name is the key's default value; only a missing one is an error
+                if 'name' not in entry:
+                    add(level, 'registry entry missing: name')
+                if entry.get('type') and entry['type'] not in types:
+                    add(level, "invalid registry type: '%s'" % entry['type'])
+    else:
+        raise ValueError('unknown rule %r' % rule)
+    return check
+
+
+class Schema:
+    """The compiled rules for every entry kind."""
+
+    def __init__(self, categories, rules=RULES):
+        self.categories = frozenset(categories)
+        self.checks = {kind: tuple(_compile_rule(rule, field, level, arg, self.categories)
+                                   for rule, field, level, arg in kind_rules)
+                       for kind, kind_rules in rules.items()}
+
+    @classmethod
+    def load(cls, path=categories_path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(flatten_categories(load(f)))
+
+    def validate(self, kind, relpath, content):
+        """Return the issues with the parsed document *content* of kind *kind*."""
+        issues = []
+
+        def add(level, message):
+            issues.append(Issue(level, relpath, message))
+
+        if not isinstance(content, dict):
+            add(ERROR, 'expected a mapping at the top level')
+            return issues
+        for check in self.checks[kind]:
+            check(content, add)
+        return issues
+
+    def validate_text(self, kind, relpath, text):
+        """Parse and validate one document; *text* may be a string or an open file."""
+        try:
+            content = load(text)
+        except yaml.YAMLError as e:
+            return [Issue(ERROR, relpath, 'YAML parse error: %s' % ' '.join(str(e).split()))]
+        return self.validate(kind, relpath, content)
+
+    def validate_file(self, relpath, directory=catalog_dir):
+        """Validate ``directory/relpath``, choosing the kind from its top-level directory."""
+        kind = KINDS[relpath.split('/', 1)[0]]
+        with open(os.path.join(directory, relpath), 'r', encoding='utf-8') as f:
+            return self.validate_text(kind, relpath, f)
+
+
+def duplicate_ids(catalog):
+    issues = []
+    for section in SECTIONS:
+        seen = {}
+        for entry in catalog.sections[section]:
+            if entry.id in seen:
+                issues.append(Issue(ERROR, entry.relpath, "duplicate %s id '%s' (also at %s)" % (
+                    KINDS[section], entry.id, seen[entry.id])))
+            seen[entry.id] = entry.relpath
+    return issues
+
+
+def index_issues(catalog, path):
+    """Compare *catalog* with the index.yaml at *path*."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = load(f) or {}
+        issues = []
+        for section, kind in KINDS.items():
+            file_ids = {entry.id for entry in catalog.sections[section]}
+            index_ids = {entry['id'] for entry in index.get(section) or []}
+            for entry in index.get(section) or []:
+                if entry['id'] not in file_ids:
+                    issues.append(Issue(ERROR, 'index.yaml', "%s '%s' in index but no file found" % (kind, entry['id'])))
+            for entry_id in sorted(file_ids - index_ids):
+                issues.append(Issue(WARN, 'index.yaml', "%s file '%s' exists but missing from index" % (kind, entry_id)))
+        return issues
+    except Exception as e:
+        return [Issue(ERROR, 'index.yaml', 'failed to validate index: %s' % e)]
+
+
+def validate_catalog(catalog, schema, index_path=None):
+    """Return every issue in *catalog*, plus its mismatches with *index_path* when given."""
+    issues = duplicate_ids(catalog)
+    for entry in catalog:
+        issues.extend(schema.validate(KINDS[entry.section], entry.relpath, entry.data))
+    for relpath, message in catalog.errors.items():
+        issues.append(Issue(ERROR, relpath, message))
+    if index_path:
+        issues.extend(index_issues(catalog, index_path))
+    return issues
+
+
+def errors(issues):
+    return [issue for issue in issues if issue.level == ERROR]
+
+
+def format_issue(issue):
+    return '  %-6s %s: %s' % ('ERROR' if issue.level == ERROR else 'WARN', issue.file, issue.message)
+
+
+def check_generated(issues):
+    """Print *issues* found in generated documents; return True when none of them is an error.
+
+    Importers call this before committing their batch, so a tweak the site
+    build would reject is never written.
+    """
+    for issue in issues:
+        print(format_issue(issue), file=sys.stderr)
+    if errors(issues):
+        print('Refusing to write: %d generated documents have errors' % len({issue.file for issue in errors(issues)}),
+              file=sys.stderr)
+        return False
+    return True
+
+
+def report(issues, catalog, elapsed, fmt):
+    """Print *issues* as text or JSON; return the number of errors."""
+    error_count = sum(1 for issue in issues if issue.level == ERROR)
+    counts = {section: len(entries) for section, entries in catalog.sections.items()}
+    if fmt == 'json':
+        json.dump({
+            'files': counts,
+            'errors': error_count,
+            'warnings': len(issues) - error_count,
+            'issues': [issue._asdict() for issue in issues],
+        }, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        print('Validating catalog...\n')
+        for issue in issues:
+            print(format_issue(issue), file=sys.stderr)
+        print('\nValidated: %d apps, %d fonts, %d tweaks in %.0f ms' % (
+            counts['apps'], counts['fonts'], counts['tweaks'], elapsed * 1000))
+        print('Results: %d errors, %d warnings' % (error_count, len(issues) - error_count))
+    return error_count
@@ -0,0 +1,342 @@
+"""File watching and an in-memory catalog for watch-catalog.py.
+
+``open_watcher`` returns an inotify watcher on Linux (through ctypes, no
+extra dependency) and a polling one elsewhere or with ``poll=True``. Both
+report paths relative to the catalog directory; ``changes`` groups them
+into debounced batches, so an editor's save or a ``git checkout`` comes
+through as one set.
+
+``LiveCatalog`` keeps every entry, its index row and its issues in memory
+and applies a batch by parsing only the files that changed. The index
+rows stay sorted as generate-index.py sorts them, so the rendered text is
+byte-identical to a full run. A changed categories.yaml reloads the
+schema and re-checks every entry, without parsing any of them.
+"""
+import bisect, ctypes, ctypes.util, errno, os, select, struct, sys, time
+
+import yaml
+
+from catalog_index import index_row, join_index
+from catalog_loader import SECTIONS, catalog_dir, collect_files, load_catalog, parse_entry, walk_key
+from catalog_validator import ERROR, KINDS, Issue, Schema
+
+CATEGORIES = 'categories.yaml'
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+
+_event = struct.Struct('iIII')
+
+
+def relevant(relpath):
+    """True for the paths whose changes affect the index or the validation results."""
+    return relpath == CATEGORIES or relpath.split('/', 1)[0] in SECTIONS
+
+
+class InotifyWatcher:
+    """Report changes below *directory* through inotify, one watch per directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1: %s' % os.strerror(ctypes.get_errno()))
+        self.watches = {}
+        self._add_tree('')
+
+    def _add(self, relpath):
+        path = os.path.join(self.directory, relpath)
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            if code in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(code, 'inotify_add_watch %s: %s' % (path, os.strerror(code)))
+        self.watches[wd] = relpath
+
+    def _add_tree(self, relpath):
+        """Watch *relpath* and every directory below it; top level only sections."""
+        top = os.path.join(self.directory, relpath) if relpath else self.directory
+        self._add(relpath)
+        for dirpath, dirnames, _ in os.walk(top):
+            if dirpath == self.directory:
+                dirnames[:] = [name for name in dirnames if name in SECTIONS]
+            for name in dirnames:
+                self._add(os.path.relpath(os.path.join(dirpath, name), self.directory).replace('\\', '/'))
+
+    def _forget(self, relpath):
+        """Drop the watches on *relpath* and below after it moved away."""
+        for wd, path in list(self.watches.items()):
+            if path == relpath or path.startswith(relpath + '/'):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.watches[wd]
+
+    def read(self, timeout=None):
+        """Return the relative paths changed within *timeout* seconds (None waits for the first)."""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _event.unpack_from(data, offset)
+            name = data[offset + _event.size:offset + _event.size + length].rstrip(b'\0')
+            offset += _event.size + length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; the caller rescans everything
+                changed.add('')
+                continue
+            parent = self.watches.get(wd)
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            if parent is None or not name:
+                continue
+            relpath = '%s/%s' % (parent, os.fsdecode(name)) if parent else os.fsdecode(name)
+            if not relevant(relpath):
+                continue
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_tree(relpath)
+                elif mask & IN_MOVED_FROM:
+                    self._forget(relpath)
+                changed.add(relpath)
+            elif relpath.endswith('.yaml'):
+                changed.add(relpath)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Report changes below *directory* by comparing mtimes and sizes every *interval* seconds."""
+
+    def __init__(self, directory, interval=0.5):
+        self.directory = directory
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        files = {}
+        for name in (CATEGORIES,) + SECTIONS:
+            path = os.path.join(self.directory, name)
+            for filepath in collect_files(path) if name in SECTIONS else (path,):
+                try:
+                    st = os.stat(filepath)
+                except FileNotFoundError:
+                    continue
+                files[os.path.relpath(filepath, self.directory).replace('\\', '/')] = (st.st_mtime_ns, st.st_size)
+        return files
+
+    def read(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = self.interval if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return set()
+            time.sleep(min(self.interval, remaining))
+            snapshot = self._scan()
+            changed = {relpath for relpath in snapshot.keys() | self.snapshot.keys()
+                       if snapshot.get(relpath) != self.snapshot.get(relpath)}
+            self.snapshot = snapshot
+            if changed:
+                return changed
+
+    def close(self):
+        pass
+
+
+def open_watcher(directory=catalog_dir, poll=False, interval=0.5):
+    """Return an inotify watcher where available, else a polling one."""
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError):
+            # No inotify in this libc, or out of watches
+            pass
+    return PollingWatcher(directory, interval)
+
+
+def changes(watcher, debounce=0.1):
+    """Yield sets of changed paths, each one collected until *debounce* seconds pass without events."""
+    while True:
+        batch = watcher.read()
+        while batch:
+            more = watcher.read(debounce)
+            if not more:
+                break
+            batch |= more
+        if batch:
+            yield batch
+
+
+class LiveCatalog:
+    """Entries, index rows and issues of a catalog, updated file by file.
+
+    ``files`` maps each relative path to ``(mtime_ns, size)``, ``entries``
+    to its parsed Entry, ``issues`` to its schema issues or parse error.
+    ``rows`` holds one sorted list of ``(sort key, walk key, relpath)`` per
+    section and ``texts`` the rendered row of every indexed entry; entries
+    that cannot be indexed have an error in ``unindexed`` instead.
+    """
+
+    def __init__(self, directory=catalog_dir):
+        self.directory = os.path.abspath(directory)
+        self.schema = Schema.load(os.path.join(self.directory, CATEGORIES))
+        self.files = {}
+        self.entries = {}
+        self.issues = {}
+        self.rows = {section: [] for section in SECTIONS}
+        self.texts = {}
+        self.keys = {}
+        self.unindexed = {}
+        self.categories_error = None
+        self.ids = {section: {} for section in SECTIONS}
+        catalog = load_catalog(self.directory)
+        for entry in catalog:
+            self._stat(entry.relpath)
+            self._set(entry.relpath, entry, None)
+        for relpath, error in catalog.errors.items():
+            self._stat(relpath)
+            self._set(relpath, None, error)
+
+    def _stat(self, relpath):
+        try:
+            st = os.stat(os.path.join(self.directory, relpath))
+        except FileNotFoundError:
+            return None
+        self.files[relpath] = (st.st_mtime_ns, st.st_size)
+        return self.files[relpath]
+
+    def _unset(self, relpath):
+        entry = self.entries.pop(relpath, None)
+        self.issues.pop(relpath, None)
+        self.unindexed.pop(relpath, None)
+        if relpath in self.keys:
+            rows = self.rows[relpath.split('/', 1)[0]]
+            del rows[bisect.bisect_left(rows, self.keys.pop(relpath))]
+            del self.texts[relpath]
+        if entry is not None:
+            paths = self.ids[entry.section][entry.id]
+            paths.discard(relpath)
+            if not paths:
+                del self.ids[entry.section][entry.id]
+
+    def _set(self, relpath, entry, error):
+        self._unset(relpath)
+        if entry is None:
+            self.issues[relpath] = [Issue(ERROR, relpath, error)]
+            return
+        self.entries[relpath] = entry
+        self.ids[entry.section].setdefault(entry.id, set()).add(relpath)
+        self.issues[relpath] = self.schema.validate(KINDS[entry.section], relpath, entry.data)
+        try:
+            sort_key, text = index_row(entry)
+        except (TypeError, ValueError) as e:
+            # generate-index.py would stop here; keep watching and leave the row out
+            self.unindexed[relpath] = Issue(ERROR, relpath, 'cannot index: %s' % e)
+            return
+        key = (sort_key, walk_key(relpath), relpath)
+        bisect.insort(self.rows[entry.section], key)
+        self.keys[relpath] = key
+        self.texts[relpath] = text
+
+    def _expand(self, paths):
+        """Return the entry files to look at for the changed *paths*; '' means all of them."""
+        files = set()
+        for path in paths:
+            if path == CATEGORIES or (path and not relevant(path)):
+                continue
+            # Known files below a removed or renamed directory are gone now
+            prefix = path + '/' if path else ''
+            files.update(relpath for relpath in self.files if relpath.startswith(prefix) or relpath == path)
+            if not path:
+                tops = [os.path.join(self.directory, section) for section in SECTIONS]
+            elif os.path.isdir(os.path.join(self.directory, path)):
+                tops = [os.path.join(self.directory, path)]
+            else:
+                tops = []
+                if path.endswith('.yaml'):
+                    files.add(path)
+            for top in tops:
+                files.update(os.path.relpath(filepath, self.directory).replace('\\', '/')
+                             for filepath in collect_files(top))
+        return files
+
+    def update(self, paths):
+        """Apply the changed *paths*; return ``(changed relpaths, categories reloaded)``."""
+        changed = []
+        for relpath in sorted(self._expand(paths), key=walk_key):
+            old = self.files.get(relpath)
+            new = self._stat(relpath)
+            if new is None:
+                if old is not None:
+                    del self.files[relpath]
+                    self._unset(relpath)
+                    changed.append(relpath)
+                continue
+            if new == old:
+                continue
+            _, entry, error = parse_entry((self.directory, relpath.split('/', 1)[0], relpath))
+            self._set(relpath, entry, error)
+            changed.append(relpath)
+
+        reloaded = CATEGORIES in paths or '' in paths
+        if reloaded:
+            try:
+                schema = Schema.load(os.path.join(self.directory, CATEGORIES))
+            except (OSError, yaml.YAMLError) as e:
+                # Keep checking against the last categories that loaded
+                self.categories_error = Issue(ERROR, CATEGORIES, ' '.join(str(e).split()))
+                return changed, False
+            self.schema = schema
+            self.categories_error = None
+            for relpath, entry in self.entries.items():
+                self.issues[relpath] = schema.validate(KINDS[entry.section], relpath, entry.data)
+        return changed, reloaded
+
+    def duplicate_issues(self):
+        """The duplicate-id errors, worded and ordered as catalog_validator.duplicate_ids reports them."""
+        issues = []
+        for section in SECTIONS:
+            for entry_id, paths in self.ids[section].items():
+                if len(paths) < 2:
+                    continue
+                ordered = sorted(paths, key=walk_key)
+                for previous, relpath in zip(ordered, ordered[1:]):
+                    issues.append(Issue(ERROR, relpath, "duplicate %s id '%s' (also at %s)" % (
+                        KINDS[section], entry_id, previous)))
+        return issues
+
+    def file_issues(self, relpath):
+        issues = list(self.issues.get(relpath, ()))
+        if relpath in self.unindexed:
+            issues.append(self.unindexed[relpath])
+        return issues
+
+    def all_issues(self):
+        issues = [self.categories_error] if self.categories_error else []
+        issues.extend(self.duplicate_issues())
+        for relpath in sorted(self.issues, key=walk_key):
+            issues.extend(self.file_issues(relpath))
+        return issues
+
+    def render_index(self):
+        return join_index({section: [self.texts[key[2]] for key in self.rows[section]] for section in SECTIONS})
+
+    def counts(self):
+        return {section: len(self.rows[section]) for section in SECTIONS}
@@ -0,0 +1,137 @@
+"""Buffered, atomic output layer for generated catalog files.
+
+Importers hand rendered documents to a ``BatchWriter`` instead of opening
+files themselves. Each document is compared with the file on disk as it
+arrives; one that differs goes straight to a temporary file next to its
+target, so the writer only keeps paths and memory stays flat however many
+files an import produces. ``commit()`` then renames the staged files into
+place, so an interrupted run never leaves a half-written YAML behind, and
+``abort()`` (or leaving the ``with`` block without committing) removes
+them. In dry-run mode documents are staged outside the tree and
+``commit()`` prints a unified diff instead.
+"""
+import difflib, os, shutil, sys, tempfile
+
+# mkstemp creates files as 0600; give staged files the usual permissions
+_umask = os.umask(0)
+os.umask(_umask)
+
+
+class BatchWriter:
+    def __init__(self, root, dry_run=False):
+        self.root = root
+        self.dry_run = dry_run
+        # relpath -> (temporary file, size), or None when the file already matches
+        self.staged = {}
+        self.removals = set()
+        self._scratch = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.abort()
+
+    def _stage_dir(self, target):
+        if self.dry_run:
+            if self._scratch is None:
+                self._scratch = tempfile.mkdtemp(prefix='batch-writer-')
+            return self._scratch
+        directory = os.path.dirname(target)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def _discard(self, relpath):
+        staged = self.staged.pop(relpath, None)
+        if staged:
+            os.remove(staged[0])
+
+    def write(self, relpath, text):
+        """Stage *text* for ``root/relpath``; later writes to the same path win."""
+        data = text.encode('utf-8')
+        self._discard(relpath)
+        self.removals.discard(relpath)
+        if self._read(relpath) == data:
+            self.staged[relpath] = None
+            return
+        target = os.path.join(self.root, relpath)
+        fd, tmp = tempfile.mkstemp(dir=self._stage_dir(target), prefix='.%s.' % os.path.basename(target),
+                                   suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.chmod(tmp, 0o666 & ~_umask)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self.staged[relpath] = (tmp, len(data))
+
+    def remove(self, relpath):
+        self._discard(relpath)
+        self.removals.add(relpath)
+
+    def _read(self, relpath):
+        try:
+            with open(os.path.join(self.root, relpath), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _diff(self, relpath, old, new):
+        old_lines = old.decode('utf-8').splitlines(keepends=True) if old is not None else []
+        new_lines = new.decode('utf-8').splitlines(keepends=True) if new is not None else []
+        sys.stdout.writelines(difflib.unified_diff(
+            old_lines, new_lines,
+            'a/%s' % relpath if old is not None else '/dev/null',
+            'b/%s' % relpath if new is not None else '/dev/null'))
+
+    def commit(self):
+        """Move the staged files into place and return counts of files and bytes touched."""
+        stats = {'written': 0, 'unchanged': 0, 'removed': 0, 'bytes': 0}
+        changed = []
+        for relpath, staged in sorted(self.staged.items()):
+            if staged is None:
+                stats['unchanged'] += 1
+                continue
+            tmp, size = staged
+            changed.append((relpath, tmp))
+            stats['written'] += 1
+            stats['bytes'] += size
+            if self.dry_run:
+                with open(tmp, 'rb') as f:
+                    self._diff(relpath, self._read(relpath), f.read())
+
+        removed = []
+        for relpath in sorted(self.removals):
+            old = self._read(relpath)
+            if old is None:
+                continue
+            removed.append(relpath)
+            stats['removed'] += 1
+            if self.dry_run:
+                self._diff(relpath, old, None)
+
+        if not self.dry_run:
+            for relpath, tmp in changed:
+                os.replace(tmp, os.path.join(self.root, relpath))
+                del self.staged[relpath]
+            for relpath in removed:
+                os.remove(os.path.join(self.root, relpath))
+        self.abort()
+        return stats
+
+    def abort(self):
+        """Drop everything staged since the last commit, removing its temporary files."""
+        for staged in self.staged.values():
+            if staged and os.path.exists(staged[0]):
+                os.remove(staged[0])
+        self.staged = {}
+        self.removals = set()
+        if self._scratch is not None:
+            shutil.rmtree(self._scratch, ignore_errors=True)
+            self._scratch = None
+
+
+def summary(stats, dry_run=False):
+    return '%s %d files (%d bytes), removed %d, unchanged %d' % (
+        'Would write' if dry_run else 'Wrote', stats['written'], stats['bytes'], stats['removed'], stats['unchanged'])
@@ -0,0 +1,95 @@
+"""Report registry values written by more than one catalog tweak.
+
+Builds an inverted index from (hive\\key, value name) to the tweaks writing
+it in a single pass over catalog/tweaks, then reports:
+
+  conflicts   tweaks writing the same value with different data or types
+  duplicates  tweaks writing exactly the same data
+
+Conflicts listed in catalog/metadata/registry-conflicts.yaml, with exactly
+the tweaks writing them, are reported as accepted. Exits non-zero when
+other conflicts are found, or on duplicates too with --strict.
+"""
+import argparse, os, sys
+
+from catalog_loader import catalog_dir, load_catalog
+from node_compat import load
+from registry import comparable, fingerprint
+
+baseline_path = os.path.join(catalog_dir, 'metadata', 'registry-conflicts.yaml')
+
+
+def build_effects(tweaks):
+    """Map each registry fingerprint to its ``(tweak, (type, value))`` writers.
+
+    Also returns the key and name as first spelled in the catalog, for display.
+    """
+    effects = {}
+    labels = {}
+    for tweak in tweaks:
+        for entry in tweak.registry:
+            if not entry.get('key'):
+                continue
+            name = entry.get('name')
+            fp = fingerprint(entry['key'], name)
+            effects.setdefault(fp, []).append((tweak, comparable(entry)))
+            labels.setdefault(fp, '%s\\%s' % (entry['key'], '(Default)' if name is None or name == '' else name))
+    return effects, labels
+
+
+def load_baseline(path=baseline_path):
+    """Return ``{fingerprint: set of tweak ids}`` for the accepted conflicts in *path*."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            accepted = load(f) or []
+    except FileNotFoundError:
+        return {}
+    baseline = {}
+    for item in accepted:
+        key, _, name = item['value'].rpartition('\\')
+        baseline[fingerprint(key, None if name == '(Default)' else name)] = set(item['tweaks'])
+    return baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--strict', action='store_true', help='fail on exact duplicates as well')
+    parser.add_argument('--baseline', default=baseline_path,
+                        help='accepted conflicts (default: catalog/metadata/registry-conflicts.yaml)')
+    args = parser.parse_args()
+
+    catalog = load_catalog(sections=('tweaks',))
+    for relpath, error in sorted(catalog.errors.items()):
+        print('  ERROR  %s: %s' % (relpath, error))
+    effects, labels = build_effects(catalog.tweaks)
+    baseline = load_baseline(args.baseline)
+
+    conflicts = 0
+    accepted = 0
+    duplicates = 0
+    for fp, writers in sorted(effects.items()):
+        if len(writers) < 2:
+            continue
+        label = labels[fp]
+        if len({data for _, data in writers}) > 1:
+            ok = baseline.get(fp) == {tweak.id for tweak, _ in writers}
+            if ok:
+                accepted += 1
+            else:
+                conflicts += 1
+            print('  %-6s %s: conflicting writes%s' % ('OK' if ok else 'ERROR', label, ' (accepted)' if ok else ''))
+            for tweak, (rtype, value) in writers:
+                print('           %s = %r (%s)' % (tweak.relpath, value, rtype))
+        elif len({tweak.id for tweak, _ in writers}) > 1:
+            duplicates += 1
+            rtype, value = writers[0][1]
+            print('  WARN   %s = %r (%s) also written by: %s' % (
+                label, value, rtype, ', '.join(tweak.relpath for tweak, _ in writers)))
+
+    print('\nChecked %d tweaks, %d registry values' % (len(catalog.tweaks), len(effects)))
+    print('Results: %d conflicts, %d accepted, %d duplicates' % (conflicts, accepted, duplicates))
+    sys.exit(1 if conflicts or catalog.errors or (args.strict and duplicates) else 0)
+
+
+if __name__ == '__main__':
+    main()
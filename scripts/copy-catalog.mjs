@@ -1,4 +1,4 @@
-import { cpSync } from 'node:fs';
+import { cpSync, existsSync } from 'node:fs';
 import { resolve } from 'node:path';
 
 const src = resolve('catalog');
@@ -6,3 +6,24 @@ const dest = resolve('dist', 'catalog');
 
 cpSync(src, dest, { recursive: true });
 console.log('Copied catalog/ to dist/catalog/');
+
+// Binary bundle built by scripts/build-bundle.py, for Perch clients
+const bundle = resolve('build', 'catalog.bundle');
+if (existsSync(bundle)) {
+  cpSync(bundle, resolve(dest, 'catalog.bundle'));
+  console.log('Copied build/catalog.bundle to dist/catalog/');
+}
+
+// Per-category index shards and manifest.json written by scripts/generate-index.py
+const shards = resolve('build', 'index');
+if (existsSync(shards)) {
+  cpSync(shards, resolve(dest, 'index'), { recursive: true });
+  console.log('Copied build/index/ to dist/catalog/index/');
+}
+
+// Per-profile .reg bundles written by scripts/build-reg-bundles.py
+const reg = resolve('build', 'reg');
+if (existsSync(reg)) {
+  cpSync(reg, resolve(dest, 'reg'), { recursive: true });
+  console.log('Copied build/reg/ to dist/catalog/reg/');
+}
@@ -0,0 +1,88 @@
+"""Duplicate-detection index over catalog/tweaks.
+
+Built once from the real ``catalog/tweaks/**/*.yaml`` files and holds the
+normalized names, slugs, topics (names without a leading verb such as
+"Disable") and a fingerprint of the set of registry (key, value name)
+pairs of every tweak. Importers ask it whether a candidate is already
+covered with one dict lookup per key instead of scanning keyword lists.
+
+The tweaks come from catalog_loader, whose entry cache makes building the
+index on a warm run a matter of milliseconds.
+"""
+import os, re
+
+from catalog_loader import cache_path, catalog_dir, load_catalog
+from registry import fingerprint
+
+tweaks_dir = os.path.join(catalog_dir, 'tweaks')
+_verbs = {'add', 'allow', 'disable', 'enable', 'hide', 'prevent', 'remove', 'set', 'show', 'turn'}
+
+
+def normalize_name(name):
+    s = re.sub(r'[^a-z0-9]+', '-', name.lower())
+    return s.strip('-')
+
+
+def topic(name):
+    words = normalize_name(name).split('-')
+    while len(words) > 1 and words[0] in _verbs:
+        words.pop(0)
+    return '-'.join(words)
+
+
+def registry_fingerprint(registry):
+    """Return one string identifying the set of ``(key, value name)`` pairs."""
+    return '\n'.join(sorted({'\\'.join(fingerprint(key, name)) for key, name in registry}))
+
+
+class DedupIndex:
+    """Maps each normalized key to the ``[id, source]`` pairs that own it."""
+
+    def __init__(self):
+        self.slugs = {}
+        self.names = {}
+        self.topics = {}
+        self.fingerprints = {}
+
+    def add(self, tweak_id, source, name, registry):
+        owner = [tweak_id, source]
+        self.slugs.setdefault(tweak_id, []).append(owner)
+        if name:
+            self.names.setdefault(normalize_name(name), []).append(owner)
+            self.topics.setdefault(topic(name), []).append(owner)
+        if registry:
+            self.fingerprints.setdefault(registry_fingerprint(registry), []).append(owner)
+
+    def find(self, name, registry=(), source=None):
+        """Return the id of a catalog tweak covering the same ground, or None.
+
+        Tweaks whose ``source`` equals *source* are ignored, so an importer
+        does not treat its own earlier output as a duplicate.
+        """
+        candidates = [
+            (self.slugs, normalize_name(name)),
+            (self.names, normalize_name(name)),
+            (self.topics, topic(name)),
+        ]
+        if registry:
+            candidates.append((self.fingerprints, registry_fingerprint(registry)))
+        for table, key in candidates:
+            for tweak_id, owner_source in table.get(key, ()):
+                if source is None or owner_source != source:
+                    return tweak_id
+        return None
+
+
+def build_index(tweaks):
+    """Return the index over the catalog_loader ``Tweak`` entries *tweaks*."""
+    index = DedupIndex()
+    for tweak in tweaks:
+        registry = [(entry.get('key', ''), entry.get('name')) for entry in tweak.registry if entry.get('key')]
+        index.add(tweak.id, tweak.source, tweak.name if isinstance(tweak.name, str) else '', registry)
+    return index
+
+
+def load_index(directory=tweaks_dir, cache=cache_path):
+    """Return the index for the tweaks under *directory*."""
+    catalog = load_catalog(os.path.dirname(directory), cache, sections=(os.path.basename(directory),))
+    return build_index(catalog.tweaks)
@@ -0,0 +1,247 @@
+"""Show the registry values a catalog change adds, removes or changes.
+
+Compares the registry effects of catalog/tweaks at two git revisions, or at
+a revision and the working tree. Each side is one pass over ``git ls-tree``:
+every tweak blob contributes (hive\\key, value name) -> (type, value,
+default-value) effects, so renames, reordering and YAML formatting do not
+show up, only values that would be written differently.
+
+    python scripts/diff-registry.py                  # HEAD vs working tree
+    python scripts/diff-registry.py HEAD~3 HEAD
+    python scripts/diff-registry.py --log v1..HEAD   # each commit in turn
+
+Blob effects are cached by git object id in .cache/registry-blobs.pickle,
+so a blob is parsed once however many revisions contain it; blobs missing
+from the cache are read with a single ``git cat-file --batch``.
+"""
+import argparse, hashlib, json, os, pickle, subprocess, sys
+
+import yaml
+
+from catalog_loader import catalog_dir, collect_files, root
+from node_compat import load
+from registry import comparable_value, fingerprint
+
+tweaks_dir = os.path.join(catalog_dir, 'tweaks')
+blob_cache_path = os.path.join(root, '.cache', 'registry-blobs.pickle')
+tweaks_path = os.path.relpath(tweaks_dir, root).replace('\\', '/')
+catalog_prefix = tweaks_path.rsplit('/', 1)[0] + '/'
+
+# Bump when the cached effect tuples change
+CACHE_VERSION = 2
+
+
+def git(*args, stdin=None):
+    result = subprocess.run(('git', '-C', root) + args, input=stdin, capture_output=True)
+    if result.returncode:
+        raise SystemExit('git %s: %s' % (' '.join(args), result.stderr.decode('utf-8', 'replace').strip()))
+    return result.stdout
+
+
+def blob_id(data):
+    """Return the git object id of a blob holding *data*."""
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+def blob_effects(data):
+    """Return ``(effects, error)`` for one tweak file's bytes.
+
+    Each effect is ``(fingerprint, label, (type, value, default))``.
+    """
+    try:
+        content = load(data.decode('utf-8'))
+    except (UnicodeDecodeError, yaml.YAMLError) as e:
+        return (), ' '.join(str(e).split())
+    registry = content.get('registry') if isinstance(content, dict) else None
+    effects = []
+    for entry in registry if isinstance(registry, list) else ():
+        if not isinstance(entry, dict) or not entry.get('key'):
+            continue
+        rtype = (entry.get('type') or 'dword').lower()
+        written = (rtype, comparable_value(rtype, entry.get('value')),
+                   comparable_value(rtype, entry.get('default-value')))
+        name = entry.get('name')
+        effects.append((fingerprint(entry['key'], name),
+                        '%s\\%s' % (entry['key'], '(Default)' if name is None or name == '' else name), written))
+    return tuple(effects), None
+
+
+class BlobCache:
+    """Blob effects by object id, persisted between runs."""
+
+    def __init__(self, path=blob_cache_path):
+        self.path = path
+        self.blobs = {}
+        self.parsed = 0
+        self.hits = 0
+        if path:
+            try:
+                with open(path, 'rb') as f:
+                    cached = pickle.load(f)
+                if cached.get('version') == CACHE_VERSION:
+                    self.blobs = cached['blobs']
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+                pass
+
+    def add(self, oid, data):
+        self.blobs[oid] = blob_effects(data)
+        self.parsed += 1
+
+    def fetch(self, oids):
+        """Parse the blobs in *oids* that are not cached yet, reading them in one git call."""
+        missing = sorted({oid for oid in oids if oid not in self.blobs})
+        self.hits += len(oids) - len(missing)
+        if not missing:
+            return
+        out = git('cat-file', '--batch', stdin=''.join(oid + '\n' for oid in missing).encode('ascii'))
+        pos = 0
+        for oid in missing:
+            end = out.index(b'\n', pos)
+            header = out[pos:end].split()
+            size = int(header[2])
+            self.add(oid, out[end + 1:end + 1 + size])
+            pos = end + 1 + size + 1
+
+    def save(self):
+        if not self.path or not self.parsed:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = '%s.%d.tmp' % (self.path, os.getpid())
+        with open(tmp, 'wb') as f:
+            pickle.dump({'version': CACHE_VERSION, 'blobs': self.blobs}, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+
+def tree_blobs(rev):
+    """Return ``[(relpath, oid)]`` for the tweak files at *rev*; ``None`` is the empty tree."""
+    if rev is None:
+        return []
+    out = git('ls-tree', '-r', '-z', '--full-tree', rev, '--', tweaks_path)
+    blobs = []
+    for record in out.split(b'\0'):
+        if not record:
+            continue
+        meta, _, path = record.decode('utf-8').partition('\t')
+        _, kind, oid = meta.split()
+        if kind == 'blob' and path.endswith('.yaml'):
+            blobs.append((path[len(catalog_prefix):], oid))
+    return blobs
+
+
+def worktree_blobs(cache):
+    blobs = []
+    for filepath in collect_files(tweaks_dir):
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        oid = blob_id(data)
+        if oid not in cache.blobs:
+            cache.add(oid, data)
+        blobs.append((os.path.relpath(filepath, os.path.dirname(tweaks_dir)).replace('\\', '/'), oid))
+    return blobs
+
+
+def side(blobs, cache, errors):
+    """Return ``{fingerprint: {data: [relpath]}}`` and display labels for one revision."""
+    cache.fetch([oid for _, oid in blobs])
+    effects = {}
+    labels = {}
+    for relpath, oid in blobs:
+        entries, error = cache.blobs[oid]
+        if error:
+            errors.append('%s: %s' % (relpath, error))
+        for fp, label, data in entries:
+            effects.setdefault(fp, {}).setdefault(data, []).append(relpath)
+            labels.setdefault(fp, label)
+    return effects, labels
+
+
+def diff_effects(old, new):
+    """Return ``(added, removed, changed)`` fingerprint lists between two sides."""
+    added = sorted(fp for fp in new[0] if fp not in old[0])
+    removed = sorted(fp for fp in old[0] if fp not in new[0])
+    changed = sorted(fp for fp in old[0] if fp in new[0] and old[0][fp].keys() != new[0][fp].keys())
+    return added, removed, changed
+
+
+def describe(data):
+    rtype, value, default = data
+    return '%r (%s, default %r)' % (value, rtype, default)
+
+
+def report_text(old, new, diff):
+    added, removed, changed = diff
+    labels = {**old[1], **new[1]}
+    for mark, fps, effects in (('+', added, new[0]), ('-', removed, old[0])):
+        for fp in fps:
+            for data, writers in effects[fp].items():
+                print('  %s %s = %s  [%s]' % (mark, labels[fp], describe(data), ', '.join(writers)))
+    for fp in changed:
+        print('  ~ %s' % labels[fp])
+        for data, writers in old[0][fp].items():
+            if data not in new[0][fp]:
+                print('      - %s  [%s]' % (describe(data), ', '.join(writers)))
+        for data, writers in new[0][fp].items():
+            if data not in old[0][fp]:
+                print('      + %s  [%s]' % (describe(data), ', '.join(writers)))
+
+
+def report_json(old, new, diff):
+    labels = {**old[1], **new[1]}
+
+    def writes(effects):
+        return [{'type': data[0], 'value': data[1], 'default': data[2], 'tweaks': writers}
+                for data, writers in effects.items()]
+    added, removed, changed = diff
+    return {
+        'added': [{'key': labels[fp], 'writes': writes(new[0][fp])} for fp in added],
+        'removed': [{'key': labels[fp], 'writes': writes(old[0][fp])} for fp in removed],
+        'changed': [{'key': labels[fp], 'old': writes(old[0][fp]), 'new': writes(new[0][fp])} for fp in changed],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('old', nargs='?', default='HEAD', help='base revision (default: HEAD)')
+    parser.add_argument('new', nargs='?', help='revision to compare (default: the working tree)')
+    parser.add_argument('--log', metavar='RANGE', help='diff every commit in RANGE touching catalog/tweaks')
+    parser.add_argument('--format', choices=('text', 'json'), default='text')
+    parser.add_argument('--no-cache', action='store_true', help='parse every blob and leave the cache alone')
+    args = parser.parse_args()
+
+    cache = BlobCache(None if args.no_cache else blob_cache_path)
+    errors = []
+    if args.log:
+        out = git('log', '--reverse', '--format=%H%x00%P%x00%h %s', args.log, '--', tweaks_path)
+        steps = []
+        for line in out.decode('utf-8').splitlines():
+            commit, parents, title = line.split('\0')
+            steps.append((commit + '^' if parents else None, commit, title))
+    else:
+        steps = [(args.old, args.new, None)]
+
+    results = []
+    total = [0, 0, 0]
+    for old_rev, new_rev, title in steps:
+        old = side(tree_blobs(old_rev), cache, errors)
+        new = side(worktree_blobs(cache) if new_rev is None else tree_blobs(new_rev), cache, errors)
+        diff = diff_effects(old, new)
+        total = [t + len(part) for t, part in zip(total, diff)]
+        if args.format == 'json':
+            results.append(dict(report_json(old, new, diff), old=old_rev, new=new_rev or 'worktree'))
+            continue
+        if title:
+            print('%s: %d added, %d removed, %d changed' % (title, *map(len, diff)))
+        report_text(old, new, diff)
+    cache.save()
+
+    for error in sorted(set(errors)):
+        print('  WARN   %s' % error, file=sys.stderr)
+    if args.format == 'json':
+        json.dump(results if args.log else results[0], sys.stdout, indent=2, default=str)
+        sys.stdout.write('\n')
+    print('\nRegistry effects: %d added, %d removed, %d changed (%d blobs parsed, %d from cache)' % (
+        *total, cache.parsed, cache.hits), file=sys.stderr if args.format == 'json' else sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
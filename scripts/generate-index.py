@@ -0,0 +1,45 @@
+"""Generate catalog/index.yaml from the catalog entries.
+
+Python port of generate-index.mjs producing byte-identical output (see
+catalog_index). Entries come from catalog_loader, so only the files that
+changed since the last run are parsed again.
+
+The same rows are written as per-category shards with a manifest.json to
+build/index (see catalog_index), which copy-catalog.mjs publishes as
+dist/catalog/index/ for clients that only need some categories.
+
+--check regenerates the index in memory and fails with a diff when it
+differs from the committed catalog/index.yaml.
+"""
+import argparse, os, sys
+
+from catalog_index import PAGE_SIZE, check_index, index_path, render_index, render_shards, shards_dir, write_shards
+from catalog_loader import cache_path, load_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--check', action='store_true', help='fail if catalog/index.yaml is not up to date')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='reader threads')
+    parser.add_argument('--no-cache', action='store_true', help='re-read every entry and leave the cache alone')
+    parser.add_argument('--shards', default=shards_dir, help='shard directory (default: build/index)')
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE, help='rows per shard page (default: %(default)s)')
+    args = parser.parse_args()
+
+    catalog = load_catalog(cache=None if args.no_cache else cache_path, jobs=args.jobs)
+    output, counts = render_index(catalog)
+
+    if args.check:
+        sys.exit(0 if check_index(output) else 1)
+
+    with open(index_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(output)
+    shards = render_shards(catalog, args.page_size)
+    write_shards(shards, args.shards)
+    print('Generated index.yaml: %d apps, %d fonts, %d tweaks (%d entries re-read), %d shard pages in %s' % (
+        counts['apps'], counts['fonts'], counts['tweaks'], catalog.reread, len(shards) - 1,
+        os.path.relpath(args.shards)))
+
+
+if __name__ == '__main__':
+    main()
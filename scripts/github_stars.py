@@ -0,0 +1,178 @@
+"""Concurrent GitHub star lookups shared by sync-github-stars.py and its benchmark.
+
+Requests go through a small pool of persistent HTTP connections, at most
+``concurrency`` at a time. Each repository's ETag is remembered so later
+runs revalidate with If-None-Match; a 304 costs no rate limit and reuses
+the cached count. Rate-limit headers are honoured for every worker: once
+X-RateLimit-Remaining reaches 0, or a 403/429 carries Retry-After (in
+seconds or as an HTTP date), all requests pause until the limit resets,
+unless that is further away than ``max_wait``, in which case the
+remaining repositories are skipped.
+
+Only the standard library is used, so the script runs wherever the
+importers do.
+"""
+import asyncio, datetime, email.utils, http.client, json, time, urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+API_URL = 'https://api.github.com'
+
+# Outcomes of fetch_stars
+FETCHED, NOT_MODIFIED, FAILED, RATE_LIMITED = 'fetched', 'not modified', 'failed', 'rate limited'
+
+
+class ConnectionPool:
+    """Keep-alive HTTP connections to one host, used from a thread pool."""
+
+    def __init__(self, base_url, size, timeout=30):
+        parts = urllib.parse.urlsplit(base_url)
+        self._factory = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self._host = parts.netloc
+        self._prefix = parts.path.rstrip('/')
+        self._timeout = timeout
+        self._idle = []
+        self._executor = ThreadPoolExecutor(max_workers=size)
+
+    def _request(self, path, headers):
+        try:
+            conn = self._idle.pop()
+        except IndexError:
+            conn = self._factory(self._host, timeout=self._timeout)
+        try:
+            try:
+                conn.request('GET', self._prefix + path, headers=headers)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection; retry on a fresh one
+                conn.close()
+                conn = self._factory(self._host, timeout=self._timeout)
+                conn.request('GET', self._prefix + path, headers=headers)
+                response = conn.getresponse()
+            body = response.read()
+        except BaseException:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            self._idle.append(conn)
+        return response.status, {k.lower(): v for k, v in response.getheaders()}, body
+
+    async def get(self, path, headers):
+        """Return ``(status, headers, body)`` with lower-case header names."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._request, path, headers)
+
+    def close(self):
+        self._executor.shutdown()
+        while self._idle:
+            self._idle.pop().close()
+
+
+def retry_after(value, now):
+    """Return the time a Retry-After header names, as seconds or an HTTP date, or None."""
+    value = value.strip()
+    if value.isdigit():
+        return now + int(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return when.timestamp()
+
+
+class RateLimit:
+    """Shared pause derived from GitHub's rate-limit headers."""
+
+    def __init__(self, max_wait):
+        self.max_wait = max_wait
+        self.resume_at = 0
+        self.exhausted = False
+
+    async def wait(self):
+        delay = self.resume_at - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def update(self, status, headers):
+        """Record the limit from a response; return the seconds to wait, or None."""
+        now = time.time()
+        resume = None
+        if 'retry-after' in headers and status in (403, 429):
+            resume = retry_after(headers['retry-after'], now)
+        if resume is None and headers.get('x-ratelimit-remaining') == '0' and 'x-ratelimit-reset' in headers:
+            resume = int(headers['x-ratelimit-reset'])
+        if resume is None:
+            return None
+        if resume - now > self.max_wait:
+            self.exhausted = True
+        self.resume_at = max(self.resume_at, resume)
+        return resume - now
+
+
+async def fetch_stars(pool, limit, repo, cached, token=None, retries=4):
+    """Return ``(outcome, stars, etag, status)`` for one repository."""
+    headers = {'Accept': 'application/vnd.github.v3+json', 'User-Agent': 'perch-gallery'}
+    if token:
+        headers['Authorization'] = 'token %s' % token
+    if cached and cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+
+    status = None
+    for attempt in range(retries):
+        if limit.exhausted:
+            return RATE_LIMITED, None, None, status
+        await limit.wait()
+        if limit.exhausted:
+            return RATE_LIMITED, None, None, status
+        try:
+            status, response_headers, body = await pool.get('/repos/%s' % repo, headers)
+        except (OSError, http.client.HTTPException):
+            await asyncio.sleep(0.5 * 2 ** attempt)
+            continue
+        waited = limit.update(status, response_headers)
+        if status == 200:
+            return FETCHED, json.loads(body)['stargazers_count'], response_headers.get('etag'), status
+        if status == 304 and cached:
+            return NOT_MODIFIED, cached['stars'], cached['etag'], status
+        if status in (403, 429) and waited is not None:
+            continue
+        if status >= 500 or status in (403, 429) and 'retry-after' in response_headers:
+            # Server errors, and a Retry-After that could not be read, back off and retry
+            await asyncio.sleep(0.5 * 2 ** attempt)
+            continue
+        break
+    return (RATE_LIMITED if limit.exhausted else FAILED), None, None, status
+
+
+async def _sync(repos, cache, api_url, token, concurrency, max_wait, report):
+    pool = ConnectionPool(api_url, concurrency)
+    limit = RateLimit(max_wait)
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(repo):
+        async with gate:
+            result = await fetch_stars(pool, limit, repo, cache.get(repo), token)
+        if report:
+            report(repo, *result)
+        return repo, result
+
+    try:
+        return dict(await asyncio.gather(*(one(repo) for repo in repos)))
+    finally:
+        pool.close()
+
+
+def sync_stars(repos, cache, api_url=API_URL, token=None, concurrency=8, max_wait=60, report=None):
+    """Look up every repository in *repos* and update the ETag *cache* in place.
+
+    Returns ``{repo: (outcome, stars, etag, status)}``. *report*, when given,
+    is called with the same values as each repository completes.
+    """
+    results = asyncio.run(_sync(list(dict.fromkeys(repos)), cache, api_url, token, concurrency, max_wait, report))
+    for repo, (outcome, stars, etag, _) in results.items():
+        if outcome in (FETCHED, NOT_MODIFIED) and etag:
+            cache[repo] = {'etag': etag, 'stars': stars}
+    return results
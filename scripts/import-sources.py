@@ -0,0 +1,133 @@
+"""Import several upstream sources into catalog/tweaks in parallel.
+
+Each source is given as KIND:PATH or KIND:REF, REF naming a snapshot in
+the source store (latest, a version or a hash prefix), for example
+
+    python scripts/import-sources.py sophia:Sophia-11.psm1 sophia:6.0.2 winutil:latest
+
+Files are copied into the store first (see source_store). Sources are
+parsed in a process pool from their stored snapshots, reusing the
+functions and tweak lists derived from them before; a single writer then
+merges the results. When two sources produce the same tweak slug, the one
+listed first wins and the conflict is reported. The merged files are
+committed as one atomic batch; --dry-run prints a diff instead. A run with
+the same snapshots as the last successful one stops straight away unless
+--force is given.
+"""
+import argparse, os
+from concurrent.futures import ProcessPoolExecutor
+
+import instrument
+from catalog_validator import Schema, check_generated
+from catalog_writer import BatchWriter, summary
+from dedup_index import load_index
+from importers import parse_source, parsers, table_digests
+from source_store import SourceStore, digest
+
+# Bump when the generated YAML changes so unchanged sources are imported again
+IMPORT_VERSION = 1
+
+
+def parse_spec(spec):
+    kind, sep, ref = spec.partition(':')
+    if not sep or kind not in parsers:
+        raise argparse.ArgumentTypeError('expected KIND:PATH with KIND one of %s' % ', '.join(sorted(parsers)))
+    return kind, ref
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sources', nargs='+', type=parse_spec, metavar='KIND:PATH',
+                        help='upstream source or stored snapshot, highest priority first')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--force', action='store_true', help='import even if nothing changed since the last import')
+    parser.add_argument('--dry-run', action='store_true', help='show a diff of what would change, write nothing')
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    outdir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'catalog', 'tweaks')
+    recorder = instrument.Recorder('import-sources')
+    store = SourceStore()
+    sources = []
+    with recorder.stage('store'):
+        for kind, ref in args.sources:
+            try:
+                path, snapshot = store.resolve(kind, ref)
+            except LookupError as e:
+                parser.error(str(e))
+            sources.append((kind, path, snapshot['sha256'], '%s:%s' % (kind, ref)))
+    tables = table_digests()
+    key = digest(IMPORT_VERSION, [(kind, sha256, tables[kind]) for kind, _, sha256, _ in sources])
+    if not args.force and store.unchanged('import-sources', key, outdir):
+        print('Sources unchanged since last import, nothing to do.')
+        raise SystemExit(0)
+
+    with instrument.profiling(recorder, args.profile):
+        with recorder.stage('index'):
+            load_index()
+
+        with recorder.stage('parse'):
+            if args.profile:
+                # Profilers only see this process, so parse in it
+                results = [parse_source(*source) for source in sources]
+            else:
+                with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+                    futures = [pool.submit(parse_source, *source) for source in sources]
+                    results = [future.result() for future in futures]
+        for result in results:
+            recorder.add_section(result['source'], result['report'])
+            recorder.inputs.extend(result['report']['inputs'])
+
+        # Merge in priority order; slugs are catalog ids, so they must be unique
+        # across category directories as well
+        with recorder.stage('merge'):
+            claimed = {}
+            conflicts = []
+            for result in results:
+                for relpath, text in result['tweaks']:
+                    slug = os.path.splitext(os.path.basename(relpath))[0]
+                    if slug in claimed:
+                        conflicts.append((slug, result['source'], claimed[slug][0]))
+                        continue
+                    claimed[slug] = (result['source'], relpath, text)
+        recorder.count('tweaks', len(claimed))
+        recorder.count('conflicts', len(conflicts))
+
+        with recorder.stage('validate'):
+            schema = Schema.load()
+            issues = []
+            for source, relpath, text in claimed.values():
+                issues.extend(schema.validate_text('tweak', 'tweaks/' + relpath, text))
+        if not check_generated(issues):
+            raise SystemExit(1)
+
+        with recorder.stage('write'), BatchWriter(outdir, dry_run=args.dry_run) as writer:
+            for source, relpath, text in claimed.values():
+                writer.write(relpath, text)
+            stats = writer.commit()
+        recorder.count('written', stats['written'])
+    if not args.dry_run:
+        store.record_import('import-sources', key, [sha256 for _, _, sha256, _ in sources],
+                            [relpath for _, relpath, _ in claimed.values()])
+
+    print('Generated %d files from %d sources' % (len(claimed), len(results)))
+    print(summary(stats, args.dry_run))
+    if conflicts:
+        print('\nConflicts (kept the higher-priority source): %d' % len(conflicts))
+        for slug, source, winner in conflicts:
+            print('  %s: %s (kept %s)' % (slug, source, winner))
+
+    print('\nTimings per source (ms):')
+    print('  %-48s %9s %9s %9s %7s' % ('source', 'read', 'convert', 'total', 'tweaks'))
+    for result in results:
+        report = result['report']
+        read = report['stages'].get('read', {}).get('seconds', 0)
+        index = report['stages'].get('index', {}).get('seconds', 0)
+        print('  %-48s %9.1f %9.1f %9.1f %7d' % (
+            result['source'][-48:], read * 1000, (report['wall'] - read - index) * 1000,
+            report['wall'] * 1000, len(result['tweaks'])))
+    instrument.finish(recorder, args)
+
+
+if __name__ == '__main__':
+    main()
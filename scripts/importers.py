@@ -0,0 +1,95 @@
+"""Upstream source parsers for the unified importer.
+
+Each parser turns one upstream file into a list of ``(relpath, text)``
+tweak documents without touching catalog/tweaks, so several of them can run
+in worker processes while a single writer merges the results.
+
+Sources resolved through source_store carry their hash; their functions
+or filtered tweaks are then pickled into the store while they stream past,
+so later imports of the same snapshot skip reading the file.
+"""
+import os
+
+import sophia, winutil
+from dedup_index import load_index
+from instrument import Recorder, count, stage, timed, use
+from sophia_tokenizer import read_functions
+from source_store import SourceStore, digest
+
+
+def table_digests():
+    """Return a hash per source kind of the code tables its import depends on."""
+    return {
+        'sophia': digest(sorted(sophia.skip_functions), sorted(sophia.sophia_meta.items())),
+        'winutil': digest(sorted(winutil.tweak_meta.items())),
+    }
+
+
+def sophia_functions(path, sha256=None):
+    """Yield the functions of the Sophia module at *path*, through the store when *sha256* is given."""
+    if sha256 is None:
+        return timed(read_functions(path), 'read')
+    return timed(SourceStore().derived(sha256, 'functions', lambda: read_functions(path)), 'read')
+
+
+def winutil_tweaks(path, sha256=None):
+    """Yield the ``(key, tweak)`` pairs of the export at *path*, through the store when *sha256* is given.
+
+    The stored pairs only include the tweaks winutil.importable passes, so
+    they are keyed by the tweak_meta names as well.
+    """
+    if sha256 is None:
+        return timed(winutil.read_tweaks(path), 'read')
+    return timed(SourceStore().derived(
+        sha256, 'tweaks-%s' % digest(sorted(winutil.tweak_meta))[:16],
+        lambda: winutil.importable(winutil.read_tweaks(path))), 'read')
+
+
+def parse_sophia(path, index, sha256=None):
+    tweaks = []
+    for func in sophia_functions(path, sha256):
+        count('functions')
+        with stage('meta'):
+            meta = None if func.name in sophia.skip_functions else sophia.sophia_meta.get(func.name)
+        if not meta:
+            count('skipped')
+            continue
+        with stage('convert'):
+            tweak = sophia.build_tweak(func.name, func.body, meta, index, func.help)
+        if tweak and not tweak[2]:
+            tweaks.append(tweak[:2])
+    return tweaks
+
+
+def parse_winutil(path, index, sha256=None):
+    return list(winutil.iter_tweaks(path, index, winutil_tweaks(path, sha256)))
+
+
+parsers = {
+    'sophia': parse_sophia,
+    'winutil': parse_winutil,
+}
+
+
+def parse_source(kind, path, sha256=None, name=None):
+    """Parse one upstream source; runs in a worker process.
+
+    The dedup index is built from the catalog entry cache, which the parent
+    warms before starting the pool. Pass the *sha256* of a stored snapshot
+    to use its derived artifacts, and a *name* to report it under instead
+    of ``KIND:PATH``. The result carries the worker's instrument report.
+    """
+    name = name or '%s:%s' % (kind, path)
+    recorder = Recorder(name)
+    recorder.input(path, sha256)
+    with use(recorder):
+        with stage('index'):
+            index = load_index()
+        tweaks = parsers[kind](path, index, sha256)
+        count('tweaks', len(tweaks))
+    return {
+        'source': name,
+        'tweaks': tweaks,
+        'report': recorder.report(),
+        'pid': os.getpid(),
+    }
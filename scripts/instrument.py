@@ -0,0 +1,205 @@
+"""Stage timers, counters and profiling for the import pipeline.
+
+Code that does measurable work wraps it in ``stage(name)`` and bumps
+``count(name)``; both go to the ``Recorder`` made current with ``use()``
+and do nothing otherwise, so the parsers can be instrumented without
+threading a recorder through every call. Stages may nest (``convert``
+includes ``render``); each one adds up its own wall time and call count.
+
+``Recorder.report()`` is a JSON-serializable dict: the stages, counters,
+SHA-256 and size of every input (so a report can be tied to an upstream
+Sophia or WinUtil version) and, with ``profiling()``, the top cProfile
+functions or tracemalloc allocation sites. The importers write one report
+per run to .cache/timings/<tool>.json, or to --timings PATH.
+"""
+import contextlib, cProfile, hashlib, io, json, os, platform, pstats, time, tracemalloc
+
+REPORT_VERSION = 1
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+
+timings_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'timings')
+
+_current = None
+_done = object()
+
+
+class Recorder:
+    def __init__(self, tool):
+        self.tool = tool
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.inputs = []
+        self.sections = {}
+        self.profile = None
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds, calls=1):
+        entry = self.stages.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += calls
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def timed(self, iterable, name):
+        """Yield from *iterable*, adding the time spent producing items to stage *name*."""
+        it = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            item = next(it, _done)
+            self.add_time(name, time.perf_counter() - start, 0 if item is _done else 1)
+            if item is _done:
+                return
+            yield item
+
+    def input(self, path, sha256=None):
+        """Record the hash and size of an input file; pass *sha256* when the caller already has it."""
+        if sha256 is None:
+            h = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 16), b''):
+                    h.update(chunk)
+            sha256 = h.hexdigest()
+        self.inputs.append({'path': path, 'sha256': sha256, 'bytes': os.path.getsize(path)})
+
+    def add_section(self, name, report):
+        """Attach another recorder's report, such as a worker process's, under *name*."""
+        self.sections[name] = report
+
+    def report(self):
+        report = {
+            'version': REPORT_VERSION,
+            'tool': self.tool,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.started)),
+            'python': platform.python_version(),
+            'wall': round(time.perf_counter() - self._start, 6),
+            'stages': {name: {'seconds': round(seconds, 6), 'calls': calls}
+                       for name, (seconds, calls) in self.stages.items()},
+            'counters': dict(self.counters),
+            'inputs': self.inputs,
+        }
+        if self.sections:
+            report['sections'] = self.sections
+        return report
+
+    def summary(self):
+        return ', '.join('%s %.1f' % (name, seconds * 1000) for name, (seconds, _) in self.stages.items())
+
+
+class _Null:
+    """Stand-in when no recorder is current: every call is a no-op."""
+
+    def stage(self, name):
+        return contextlib.nullcontext()
+
+    def count(self, name, n=1):
+        pass
+
+    def timed(self, iterable, name):
+        return iterable
+
+
+_null = _Null()
+
+
+def current():
+    return _current or _null
+
+
+def stage(name):
+    return current().stage(name)
+
+
+def count(name, n=1):
+    current().count(name, n)
+
+
+def timed(iterable, name):
+    return current().timed(iterable, name)
+
+
+@contextlib.contextmanager
+def use(recorder):
+    """Make *recorder* current for the duration of the block."""
+    global _current
+    previous, _current = _current, recorder
+    try:
+        yield recorder
+    finally:
+        _current = previous
+
+
+@contextlib.contextmanager
+def profiling(recorder, mode, top=25):
+    """Run the block under cProfile or tracemalloc and add the results to *recorder*'s report.
+
+    The full cProfile statistics are also kept as ``recorder.profile``
+    (a ``pstats.Stats``) for dumping to a .prof file.
+    """
+    if mode is None:
+        yield
+        return
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            recorder.profile = pstats.Stats(profiler, stream=io.StringIO())
+            rows = sorted(recorder.profile.stats.items(), key=lambda item: -item[1][3])[:top]
+            recorder.sections['cprofile'] = [{
+                'function': '%s:%d(%s)' % (os.path.basename(filename), line, name),
+                'calls': calls, 'tottime': round(tottime, 6), 'cumtime': round(cumtime, 6),
+            } for (filename, line, name), (_, calls, tottime, cumtime, _) in rows]
+    elif mode == 'tracemalloc':
+        tracemalloc.start()
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            current_bytes, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            recorder.sections['tracemalloc'] = {
+                'current': current_bytes,
+                'peak': peak,
+                'top': [{'site': '%s:%d' % (os.path.basename(stat.traceback[0].filename), stat.traceback[0].lineno),
+                         'bytes': stat.size, 'blocks': stat.count}
+                        for stat in snapshot.statistics('lineno')[:top]],
+            }
+    else:
+        raise ValueError('unknown profile mode: %s' % mode)
+
+
+def add_arguments(parser):
+    parser.add_argument('--timings', metavar='PATH',
+                        help='write the JSON timing report here (default: .cache/timings/<tool>.json)')
+    parser.add_argument('--profile', choices=PROFILE_MODES,
+                        help='also profile the run; cprofile writes a .prof file next to the report')
+
+
+def write_report(recorder, path=None):
+    """Write *recorder*'s report to *path* (default: .cache/timings/<tool>.json) and return the path."""
+    path = path or os.path.join(timings_dir, '%s.json' % recorder.tool)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(recorder.report(), f, indent=2)
+        f.write('\n')
+    if recorder.profile is not None:
+        recorder.profile.dump_stats(os.path.splitext(path)[0] + '.prof')
+    return path
+
+
+def finish(recorder, args):
+    """Write the report for a run with ``add_arguments`` options and print the stage line."""
+    path = write_report(recorder, args.timings)
+    print('\nTimings (ms): %s; report: %s' % (recorder.summary(), os.path.relpath(path)))
@@ -0,0 +1,77 @@
+"""Incremental reader for large JSON documents with a top-level object.
+
+``iter_object_items`` decodes one member at a time from a file object, so
+callers can start processing the first entry before the rest of the file
+has been read and never hold more than one value plus a read buffer.
+"""
+import json, re
+
+_whitespace = ' \t\n\r'
+_delimiter = re.compile(r'[\s,:\]}]')
+
+
+def iter_object_items(f, strict=True, chunk_size=1 << 16):
+    """Yield ``(key, value)`` for each member of the JSON object in *f*."""
+    decoder = json.JSONDecoder(strict=strict)
+    buf = ''
+    pos = 0
+    eof = False
+
+    def more():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        if pos:
+            buf, pos = buf[pos:], 0
+        buf += chunk
+        return True
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _whitespace:
+                pos += 1
+            if pos < len(buf) or not more():
+                return
+
+    def expect(token):
+        nonlocal pos
+        skip_whitespace()
+        if buf[pos:pos + 1] != token:
+            raise json.JSONDecodeError('Expecting %r' % token, buf, pos)
+        pos += 1
+
+    def decode():
+        # A number or literal is only complete once a delimiter follows it:
+        # "1.5e" decodes as 1.5 and "12" may be the start of "123".
+        nonlocal pos
+        skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof or not more():
+                    raise
+                continue
+            if (not eof and not isinstance(value, (dict, list, str))
+                    and not _delimiter.search(buf, end) and more()):
+                continue
+            pos = end
+            return value
+
+    expect('{')
+    skip_whitespace()
+    if buf[pos:pos + 1] == '}':
+        return
+    while True:
+        key = decode()
+        if not isinstance(key, str):
+            raise json.JSONDecodeError('Expecting property name', buf, pos)
+        expect(':')
+        yield key, decode()
+        skip_whitespace()
+        if buf[pos:pos + 1] == '}':
+            return
+        expect(',')
@@ -0,0 +1,198 @@
+"""Logo fetching and sprite atlas generation for the gallery.
+
+Originals live in catalog/logos/<id>.png as fetched: favicons from the
+entry's website, or the GitHub owner's avatar. For the site every
+original is downsampled to fixed square tiles (32 px, plus 64 px for
+high-DPI screens) and packed into one lossy WebP atlas per size, so a
+gallery page loads a single image instead of one per card. A manifest
+maps entry ids to their tile.
+
+Tiles are cached in .cache/logos by the SHA-256 of the original, so only
+new or changed logos are decoded and resized again. Resizing needs
+Pillow; fetching only needs the standard library.
+"""
+import hashlib, io, json, os, re, urllib.error, urllib.parse, urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from catalog_loader import catalog_dir, load_catalog, root
+
+logos_dir = os.path.join(catalog_dir, 'logos')
+public_dir = os.path.join(root, 'public', 'logos')
+cache_dir = os.path.join(root, '.cache', 'logos')
+
+FAVICON_URL = 'https://www.google.com/s2/favicons?domain={domain}&sz=128'
+AVATAR_URL = 'https://github.com/{owner}.png?size=128'
+
+# Tile size in CSS pixels and the pixel sizes rendered for 1x and 2x screens
+TILE = 32
+SCALES = (1, 2)
+MANIFEST_VERSION = 1
+
+_github_owner = re.compile(r'github\.com/([^/]+)')
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def logo_entries(directory=catalog_dir):
+    """Return ``(id, website, github)`` for every app and font."""
+    catalog = load_catalog(directory, sections=('apps', 'fonts'))
+    return [(entry.id, entry.links.get('website'), entry.links.get('github')) for entry in catalog]
+
+
+def logo_urls(website, github, favicon_url=FAVICON_URL, avatar_url=AVATAR_URL):
+    """Return the candidate URLs for a logo, best first."""
+    urls = []
+    domain = urllib.parse.urlsplit(website).hostname if isinstance(website, str) else None
+    if domain:
+        urls.append(('favicon', favicon_url.format(domain=domain)))
+    match = _github_owner.search(github) if isinstance(github, str) else None
+    if match:
+        urls.append(('github', avatar_url.format(owner=match.group(1))))
+    return urls
+
+
+def download_image(url, timeout=20):
+    request = urllib.request.Request(url, headers={'User-Agent': 'perch-gallery'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            if not response.headers.get('Content-Type', '').startswith('image/'):
+                return None
+            data = response.read()
+    except (urllib.error.URLError, OSError):
+        return None
+    # Skip tiny images (likely default/placeholder favicons)
+    return data if len(data) >= 200 else None
+
+
+def fetch_logo(entry, favicon_url=FAVICON_URL, avatar_url=AVATAR_URL):
+    """Return ``(id, source, data)``; source and data are None when nothing was found."""
+    entry_id, website, github = entry
+    for source, url in logo_urls(website, github, favicon_url, avatar_url):
+        data = download_image(url)
+        if data:
+            return entry_id, source, data
+    return entry_id, None, None
+
+
+def fetch_logos(entries, jobs=16, favicon_url=FAVICON_URL, avatar_url=AVATAR_URL):
+    """Yield ``fetch_logo`` results for *entries* from a thread pool, as they complete."""
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(fetch_logo, entry, favicon_url, avatar_url) for entry in entries]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _pillow():
+    try:
+        from PIL import Image
+    except ImportError:
+        raise SystemExit('Resizing logos needs Pillow: pip install pillow')
+    return Image
+
+
+def render_tile(data, size):
+    """Return *data* scaled to fit a transparent *size* x *size* square, as PNG bytes."""
+    Image = _pillow()
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGBA')
+        scale = size / max(image.size)
+        width, height = max(1, round(image.width * scale)), max(1, round(image.height * scale))
+        image = image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        tile = Image.new('RGBA', (size, size))
+        tile.paste(image, ((size - width) // 2, (size - height) // 2))
+    out = io.BytesIO()
+    tile.save(out, format='PNG')
+    return out.getvalue()
+
+
+def cached_tile(digest, data, size, cache=cache_dir):
+    """Return the PNG tile for an original with SHA-256 *digest*; True as second value on a cache hit."""
+    path = os.path.join(cache, '%s-%d.png' % (digest, size))
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read(), True
+    tile = render_tile(data, size)
+    os.makedirs(cache, exist_ok=True)
+    # Another process may be reading the cache; never let it see half a PNG
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(tile)
+    os.replace(tmp, path)
+    return tile, False
+
+
+def build_atlas(tiles, size, columns):
+    """Pack PNG *tiles* row by row into one WebP atlas."""
+    Image = _pillow()
+    rows = max(1, -(-len(tiles) // columns))
+    atlas = Image.new('RGBA', (columns * size, rows * size))
+    for n, tile in enumerate(tiles):
+        with Image.open(io.BytesIO(tile)) as image:
+            atlas.paste(image, (n % columns * size, n // columns * size))
+    out = io.BytesIO()
+    # Most logos are opaque avatars; at q90 WebP is about a third of an optimized PNG
+    atlas.save(out, format='WEBP', quality=90, alpha_quality=100, method=4)
+    return out.getvalue()
+
+
+def build_sprites(originals, columns=16, jobs=None, cache=cache_dir):
+    """Return ``({filename: bytes}, stats)`` for the atlases and manifest.
+
+    *originals* maps entry ids to the bytes of their original logo.
+    Entries with identical originals share one tile, rendered once; the
+    resized and cached counts are per distinct tile.
+    """
+    ids = sorted(originals)
+    digests = {entry_id: sha256(originals[entry_id]) for entry_id in ids}
+    stats = {'logos': len(ids), 'resized': 0, 'cached': 0, 'failed': []}
+    files = {}
+    atlases = {}
+
+    # One job per distinct original and size, so no two jobs write the same cache file
+    data_by_digest = {}
+    for entry_id in ids:
+        data_by_digest.setdefault(digests[entry_id], originals[entry_id])
+    tiles = {}
+    broken = set()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [((digest, TILE * scale), pool.submit(cached_tile, digest, data, TILE * scale, cache))
+                   for scale in SCALES for digest, data in sorted(data_by_digest.items())]
+        for key, future in futures:
+            try:
+                tiles[key], hit = future.result()
+            except (OSError, ValueError, SyntaxError):
+                # Pillow raises these for truncated or unrecognised images
+                broken.add(key[0])
+                continue
+            stats['cached' if hit else 'resized'] += 1
+    stats['failed'] = [entry_id for entry_id in ids if digests[entry_id] in broken]
+    usable = [entry_id for entry_id in ids if digests[entry_id] not in broken]
+
+    for scale in SCALES:
+        size = TILE * scale
+        atlas = build_atlas([tiles[digests[entry_id], size] for entry_id in usable], size, columns)
+        name = 'atlas-%d.%s.webp' % (size, sha256(atlas)[:10])
+        files[name] = atlas
+        atlases['%dx' % scale] = name
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'tile': TILE,
+        'columns': columns,
+        'rows': max(1, -(-len(usable) // columns)),
+        'atlases': atlases,
+        'logos': {entry_id: {'index': n, 'sha256': digests[entry_id]} for n, entry_id in enumerate(usable)},
+    }
+    files['manifest.json'] = json.dumps(manifest, indent=2, sort_keys=True) + '\n'
+    return files, stats
+
+
+def read_originals(directory=logos_dir):
+    originals = {}
+    for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else ():
+        if name.endswith('.png'):
+            with open(os.path.join(directory, name), 'rb') as f:
+                originals[name[:-4]] = f.read()
+    return originals
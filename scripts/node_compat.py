@@ -0,0 +1,187 @@
+"""Python equivalents of the js-yaml and ICU behaviour the Node scripts rely on.
+
+The site build reads the catalog with js-yaml and generate-index.mjs sorts
+entries with ``String.prototype.localeCompare``. Python ports of those
+scripts use this module so their output matches byte for byte:
+
+  CoreLoader   resolves plain scalars like js-yaml's default schema
+               (YAML 1.2: ``yes``/``on`` and ``1:20`` stay strings)
+  dump_scalar  formats a scalar the way ``yaml.dump`` chooses its style
+  locale_key   a sort key approximating ICU root collation
+"""
+import re, unicodedata
+
+import yaml
+
+_Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+_null = re.compile(r'^(?:~|null|Null|NULL)$')
+_bool = re.compile(r'^(?:true|True|TRUE|false|False|FALSE)$')
+_int = re.compile(r'''(?x)^[-+]?(?:
+    0b[01_]*[01][01_]* | 0x[0-9a-fA-F_]*[0-9a-fA-F][0-9a-fA-F_]* | 0o[0-7_]*[0-7][0-7_]* | [0-9][0-9_]*
+)(?<!_)$''')
+_float = re.compile(r'''(?x)^(?:
+    [-+]?[0-9][0-9_]*(?:\.[0-9_]*)?(?:[eE][-+]?[0-9]+)? | \.[0-9_]+(?:[eE][-+]?[0-9]+)?
+  | [-+]?\.(?:inf|Inf|INF) | \.(?:nan|NaN|NAN)
+)(?<!_)$''')
+_timestamp = re.compile(r'''(?x)^(?:
+    [0-9]{4}-[0-9]{2}-[0-9]{2}
+  | [0-9]{4}-[0-9]{1,2}-[0-9]{1,2}(?:[Tt]|[\ \t]+)[0-9]{1,2}:[0-9]{2}:[0-9]{2}(?:\.[0-9]*)?
+    (?:[\ \t]*(?:Z|[-+][0-9]{1,2}(?::[0-9]{2})?))?
+)$''')
+# Quoted even though the default schema reads them as strings (js-yaml compat mode)
+_deprecated_bool = {'y', 'Y', 'yes', 'Yes', 'YES', 'on', 'On', 'ON', 'n', 'N', 'no', 'No', 'NO', 'off', 'Off', 'OFF'}
+_deprecated_base60 = re.compile(r'^[-+]?[0-9_]+(?::[0-9_]+)+(?:\.[0-9_]*)?$')
+# Strings of these characters are plain in block and flow context unless they resolve to another type
+_simple = re.compile(r'[A-Za-z0-9](?:[A-Za-z0-9 ._/()+-]*[A-Za-z0-9._/()+-])?')
+
+
+class CoreLoader(_Loader):
+    """Safe loader resolving booleans and numbers like js-yaml."""
+
+
+CoreLoader.yaml_implicit_resolvers = {
+    first: [(tag, regexp) for tag, regexp in resolvers
+            if tag not in ('tag:yaml.org,2002:bool', 'tag:yaml.org,2002:int', 'tag:yaml.org,2002:float')]
+    for first, resolvers in _Loader.yaml_implicit_resolvers.items()
+}
+CoreLoader.add_implicit_resolver('tag:yaml.org,2002:bool', _bool, list('tTfF'))
+CoreLoader.add_implicit_resolver('tag:yaml.org,2002:int', _int, list('-+0123456789'))
+CoreLoader.add_implicit_resolver('tag:yaml.org,2002:float', _float, list('-+0123456789.'))
+
+
+def _construct_int(loader, node):
+    value = loader.construct_scalar(node).replace('_', '')
+    sign = -1 if value[0] == '-' else 1
+    value = value.lstrip('-+')
+    for prefix, base in (('0b', 2), ('0x', 16), ('0o', 8)):
+        if value.startswith(prefix):
+            return sign * int(value[2:], base)
+    return sign * int(value)
+
+
+CoreLoader.add_constructor('tag:yaml.org,2002:int', _construct_int)
+
+
+def load(stream):
+    return yaml.load(stream, Loader=CoreLoader)
+
+
+def _printable(c):
+    o = ord(c)
+    return (0x20 <= o <= 0x7e or (0xa1 <= o <= 0xd7ff and o not in (0x2028, 0x2029))
+            or (0xe000 <= o <= 0xfffd and o != 0xfeff) or 0x10000 <= o <= 0x10ffff)
+
+
+def _plain_safe_first(c):
+    return _printable(c) and c not in ' \t-?:,[]{}#&*!|=>\'"%@`'
+
+
+def _plain_safe(c, prev, inblock):
+    ns_or_white = _printable(c) and c not in '\r\n'
+    ns = ns_or_white and c not in ' \t'
+    return (((ns_or_white if inblock else ns_or_white and c not in ',[]{}')
+             and c != '#' and not (prev == ':' and not ns))
+            or (prev is not None and _printable(prev) and prev not in ' \t\r\n' and c == '#')
+            or (prev == ':' and ns))
+
+
+def _implicit(s):
+    return bool(_null.match(s) or _bool.match(s) or _int.match(s) or _float.match(s)
+                or _timestamp.match(s) or s == '<<')
+
+
+_escapes = {
+    '\0': '\\0', '\x07': '\\a', '\b': '\\b', '\t': '\\t', '\n': '\\n', '\x0b': '\\v', '\f': '\\f',
+    '\r': '\\r', '\x1b': '\\e', '"': '\\"', '\\': '\\\\', '\x85': '\\N', '\xa0': '\\_',
+    '\u2028': '\\L', '\u2029': '\\P',
+}
+
+
+def _escape(s):
+    out = []
+    for c in s:
+        if c in _escapes:
+            out.append(_escapes[c])
+        elif _printable(c):
+            out.append(c)
+        elif ord(c) <= 0xff:
+            out.append('\\x%02X' % ord(c))
+        elif ord(c) <= 0xffff:
+            out.append('\\u%04X' % ord(c))
+        else:
+            out.append('\\U%08X' % ord(c))
+    return ''.join(out)
+
+
+def dump_scalar(value, inblock=True):
+    """Format *value* like js-yaml dumps a single-line scalar.
+
+    *inblock* is false for items of a flow sequence, where ``,[]{}`` force
+    quoting.
+    """
+    if value is None:
+        return 'null'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if isinstance(value, (int, float)):
+        return str(value)
+    s = str(value)
+    if not s:
+        return "''"
+    if s in _deprecated_bool or _deprecated_base60.match(s):
+        return "'%s'" % s
+    if _simple.fullmatch(s):
+        return "'%s'" % s if _implicit(s) else s
+    plain = _plain_safe_first(s[0]) and s[-1] not in ' \t:'
+    prev = None
+    for c in s:
+        if not _printable(c) and c != '\n':
+            return '"%s"' % _escape(s)
+        plain = plain and _plain_safe(c, prev, inblock)
+        prev = c
+    if '\n' in s:
+        return '"%s"' % _escape(s)
+    if plain and not _implicit(s):
+        return s
+    return "'%s'" % s.replace("'", "''")
+
+
+# ICU root collation: whitespace, punctuation and symbols sort before
+# digits, digits before letters
+_collation_order = '\t\n\x0b\x0c\r _-,;:!?.\'"()[]{}@*/\\&#%`^+<=>|~$0123456789'
+_rank = {c: n for n, c in enumerate(_collation_order)}
+_letters = len(_collation_order)
+
+
+def _primary(c):
+    if c in _rank:
+        return _rank[c]
+    if 'a' <= c <= 'z':
+        return _letters + ord(c) - ord('a')
+    if unicodedata.category(c).startswith(('P', 'S', 'Z')):
+        # Other punctuation and symbols go after the ASCII ones, before '$'
+        return _rank['$'] - 1 + ord(c) / 0x110000
+    return _letters + 26 + ord(c)
+
+
+def locale_key(s):
+    """Sort key ordering strings like ``a.localeCompare(b)`` under ICU's root locale.
+
+    Compares base characters first, then accents, then case with lowercase
+    first, which is how the levels of the Unicode collation algorithm work.
+    """
+    primary, secondary, tertiary = [], [], []
+    for c in unicodedata.normalize('NFD', s):
+        if unicodedata.combining(c):
+            if secondary:
+                secondary[-1] += ord(c)
+            continue
+        lower = c.lower()
+        for part in unicodedata.normalize('NFKD', lower) if lower not in _rank else lower:
+            primary.append(_primary(part))
+        secondary.append(0)
+        tertiary.append(0 if c == lower else 1)
+    return primary, secondary, tertiary
@@ -1,21 +1,15 @@
 """Parse Sophia Script .psm1 to extract registry-based tweaks."""
 import re, os, json
 
-path = os.path.join(os.environ['TEMP'], 'sophia.psm1')
-with open(path, 'r', encoding='utf-8-sig') as f:
-    content = f.read()
+from sophia_tokenizer import read_functions
 
-# Split into function blocks
-func_pattern = re.compile(
-    r'<#\s*\n(.*?)\n\s*#>\s*\n\s*function\s+(\w+)\s*\n(.*?)(?=\n<#\s*\n|\n#region\s|\Z)',
-    re.DOTALL
-)
+path = os.path.join(os.environ['TEMP'], 'sophia.psm1')
 
 functions = []
-for match in func_pattern.finditer(content):
-    help_block = match.group(1)
-    func_name = match.group(2)
-    func_body = match.group(3)
+for func in read_functions(path):
+    help_block = func.help
+    func_name = func.name
+    func_body = func.body
 
     # Extract synopsis
     synopsis_m = re.search(r'\.SYNOPSIS\s*\n\s*(.+?)(?=\n\s*\.|\n\s*#)', help_block, re.DOTALL)
@@ -0,0 +1,308 @@
+"""Batched .reg files per profile and Windows version.
+
+Perch applies a tweak one registry entry at a time. For provisioning a
+whole machine, ``build_bundles`` collects the tweaks of each profile that
+apply to a Windows version and writes all their values as one .reg file,
+grouped and ordered by key so each key appears (and is opened by
+``reg import``) once. Its undo file writes every value's
+``default-value`` back, or deletes the value when the default is null.
+
+Files are UTF-16 with a BOM and CRLF line ends, like regedit exports.
+Keys are ordered by hive and then by path component, case-insensitively,
+so a parent precedes its subkeys; within a key the default value comes
+first, then values by name. ``read_reg`` parses a bundle back and
+``check_bundle`` verifies that order, and that importing the bundle and
+then its undo file into a model registry (``apply_reg``) leaves exactly
+the default values behind.
+
+Tweaks without registry entries (script-only) and values that cannot be
+expressed in a .reg file are left out and reported.
+"""
+import hashlib, re
+
+from registry import HIVES, comparable_value, fingerprint
+
+VERSION = 1
+REG_HEADER = 'Windows Registry Editor Version 5.00'
+HIVE_ORDER = ('HKEY_CLASSES_ROOT', 'HKEY_CURRENT_USER', 'HKEY_LOCAL_MACHINE', 'HKEY_USERS', 'HKEY_CURRENT_CONFIG')
+WINDOWS_VERSIONS = (10, 11)
+
+_short_hives = {short: full for full, short in HIVES.items()}
+_byte_cast = re.compile(r'\[byte\[\]\]|[()\s]', re.I)
+
+
+def reg_key(key):
+    """Return *key* spelled for a .reg file: full hive name, backslashes, case kept."""
+    key = key.strip().strip('"')
+    if '::' in key:
+        key = key.split('::', 1)[1]
+    elif key.lower().startswith('registry\\'):
+        key = key[len('registry\\'):]
+    hive, _, rest = key.replace('/', '\\').partition('\\')
+    hive = hive.rstrip(':').upper()
+    hive = _short_hives.get(hive, hive)
+    return '\\'.join([hive] + [part for part in rest.split('\\') if part])
+
+
+def key_order(key):
+    hive, _, rest = key.partition('\\')
+    rank = HIVE_ORDER.index(hive) if hive in HIVE_ORDER else len(HIVE_ORDER)
+    return rank, hive, tuple(part.lower() for part in rest.split('\\') if part)
+
+
+def name_order(name):
+    return name != '', name.lower()
+
+
+def _quote(text):
+    return '"%s"' % text.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _hex(kind, data):
+    return '%s:%s' % (kind, ','.join('%02x' % b for b in data))
+
+
+def _byte_list(value):
+    if isinstance(value, (list, tuple)):
+        items = value
+    elif isinstance(value, str):
+        # "([byte[]](0,0,2,0))" as copied from PowerShell, or plain "0,0,2,0"
+        items = [item for item in _byte_cast.sub('', value).split(',') if item]
+    else:
+        raise ValueError('binary value must be a list of bytes')
+    return bytes(int(item, 0) if isinstance(item, str) else item for item in items)
+
+
+def encode_value(rtype, value):
+    """Return the .reg data for one value, like ``dword:00000001``; raises ValueError if it has none."""
+    value = comparable_value(rtype, value)
+    if rtype == 'dword':
+        if not isinstance(value, int) or not -2 ** 31 <= value < 2 ** 32:
+            raise ValueError('not a 32-bit number: %r' % (value,))
+        return 'dword:%08x' % (value & 0xffffffff)
+    if rtype == 'qword':
+        if not isinstance(value, int) or not -2 ** 63 <= value < 2 ** 64:
+            raise ValueError('not a 64-bit number: %r' % (value,))
+        return _hex('hex(b)', (value & 0xffffffffffffffff).to_bytes(8, 'little'))
+    if rtype == 'string':
+        if value is None:
+            raise ValueError('string value is null')
+        if '\n' in value or '\r' in value:
+            return _hex('hex(1)', (value + '\0').encode('utf-16-le'))
+        return _quote(value)
+    if rtype == 'expandstring':
+        if value is None:
+            raise ValueError('expandstring value is null')
+        return _hex('hex(2)', (value + '\0').encode('utf-16-le'))
+    if rtype == 'multistring':
+        items = value if isinstance(value, (list, tuple)) else [value]
+        if any(not isinstance(item, str) for item in items):
+            raise ValueError('multistring items must be strings')
+        return _hex('hex(7)', ''.join(item + '\0' for item in items).encode('utf-16-le') + b'\0\0')
+    if rtype == 'binary':
+        return _hex('hex', _byte_list(value))
+    raise ValueError('unknown type: %s' % rtype)
+
+
+def _value_line(name, data):
+    return '%s=%s' % ('@' if name == '' else _quote(name), data)
+
+
+def tweak_applies(tweak, profile, windows):
+    versions = tweak.data.get('windows-versions')
+    return profile in tweak.profiles and (not isinstance(versions, list) or windows in versions)
+
+
+def collect_writes(tweaks):
+    """Merge the registry entries of *tweaks* into ``{key: {lower-case name: write}}``.
+
+    A write is a dict with the value ``name``, the .reg ``data`` and
+    ``undo`` strings and the ids of the ``tweaks`` making it. When tweaks
+    disagree on a value, the first tweak by id wins. Returns the writes, the conflicts and the
+    entries that were skipped, as ``(tweak id, label, reason)``.
+    """
+    keys = {}
+    spelled = {}
+    conflicts = []
+    skipped = []
+    for tweak in sorted(tweaks, key=lambda t: t.id):
+        for entry in tweak.registry:
+            if not entry.get('key'):
+                continue
+            label = '%s\\%s' % (entry['key'], '(Default)' if entry.get('name') in (None, '') else entry['name'])
+            rtype = (entry.get('type') or 'dword').lower()
+            try:
+                data = encode_value(rtype, entry.get('value'))
+                default = entry.get('default-value')
+                undo = '-' if default is None else encode_value(rtype, default)
+            except (ValueError, TypeError) as e:
+                skipped.append((tweak.id, label, str(e)))
+                continue
+            fp_key, fp_name = fingerprint(entry['key'], entry.get('name'))
+            key = spelled.setdefault(fp_key, reg_key(entry['key']))
+            name = '' if fp_name == '' else str(entry.get('name')).strip()
+            values = keys.setdefault(key, {})
+            current = values.get(name.lower())
+            if current is None:
+                values[name.lower()] = {'name': name, 'data': data, 'undo': undo, 'tweaks': [tweak.id]}
+            elif current['data'] == data:
+                current['tweaks'].append(tweak.id)
+            else:
+                conflicts.append((tweak.id, label, 'keeps %s from %s' % (current['data'], current['tweaks'][0])))
+    return keys, conflicts, skipped
+
+
+def render_reg(keys, undo=False, comment=()):
+    """Return the .reg text for ``collect_writes`` output, or for its undo."""
+    lines = [REG_HEADER, '']
+    lines.extend('; %s' % line for line in comment)
+    if comment:
+        lines.append('')
+    for key in sorted(keys, key=key_order):
+        lines.append('[%s]' % key)
+        for write in sorted(keys[key].values(), key=lambda write: name_order(write['name'])):
+            lines.append(_value_line(write['name'], write['undo' if undo else 'data']))
+        lines.append('')
+    return '\r\n'.join(lines) + '\r\n'
+
+
+def encode_reg(text):
+    return ('\ufeff' + text).encode('utf-16-le')
+
+
+def read_reg(data):
+    """Parse .reg *data* into ``[(key, [(name, data)])]`` in file order."""
+    text = data.decode('utf-16') if data[:2] in (b'\xff\xfe', b'\xfe\xff') else data.decode('utf-8')
+    keys = []
+    for line in text.splitlines():
+        if not line or line.startswith(';') or line == REG_HEADER:
+            continue
+        if line.startswith('[') and line.endswith(']'):
+            keys.append((line[1:-1], []))
+            continue
+        if line.startswith('@='):
+            name, data = '', line[2:]
+        else:
+            match = re.match(r'"((?:[^"\\]|\\.)*)"=(.*)$', line)
+            if not match or not keys:
+                raise ValueError('unexpected line: %r' % line)
+            name, data = re.sub(r'\\(.)', r'\1', match.group(1)), match.group(2)
+        keys[-1][1].append((name, data))
+    return keys
+
+
+def apply_reg(parsed, registry):
+    """Apply ``read_reg`` output to *registry*, a ``{lower-case key: {lower-case name: data}}`` model.
+
+    ``-`` as the data deletes the value, as ``reg import`` does.
+    """
+    for key, values in parsed:
+        current = registry.setdefault(key.lower(), {})
+        for name, data in values:
+            if data == '-':
+                current.pop(name.lower(), None)
+            else:
+                current[name.lower()] = data
+    return registry
+
+
+def check_bundle(keys, apply_data, undo_data):
+    """Return a list of problems with a written bundle and its undo file.
+
+    Both files must hold exactly the values in *keys* (``collect_writes``
+    output), each key once, in ``key_order`` and with values in
+    ``name_order``. Importing the bundle and then its undo file into an
+    empty registry must leave every value at its default, and no value
+    where there is none.
+    """
+    problems = []
+    parsed_files = []
+    for label, data, field in (('bundle', apply_data, 'data'), ('undo', undo_data, 'undo')):
+        parsed = read_reg(data)
+        parsed_files.append(parsed)
+        order = [key_order(key) for key, _ in parsed]
+        if any(a > b for a, b in zip(order, order[1:])):
+            problems.append('%s: keys are not in sorted order' % label)
+        seen = set()
+        for key, _ in parsed:
+            if key.lower() in seen:
+                problems.append('%s: %s appears more than once' % (label, key))
+            seen.add(key.lower())
+        found = {}
+        for key, values in parsed:
+            names = [name_order(name) for name, _ in values]
+            if any(a >= b for a, b in zip(names, names[1:])):
+                problems.append('%s: values of %s are not in order or repeat' % (label, key))
+            found.update(((key.lower(), name.lower()), value) for name, value in values)
+        expected = {(key.lower(), name): write[field]
+                    for key, values in keys.items() for name, write in values.items()}
+        if found != expected:
+            missing = sorted(set(expected) - set(found))
+            extra = sorted(set(found) - set(expected))
+            wrong = sorted(k for k in set(found) & set(expected) if found[k] != expected[k])
+            problems.append('%s: %d values missing, %d unexpected, %d different%s' % (
+                label, len(missing), len(extra), len(wrong),
+                ' (first: %s)' % '\\'.join((missing + extra + wrong)[0]) if missing or extra or wrong else ''))
+
+    registry = {}
+    for parsed in parsed_files:
+        apply_reg(parsed, registry)
+    restored = {(key, name): data for key, values in registry.items() for name, data in values.items()}
+    defaults = {(key.lower(), name): write['undo']
+                for key, values in keys.items() for name, write in values.items() if write['undo'] != '-'}
+    if restored != defaults:
+        left = sorted(k for k in restored if k not in defaults or restored[k] != defaults[k])
+        lost = sorted(set(defaults) - set(restored))
+        problems.append('bundle then undo: %d values not at their default, %d defaults missing%s' % (
+            len(left), len(lost), ' (first: %s)' % '\\'.join((left + lost)[0])))
+    return problems
+
+
+def bundle_name(profile, windows):
+    return '%s-win%s' % (profile, windows)
+
+
+def build_bundles(tweaks, versions=WINDOWS_VERSIONS):
+    """Return ``({filename: bytes}, manifest, writes, conflicts, skipped)`` for every profile and version.
+
+    *writes* maps each bundle name to its ``collect_writes`` keys, for
+    check_bundle.
+    """
+    profiles = sorted({profile for tweak in tweaks for profile in tweak.profiles})
+    files = {}
+    bundles = []
+    writes = {}
+    conflicts = set()
+    skipped = set()
+    for profile in profiles:
+        for windows in versions:
+            selected = [tweak for tweak in tweaks if tweak_applies(tweak, profile, windows)]
+            with_registry = [tweak for tweak in selected if tweak.registry]
+            if not with_registry:
+                continue
+            keys, clashes, skips = collect_writes(with_registry)
+            conflicts.update(clashes)
+            skipped.update(skips)
+            name = bundle_name(profile, windows)
+            count = sum(len(values) for values in keys.values())
+            comment = ('Perch tweaks for the %s profile on Windows %s: %d values in %d keys' % (
+                profile, windows, count, len(keys)),)
+            apply_data = encode_reg(render_reg(keys, comment=comment))
+            undo_data = encode_reg(render_reg(keys, undo=True, comment=(
+                'Undo of %s.reg: restores default values, deleting values without one' % name,)))
+            files[name + '.reg'] = apply_data
+            files[name + '-undo.reg'] = undo_data
+            writes[name] = keys
+            bundles.append({
+                'profile': profile,
+                'windows': windows,
+                'file': name + '.reg',
+                'undo': name + '-undo.reg',
+                'keys': len(keys),
+                'values': count,
+                'tweaks': sorted({t for values in keys.values() for write in values.values() for t in write['tweaks']}),
+                'scripts': sorted(tweak.id for tweak in selected if not tweak.registry),
+                'sha256': hashlib.sha256(apply_data).hexdigest(),
+            })
+    manifest = {'version': VERSION, 'bundles': bundles}
+    return files, manifest, writes, sorted(conflicts), sorted(skipped)
@@ -0,0 +1,196 @@
+"""Which catalog tweaks are in effect according to exported .reg snapshots.
+
+A regedit or ``reg export`` of HKLM or HKCU runs to hundreds of MB, most
+of it keys no tweak touches. ``read_snapshot`` memory-maps the file and
+walks it key header by key header, searching the raw bytes for the next
+``\\n[`` in the file's own encoding (UTF-16LE with a BOM, or UTF-8/ANSI).
+Only the header line is decoded. The values of a key are decoded and
+parsed only when the key is one a tweak references, so the file is never
+loaded as text and the result holds just the referenced
+``(key, name) -> data`` pairs.
+
+Values are compared in .reg notation: ``checks`` encodes every catalog
+entry's value and default-value with reg_bundle.encode_value, and the
+snapshot's data is brought to the same form (continuation lines joined,
+hex lists without spaces, lower case), so one string comparison decides
+each value.
+
+Per entry the state is ``applied`` (the tweak's value), ``default`` (the
+default-value, or absent), ``custom`` (some other value) or ``unknown``
+(the entry's hive is not in any snapshot). A tweak is ``applied`` when
+every known entry is, ``partial`` when some are, ``default`` when all
+are at their default, ``custom`` otherwise and ``unknown`` when no entry
+could be checked.
+"""
+import codecs, mmap, re
+
+from reg_bundle import encode_value, reg_key
+
+STATES = ('applied', 'partial', 'default', 'custom', 'unknown')
+
+_value_line = re.compile(r'(?:"((?:[^"\\]|\\.)*)"|(@))=(.*)$', re.S)
+_unescape = re.compile(r'\\(.)')
+_spaces = re.compile(r'\s+')
+
+
+def checks(tweaks):
+    """Return ``(tweak, [(label, key, name, data, default)])`` per tweak with registry entries, and the skipped entries.
+
+    *key* and *name* are lower-cased in export spelling
+    (``hkey_local_machine\\...``), *data* and *default* in .reg notation;
+    *default* is None when the default is for the value to be absent.
+    Skipped entries are ``(tweak id, label, reason)``.
+    """
+    result = []
+    skipped = []
+    for tweak in sorted(tweaks, key=lambda t: t.id):
+        entries = []
+        for entry in tweak.registry:
+            if not entry.get('key'):
+                continue
+            name = '' if entry.get('name') is None else str(entry['name']).strip()
+            if name.lower() in ('(default)', '@'):
+                name = ''
+            label = '%s\\%s' % (entry['key'], name or '(Default)')
+            rtype = (entry.get('type') or 'dword').lower()
+            try:
+                data = encode_value(rtype, entry.get('value'))
+                default = entry.get('default-value')
+                default = None if default is None else encode_value(rtype, default)
+            except (ValueError, TypeError) as e:
+                skipped.append((tweak.id, label, str(e)))
+                continue
+            entries.append((label, reg_key(entry['key']).lower(), name.lower(), data, default))
+        if entries:
+            result.append((tweak, entries))
+    return result, skipped
+
+
+def wanted_keys(tweak_checks):
+    """Return ``{key: {names}}`` for everything *tweak_checks* looks up."""
+    wanted = {}
+    for _, entries in tweak_checks:
+        for _, key, name, _, _ in entries:
+            wanted.setdefault(key, set()).add(name)
+    return wanted
+
+
+def canonical_data(data):
+    """Return .reg value *data* as encode_value writes it."""
+    data = data.strip()
+    if data.startswith('"'):
+        return data
+    # regedit spaces hex lists after joining its continuation lines
+    return _spaces.sub('', data).lower()
+
+
+def _parse_values(text, names):
+    """Yield ``(lower-case name, canonical data)`` for the value lines in *text* whose name is in *names*."""
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        i += 1
+        while line.endswith('\\') and i < len(lines):
+            line = line[:-1] + lines[i].strip()
+            i += 1
+        match = _value_line.match(line)
+        if not match:
+            continue
+        name = '' if match.group(2) else _unescape.sub(r'\1', match.group(1))
+        if name.lower() in names and match.group(3) != '-':
+            yield name.lower(), canonical_data(match.group(3))
+
+
+def read_snapshot(path, wanted, values=None, hives=None, user=None):
+    """Collect the *wanted* values from the .reg export at *path*.
+
+    *wanted* is ``{lower-case key: {lower-case names}}``. Adds the found
+    ``(key, name) -> data`` pairs to *values* and the hives the export
+    covers to *hives*, and returns both with ``(bytes, keys, keys read)``.
+    *user* is a key such as ``HKEY_USERS\\S-1-5-21-...`` to read as
+    HKEY_CURRENT_USER, for exports taken from another account.
+    """
+    user = user.rstrip('\\').lower() if user else None
+    values = {} if values is None else values
+    hives = set() if hives is None else hives
+    with open(path, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap refuses empty files
+            return values, hives, (0, 0, 0)
+    with data:
+        if data[:2] in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+            encoding = 'utf-16-le' if data[:2] == codecs.BOM_UTF16_LE else 'utf-16-be'
+            width, start = 2, 2
+        else:
+            encoding = 'utf-8'
+            width, start = 1, 3 if data[:3] == codecs.BOM_UTF8 else 0
+        newline = '\n'.encode(encoding)
+        header = '\n['.encode(encoding)
+        size = len(data)
+        keys = read = 0
+
+        def next_header(offset):
+            # The start of the next "[key]" line, on a character boundary
+            while True:
+                found = data.find(header, offset)
+                if found < 0:
+                    return size
+                if (found - start) % width == 0:
+                    return found + width
+                offset = found + 1
+
+        position = start if data[start:start + width] == '['.encode(encoding) else next_header(start)
+        while position < size:
+            end = data.find(newline, position)
+            end = size if end < 0 else end
+            line = data[position + width:end].decode(encoding, 'replace').rstrip('\r')
+            following = next_header(end)
+            if line.endswith(']') and not line.startswith('-'):
+                keys += 1
+                key = line[:-1].lower()
+                if user and (key == user or key.startswith(user + '\\')):
+                    key = 'hkey_current_user' + key[len(user):]
+                hives.add(key.split('\\', 1)[0])
+                names = wanted.get(key)
+                if names:
+                    read += 1
+                    block = data[end + width:following].decode(encoding, 'replace')
+                    for name, value in _parse_values(block, names):
+                        values[key, name] = value
+            position = following
+    return values, hives, (size, keys, read)
+
+
+def entry_state(key, name, data, default, values, hives):
+    if key.split('\\', 1)[0] not in hives:
+        return 'unknown', None
+    found = values.get((key, name))
+    if found == data:
+        return 'applied', found
+    if found is None or found == default:
+        return 'default', found
+    return 'custom', found
+
+
+def tweak_states(tweak_checks, values, hives):
+    """Return ``(tweak, status, [(label, state, found data)])`` for every checked tweak."""
+    results = []
+    for tweak, entries in tweak_checks:
+        states = [(label,) + entry_state(key, name, data, default, values, hives)
+                  for label, key, name, data, default in entries]
+        known = [state for _, state, _ in states if state != 'unknown']
+        if not known:
+            status = 'unknown'
+        elif all(state == 'applied' for state in known):
+            status = 'applied'
+        elif 'applied' in known:
+            status = 'partial'
+        elif all(state == 'default' for state in known):
+            status = 'default'
+        else:
+            status = 'custom'
+        results.append((tweak, status, states))
+    return results
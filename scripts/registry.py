@@ -0,0 +1,63 @@
+"""Registry path helpers shared by the catalog tooling.
+
+Catalog entries, Sophia and WinUtil spell the same key in several ways
+(``HKLM:\\``, ``HKEY_LOCAL_MACHINE\\``, ``Registry::HKEY_CLASSES_ROOT\\``);
+these helpers reduce them to one comparable form. ``comparable`` does the
+same for the data a catalog registry entry writes.
+"""
+
+HIVES = {
+    'HKEY_LOCAL_MACHINE': 'HKLM',
+    'HKEY_CURRENT_USER': 'HKCU',
+    'HKEY_CLASSES_ROOT': 'HKCR',
+    'HKEY_USERS': 'HKU',
+    'HKEY_CURRENT_CONFIG': 'HKCC',
+}
+
+
+def normalize_key(key):
+    """Return *key* as ``HIVE\\path`` with a short hive name, lowercased."""
+    key = key.strip().strip('"')
+    if '::' in key:
+        key = key.split('::', 1)[1]
+    elif key.lower().startswith('registry\\'):
+        key = key[len('registry\\'):]
+    hive, _, rest = key.replace('/', '\\').partition('\\')
+    hive = hive.rstrip(':').upper()
+    hive = HIVES.get(hive, hive)
+    rest = '\\'.join(part for part in rest.split('\\') if part)
+    return ('%s\\%s' % (hive, rest) if rest else hive).lower()
+
+
+def normalize_name(name):
+    """Return a value name in comparable form; the default value is ``''``."""
+    name = '' if name is None else str(name).strip()
+    return '' if name.lower() in ('(default)', '@') else name.lower()
+
+
+def fingerprint(key, name):
+    """Return the ``(key, value name)`` pair identifying one registry value."""
+    return normalize_key(key), normalize_name(name)
+
+
+def comparable(entry):
+    """Return the ``(type, value)`` pair two writes must share to agree."""
+    rtype = (entry.get('type') or 'dword').lower()
+    return rtype, comparable_value(rtype, entry.get('value'))
+
+
+def comparable_value(rtype, value):
+    """Return *value* as written for a value of type *rtype*: ``"1"`` and ``1`` agree for a dword."""
+    if isinstance(value, bool):
+        value = int(value)
+    elif isinstance(value, list):
+        # Byte lists for binary values; tuples keep the data hashable
+        value = tuple(value)
+    if rtype in ('dword', 'qword') and isinstance(value, str):
+        try:
+            value = int(value, 0)
+        except ValueError:
+            pass
+    elif rtype in ('string', 'expandstring') and value is not None:
+        value = str(value)
+    return value
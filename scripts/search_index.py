@@ -0,0 +1,123 @@
+"""Prefix search index for the gallery page.
+
+Every entry's name, tags, category and description are split into
+lower-case word tokens, and every prefix of every token (up to
+``MAX_PREFIX`` characters) is mapped to the entries containing it. A query
+matches the entries that have, for each of its words, a token starting
+with that word, so looking it up costs one dict access per word plus an
+intersection of posting lists, however large the catalog grows.
+
+The artifact is JSON: the entry ids, the distinct posting lists
+(delta-encoded, since many prefixes of one word share a list) and a map
+from prefix to list number. ``search`` here and the script in index.astro
+implement the same query.
+"""
+import json, re
+
+VERSION = 1
+MAX_PREFIX = 16
+FIELDS = ('name', 'tags', 'category', 'description')
+
+_word = re.compile(r'[^\W_]+')
+
+
+def tokens(text):
+    """Return the lower-case words of *text*; ``C#``, ``.NET`` and ``7-Zip`` give ``c``, ``net``, ``7`` and ``zip``."""
+    return _word.findall(text.lower())
+
+
+def entry_tokens(entry):
+    """Return the set of tokens for a catalog_loader entry."""
+    words = set()
+    for field in FIELDS:
+        value = entry.data.get(field)
+        for text in value if isinstance(value, list) else (value,):
+            if isinstance(text, (str, int, float)) and not isinstance(text, bool):
+                words.update(tokens(str(text)))
+    # "Visual Studio Code" is also found as "visualstudio..."
+    if isinstance(entry.name, str):
+        joined = ''.join(tokens(entry.name))
+        if joined:
+            words.add(joined)
+    return words
+
+
+def query_words(query):
+    return [word[:MAX_PREFIX] for word in tokens(query)]
+
+
+def build_index(entries):
+    """Return the index for *entries* as a JSON-serializable dict."""
+    ids = [entry.id for entry in entries]
+    postings = {}
+    for number, entry in enumerate(entries):
+        for word in entry_tokens(entry):
+            for n in range(1, min(len(word), MAX_PREFIX) + 1):
+                docs = postings.setdefault(word[:n], [])
+                if not docs or docs[-1] != number:
+                    docs.append(number)
+
+    lists = []
+    list_numbers = {}
+    terms = {}
+    for prefix in sorted(postings):
+        key = tuple(postings[prefix])
+        if key not in list_numbers:
+            list_numbers[key] = len(lists)
+            lists.append([key[0]] + [b - a for a, b in zip(key, key[1:])])
+        terms[prefix] = list_numbers[key]
+    return {'version': VERSION, 'maxPrefix': MAX_PREFIX, 'ids': ids, 'lists': lists, 'terms': terms}
+
+
+def dumps(index):
+    return json.dumps(index, separators=(',', ':'), ensure_ascii=False)
+
+
+class SearchIndex:
+    """Query side of a built index, mirroring the page script."""
+
+    def __init__(self, index):
+        self.ids = index['ids']
+        self.terms = index['terms']
+        self.lists = index['lists']
+        self._decoded = {}
+
+    def postings(self, number):
+        docs = self._decoded.get(number)
+        if docs is None:
+            total = 0
+            docs = []
+            for delta in self.lists[number]:
+                total += delta
+                docs.append(total)
+            docs = self._decoded[number] = frozenset(docs)
+        return docs
+
+    def search(self, query):
+        """Return the ids of the entries matching every word of *query*, in index order."""
+        words = query_words(query)
+        if not words:
+            return list(self.ids)
+        matched = None
+        # Rarest word first keeps the intersection small
+        for number in sorted((self.terms.get(word) for word in words), key=lambda n: -1 if n is None else
+                             len(self.lists[n])):
+            if number is None:
+                return []
+            docs = self.postings(number)
+            matched = docs if matched is None else matched & docs
+            if not matched:
+                return []
+        return [self.ids[n] for n in sorted(matched)]
+
+
+class LinearScan:
+    """Checks every entry's tokens for every query; the reference ``SearchIndex`` must agree with."""
+
+    def __init__(self, entries):
+        self.entries = [(entry.id, tuple(entry_tokens(entry))) for entry in entries]
+
+    def search(self, query):
+        words = query_words(query)
+        return [entry_id for entry_id, words_of_entry in self.entries
+                if all(any(token.startswith(word) for token in words_of_entry) for word in words)]
@@ -0,0 +1,304 @@
+"""Sophia Script metadata and registry extraction shared by the importers.
+
+Maps Sophia.psm1 functions to perch-gallery tweaks: which functions to
+skip, the gallery metadata for the rest, and how their registry calls map
+to tweak YAML. Function bodies are parsed with sophia_ast.
+"""
+import re
+
+import sophia_ast, tweak_yaml
+from instrument import count, stage
+
+SOURCE = 'sophia-script'
+
+
+def slugify(name):
+    s = name.lower().strip()
+    s = re.sub(r'[^a-z0-9\s-]', '', s)
+    s = re.sub(r'[\s]+', '-', s)
+    s = re.sub(r'-+', '-', s)
+    return s.strip('-')
+
+
+# Functions not suitable for simple registry YAML. Overlap with tweaks
+# already in the gallery is detected by dedup_index instead.
+skip_functions = {
+    'FolderGroupBy',      # complex explorer view settings
+    'Install-Cursors',    # cursor installation
+    'OneDrive',           # complex uninstall/reinstall
+    'DefaultTerminalApp', # complex app registration
+    'DNSoverHTTPS',       # complex DNS configuration
+    'CleanupTask',        # scheduled task, not registry
+    'SoftwareDistributionTask',  # scheduled task
+    'TempTask',           # scheduled task
+}
+
+# (category, tags, profiles, windows-versions, name, description)
+sophia_meta = {
+    'ActiveHours': ('System/Updates', ['updates', 'active-hours', 'restart'], ['power-user'], [10, 11],
+                    'Set Active Hours Automatically', 'Automatically adjust active hours based on device activity to avoid restart during use'),
+    'AdminApprovalMode': ('Security/UAC', ['security', 'uac', 'admin'], ['power-user'], [10, 11],
+                          'Disable UAC Admin Approval Mode', 'Disable the User Account Control admin approval mode for the built-in Administrator account'),
+    'AppsSilentInstalling': ('Privacy/Advertising', ['privacy', 'auto-install', 'suggestions'], ['power-user'], [10, 11],
+                             'Disable Silent App Installing', 'Disable automatic installing of suggested apps'),
+    'AppsSmartScreen': ('Security/Defender', ['security', 'smartscreen', 'defender'], ['power-user'], [10, 11],
+                        'Disable App SmartScreen', 'Disable Microsoft Defender SmartScreen for apps'),
+    'Autoplay': ('System/Devices', ['autoplay', 'media', 'devices'], ['power-user'], [10, 11],
+                 'Disable AutoPlay', 'Disable AutoPlay for all media and devices'),
+    'CABInstallContext': ('Explorer/Context Menu', ['explorer', 'context-menu', 'cab', 'install'], ['developer'], [10, 11],
+                          'Add CAB Install Context Menu', 'Add Install item to .cab file context menu'),
+    'CheckBoxes': ('Explorer/Appearance', ['explorer', 'checkboxes', 'selection'], ['power-user'], [10, 11],
+                   'Disable Item Check Boxes', 'Disable item check boxes in File Explorer'),
+    'ClockInNotificationCenter': ('Taskbar/Clock', ['taskbar', 'clock', 'notification-center'], ['power-user'], [11],
+                                  'Show Clock in Notification Center', 'Show clock in the notification center area'),
+    'CompressedFolderNewContext': ('Explorer/Context Menu', ['explorer', 'context-menu', 'zip', 'new'], ['power-user'], [10, 11],
+                                  'Add Compressed Folder to New Menu', 'Add Compressed (zipped) Folder to the New context menu'),
+    'ControlPanelView': ('System/Settings', ['control-panel', 'icons', 'view'], ['power-user'], [10, 11],
+                         'Control Panel Icon View', 'Set Control Panel to large/small icons or category view'),
+    'DeliveryOptimization': ('System/Updates', ['updates', 'delivery-optimization', 'bandwidth'], ['power-user'], [10, 11],
+                             'Disable Delivery Optimization', 'Disable Windows Update Delivery Optimization for peer-to-peer updates'),
+    'DiagnosticDataLevel': ('Privacy/Telemetry', ['privacy', 'diagnostics', 'telemetry'], ['power-user'], [10, 11],
+                            'Set Diagnostic Data to Minimum', 'Set diagnostic data collection to required (minimum) level'),
+    'EventViewerCustomView': ('System/Diagnostics', ['event-viewer', 'diagnostics', 'process-creation'], ['developer'], [10, 11],
+                              'Enable Process Creation Event View', 'Create a custom Event Viewer view for process creation events'),
+    'FeedbackFrequency': ('Privacy/Telemetry', ['privacy', 'feedback', 'telemetry'], ['power-user'], [10, 11],
+                          'Disable Feedback Requests', 'Set Windows feedback frequency to never'),
+    'FileTransferDialog': ('Explorer/Appearance', ['explorer', 'file-transfer', 'dialog'], ['power-user'], [10, 11],
+                           'Detailed File Transfer Dialog', 'Show detailed file transfer dialog box'),
+    'FirstLogonAnimation': ('Appearance/Logon', ['appearance', 'logon', 'animation'], ['power-user'], [10, 11],
+                            'Disable First Logon Animation', 'Disable the first sign-in animation'),
+    'GPUScheduling': ('Performance/GPU', ['performance', 'gpu', 'scheduling'], ['power-user'], [10, 11],
+                      'Enable GPU Scheduling', 'Enable hardware-accelerated GPU scheduling'),
+    'JPEGWallpapersQuality': ('Appearance/Wallpaper', ['appearance', 'wallpaper', 'jpeg', 'quality'], ['power-user'], [10, 11],
+                              'Max JPEG Wallpaper Quality', 'Set JPEG desktop wallpaper import quality to maximum'),
+    'LocalSecurityAuthority': ('Security/System', ['security', 'lsa', 'credential-guard'], ['power-user'], [10, 11],
+                               'Enable LSA Protection', 'Enable Local Security Authority protection'),
+    'MergeConflicts': ('Explorer/Behavior', ['explorer', 'merge', 'conflicts'], ['power-user'], [10, 11],
+                       'Show Folder Merge Conflicts', 'Show folder merge conflicts in File Explorer'),
+    'MostUsedStartApps': ('Search/Start Menu', ['start-menu', 'most-used', 'apps'], ['power-user'], [10, 11],
+                          'Hide Most Used Start Apps', 'Hide most used apps from Start menu'),
+    'MSIExtractContext': ('Explorer/Context Menu', ['explorer', 'context-menu', 'msi', 'extract'], ['developer'], [10, 11],
+                          'Add MSI Extract Context Menu', 'Add Extract All item to .msi file context menu'),
+    'MultipleInvokeContext': ('Explorer/Context Menu', ['explorer', 'context-menu', 'bulk-selection'], ['power-user'], [10, 11],
+                              'Enable Bulk File Actions', 'Allow Open/Print/Edit for more than 15 selected files'),
+    'NavigationPaneExpand': ('Explorer/Navigation', ['explorer', 'navigation', 'expand'], ['power-user'], [10, 11],
+                             'Expand to Current Folder', 'Expand navigation pane to current folder'),
+    'NetworkAdaptersSavePower': ('Power/Devices', ['power', 'network', 'wake', 'sleep'], ['power-user'], [10, 11],
+                                 'Disable Network Adapter Power Saving', 'Prevent network adapters from waking the computer and disable power saving'),
+    'OneDriveFileExplorerAd': ('Explorer/Declutter', ['explorer', 'onedrive', 'ads', 'notifications'], ['power-user'], [10, 11],
+                               'Disable OneDrive File Explorer Ads', 'Disable OneDrive sync provider notifications in File Explorer'),
+    'PowerShellModulesLogging': ('Security/Logging', ['security', 'powershell', 'logging'], ['developer'], [10, 11],
+                                 'Enable PowerShell Module Logging', 'Enable logging for all PowerShell modules'),
+    'PowerShellScriptsLogging': ('Security/Logging', ['security', 'powershell', 'script-logging'], ['developer'], [10, 11],
+                                 'Enable PowerShell Script Logging', 'Enable logging for all PowerShell scripts'),
+    'PreventEdgeShortcutCreation': ('Browsers/Debloat', ['edge', 'shortcuts', 'desktop'], ['power-user'], [10, 11],
+                                    'Prevent Edge Desktop Shortcuts', 'Prevent Microsoft Edge from creating desktop shortcuts on update'),
+    'PrintCMDContext': ('Explorer/Context Menu', ['explorer', 'context-menu', 'batch', 'print'], ['developer'], [10, 11],
+                        'Add Print to BAT/CMD Context Menu', 'Add Print item to .bat and .cmd file context menu'),
+    'QuickAccessFrequentFolders': ('Explorer/Navigation', ['explorer', 'quick-access', 'folders'], ['power-user'], [10, 11],
+                                   'Hide Frequent Folders in Quick Access', 'Hide frequently used folders from Quick Access'),
+    'QuickAccessRecentFiles': ('Explorer/Navigation', ['explorer', 'quick-access', 'recent-files'], ['power-user'], [10, 11],
+                                'Hide Recent Files in Quick Access', 'Hide recently used files from Quick Access'),
+    'RecentlyAddedStartApps': ('Search/Start Menu', ['start-menu', 'recently-added', 'apps'], ['power-user'], [10, 11],
+                                'Hide Recently Added Start Apps', 'Hide recently added apps from Start menu'),
+    'RecommendedTroubleshooting': ('System/Troubleshooting', ['troubleshooting', 'automatic', 'diagnostics'], ['power-user'], [10, 11],
+                                   'Disable Auto Troubleshooting', 'Set recommended troubleshooter preferences to default'),
+    'RecycleBinDeleteConfirmation': ('Explorer/Behavior', ['explorer', 'recycle-bin', 'confirmation'], ['power-user'], [10, 11],
+                                     'Enable Delete Confirmation', 'Show delete confirmation dialog for Recycle Bin'),
+    'RestartDeviceAfterUpdate': ('System/Updates', ['updates', 'restart', 'automatic'], ['power-user'], [10, 11],
+                                 'Disable Auto Restart After Update', 'Prevent automatic restart after Windows Update'),
+    'RestartNotification': ('System/Updates', ['updates', 'restart', 'notification'], ['power-user'], [10, 11],
+                            'Show Restart Notification', 'Show notification when PC requires restart for updates'),
+    'RestorePreviousFolders': ('Explorer/Behavior', ['explorer', 'restore', 'folders', 'logon'], ['power-user'], [10, 11],
+                                'Restore Folders at Logon', 'Restore previous folder windows at logon'),
+    'SaveZoneInformation': ('Security/Downloads', ['security', 'zone', 'downloads', 'block'], ['power-user'], [10, 11],
+                            'Disable Zone Information Saving', 'Do not save zone information (Mark of the Web) in downloaded files'),
+    'SearchHighlights': ('Search/Start Menu', ['search', 'highlights', 'bing'], ['power-user'], [10, 11],
+                          'Disable Search Highlights', 'Disable search highlights (trending images/news) in search'),
+    'SecondsInSystemClock': ('Taskbar/Clock', ['taskbar', 'clock', 'seconds'], ['power-user'], [11],
+                              'Show Seconds in Clock', 'Show seconds on the taskbar clock'),
+    'SettingsSuggestedContent': ('Privacy/Advertising', ['privacy', 'settings', 'suggestions'], ['power-user'], [10, 11],
+                                 'Disable Settings Suggestions', 'Disable suggested content in the Settings app'),
+    'ShortcutsSuffix': ('Explorer/Behavior', ['explorer', 'shortcuts', 'suffix'], ['power-user'], [10, 11],
+                         'Remove Shortcut Suffix', 'Remove the - Shortcut suffix from new shortcuts'),
+    'SnapAssist': ('Appearance/Window Management', ['window-management', 'snap', 'assist'], ['power-user'], [10, 11],
+                   'Disable Snap Assist', 'Disable Snap Assist window arrangement suggestions'),
+    'StartAccountNotifications': ('Search/Start Menu', ['start-menu', 'account', 'notifications'], ['power-user'], [11],
+                                  'Disable Start Account Notifications', 'Disable Microsoft account notifications in Start'),
+    'StartLayout': ('Search/Start Menu', ['start-menu', 'layout', 'pins'], ['power-user'], [11],
+                    'Configure Start Layout', 'Set Start layout to show more pins or more recommendations'),
+    'StartRecommendedSection': ('Search/Start Menu', ['start-menu', 'recommended', 'declutter'], ['power-user'], [11],
+                                 'Hide Recommended Section', 'Hide the entire Recommended section in Start'),
+    'TailoredExperiences': ('Privacy/Telemetry', ['privacy', 'tailored-experiences', 'telemetry'], ['power-user'], [10, 11],
+                            'Disable Tailored Experiences', 'Disable tailored experiences based on diagnostic data'),
+    'TaskbarCombine': ('Taskbar/Layout', ['taskbar', 'combine', 'labels'], ['power-user'], [11],
+                       'Never Combine Taskbar Buttons', 'Show labels and never combine taskbar buttons'),
+    'ThisPC': ('Explorer/Desktop', ['explorer', 'desktop', 'this-pc', 'icon'], ['power-user'], [10, 11],
+               'Show This PC on Desktop', 'Show This PC icon on the desktop'),
+    'UpdateMicrosoftProducts': ('System/Updates', ['updates', 'microsoft', 'office'], ['power-user'], [10, 11],
+                                'Update Other Microsoft Products', 'Receive updates for other Microsoft products via Windows Update'),
+    'UseStoreOpenWith': ('System/Settings', ['store', 'open-with', 'app-suggestions'], ['power-user'], [10, 11],
+                         'Hide Store in Open With', 'Hide Look for an app in the Microsoft Store from Open With dialog'),
+    'WhatsNewInWindows': ('Privacy/Advertising', ['privacy', 'tips', 'whats-new'], ['power-user'], [10, 11],
+                          'Disable What\'s New in Windows', 'Disable the Ways to get the most out of Windows notifications'),
+    'WindowsLatestUpdate': ('System/Updates', ['updates', 'latest', 'preview'], ['power-user'], [10, 11],
+                            'Get Latest Windows Updates', 'Opt in to receive latest updates as soon as available'),
+    'WindowsTips': ('Privacy/Advertising', ['privacy', 'tips', 'suggestions'], ['power-user'], [10, 11],
+                    'Disable Windows Tips', 'Disable getting tips and suggestions when using Windows'),
+    'WindowsWelcomeExperience': ('Privacy/Advertising', ['privacy', 'welcome', 'post-update'], ['power-user'], [10, 11],
+                                 'Disable Welcome Experience', 'Disable Windows welcome experiences after updates'),
+    'XboxGameBar': ('Gaming/Xbox', ['gaming', 'xbox', 'game-bar'], ['power-user'], [10, 11],
+                    'Disable Xbox Game Bar', 'Disable Xbox Game Bar and related features'),
+    'XboxGameTips': ('Gaming/Xbox', ['gaming', 'xbox', 'game-tips'], ['power-user'], [10, 11],
+                     'Disable Xbox Game Tips', 'Disable Xbox Game Bar tips and notifications'),
+    # Additional functions from the skipped list
+    'PrtScnSnippingTool': ('Input/Keyboard', ['keyboard', 'print-screen', 'snipping-tool', 'screenshot'], ['power-user'], [10, 11],
+                           'PrintScreen Opens Snipping Tool', 'Map the Print Screen key to open Snipping Tool'),
+    'F1HelpPage': ('Input/Keyboard', ['keyboard', 'f1', 'help', 'disable'], ['power-user'], [10, 11],
+                   'Disable F1 Help Key', 'Disable the F1 help key from opening Bing search'),
+    'ErrorReporting': ('Privacy/Telemetry', ['privacy', 'error-reporting', 'telemetry'], ['power-user'], [10, 11],
+                       'Disable Error Reporting', 'Disable Windows Error Reporting'),
+    'WindowsAI': ('Privacy/AI', ['privacy', 'ai', 'recall', 'copilot'], ['power-user'], [11],
+                  'Disable Windows AI', 'Disable Windows AI features including Recall'),
+    'CapsLock': ('Input/Keyboard', ['keyboard', 'capslock', 'remap'], ['power-user'], [10, 11],
+                 'Disable Caps Lock', 'Disable the Caps Lock key'),
+    'EditWithClipchampContext': ('Explorer/Context Menu', ['explorer', 'context-menu', 'clipchamp'], ['power-user'], [11],
+                                 'Remove Clipchamp Context Menu', 'Remove Edit with Clipchamp from context menu'),
+    'EditWithPaintContext': ('Explorer/Context Menu', ['explorer', 'context-menu', 'paint'], ['power-user'], [11],
+                              'Remove Paint Context Menu', 'Remove Edit with Paint from image context menu'),
+    'EditWithPhotosContext': ('Explorer/Context Menu', ['explorer', 'context-menu', 'photos'], ['power-user'], [11],
+                               'Remove Photos Context Menu', 'Remove Edit with Photos from image context menu'),
+    'StickyShift': ('Accessibility/Keyboard', ['accessibility', 'keyboard', 'sticky-shift'], ['power-user'], [10, 11],
+                    'Disable Sticky Shift Shortcut', 'Disable the Sticky Keys prompt from pressing Shift 5 times'),
+    'NetworkDiscovery': ('Networking/Discovery', ['networking', 'discovery', 'sharing'], ['power-user'], [10, 11],
+                          'Enable Network Discovery', 'Enable Network Discovery and File Sharing'),
+    'SigninInfo': ('Privacy/Logon', ['privacy', 'sign-in', 'auto-finish'], ['power-user'], [10, 11],
+                   'Disable Sign-in Auto Setup', 'Disable using sign-in info to auto-finish setup after an update'),
+    'RecycleBinDeleteConfirmation': ('Explorer/Behavior', ['explorer', 'recycle-bin', 'confirmation'], ['power-user'], [10, 11],
+                                     'Enable Delete Confirmation', 'Show delete confirmation dialog for Recycle Bin'),
+}
+
+
+def convert_path(p):
+    p = p.replace(':\\', '\\').strip('"')
+    # Convert PowerShell registry provider paths
+    p = p.replace('Registry\\HKEY_CLASSES_ROOT', 'HKCR')
+    p = p.replace('Registry::HKEY_CLASSES_ROOT', 'HKCR')
+    return p
+
+
+_parameter_help = re.compile(r'^\s*\.PARAMETER\s+(\w+)\s*\n(.*?)(?=^\s*\.[A-Z]+\b|\Z)', re.M | re.S)
+
+
+def default_parameter_set(help_text, sets):
+    """Return the parameter set the help marks as "(default value)", or None."""
+    for m in _parameter_help.finditer(help_text or ''):
+        if m.group(1) in sets and '(default value)' in m.group(2).lower():
+            return m.group(1)
+    return None
+
+
+def registry_value(value):
+    """Return a New-ItemProperty value as it goes into the YAML, or None when it has no scalar form."""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    return None
+
+
+def parse_function_registry(func_body, func_name, help_text=None):
+    """Extract the registry values one parameter set of a function writes.
+
+    That is the first ``switch ($PSCmdlet.ParameterSetName)`` branch
+    writing any value, skipping the set *help_text* documents as the
+    default, plus the values written outside the switch. When the default
+    set is the only one writing, nothing is returned and the function is
+    skipped. Values built
+    from variables, splatting and loops are resolved by sophia_ast;
+    anything computed at run time is left out. Each entry's ``default``
+    is what the default parameter set writes, or None when it removes the
+    value or is unknown.
+    """
+    with stage('parse'):
+        tree = sophia_ast.function_ast(func_body)
+    with stage('extract'):
+        operations = sophia_ast.registry_operations(tree)
+        sets = sophia_ast.parameter_sets(tree)
+    count('registry-calls', len(operations))
+    default_set = default_parameter_set(help_text, sets)
+    writing = [s for s in sets if any(label == s and op.action == 'set' for label, op in operations)]
+    if writing and writing == [default_set]:
+        # Only restoring the default writes; the change itself removes values
+        return []
+    desired = next((s for s in writing if s != default_set), None)
+
+    defaults = {}
+    for label, op in operations:
+        if default_set is not None and label == default_set:
+            defaults[(op.path.lower(), op.name.lower())] = registry_value(op.value) if op.action == 'set' else None
+
+    entries = []
+    seen = set()
+    for label, op in operations:
+        if op.action != 'set' or label not in (None, desired):
+            continue
+        value = registry_value(op.value)
+        key = (convert_path(op.path), op.name)
+        if value is None or key in seen:
+            continue
+        seen.add(key)
+        entries.append({
+            'path': key[0],
+            'name': op.name,
+            'type': op.type,
+            'value': value,
+            'default': defaults.get((op.path.lower(), op.name.lower())),
+        })
+    return entries
+
+
+def render_tweak(name, category, tags, description, profiles, versions, reg_entries):
+    return tweak_yaml.render_tweak({
+        'name': name,
+        'category': category,
+        'tags': tags,
+        'description': description,
+        'profiles': profiles,
+        'windows-versions': versions,
+        'source': SOURCE,
+        'registry': [{'key': entry['path'], 'name': entry['name'], 'value': entry['value'],
+                      'type': entry['type'], 'default-value': entry['default']} for entry in reg_entries],
+    })
+
+
+def build_tweak(func_name, func_body, meta, index=None, help_text=None):
+    """Return ``(relpath, text, duplicate_of)`` for a function, or None without registry entries.
+
+    *relpath* is relative to catalog/tweaks. *duplicate_of* is the id of a
+    catalog tweak from another source covering the same ground according
+    to the dedup *index*, or None.
+    """
+    category, tags, profiles, versions, name, description = meta
+
+    # Parse registry entries (take first occurrence of each path+name pair)
+    reg_entries = parse_function_registry(func_body, func_name, help_text)
+    if not reg_entries:
+        return None
+
+    duplicate_of = None
+    if index is not None:
+        with stage('dedup'):
+            duplicate_of = index.find(name, [(e['path'], e['name']) for e in reg_entries], source=SOURCE)
+
+    slug = slugify(name)
+    top_cat = category.split('/')[0].lower().replace(' ', '-')
+    relpath = '%s/%s.yaml' % (top_cat, slug)
+    with stage('render'):
+        text = render_tweak(name, category, tags, description, profiles, versions, reg_entries)
+    return relpath, text, duplicate_of
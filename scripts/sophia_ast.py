@@ -0,0 +1,646 @@
+"""Reduced PowerShell statement parser for Sophia function bodies.
+
+``parse_body`` turns a function body into a small AST: assignments,
+commands with their named and positional arguments, ``switch``, ``if``,
+``foreach``, ``try`` and pipelines; anything else is kept as raw text.
+``registry_operations`` then walks it with an environment of the simple
+values assigned so far (literals, expandable strings, arrays and
+hashtables), so calls built from variables, splatted hashtables and
+loops over literal lists resolve to concrete paths and values. Each
+New-ItemProperty, Set-ItemProperty and Remove-ItemProperty call is
+reported with the ``switch ($PSCmdlet.ParameterSetName)`` branch it sits
+in, or ``None`` when it runs for every parameter set.
+
+ASTs are pickled to .cache/sophia-ast/, one file per body hash, so a
+re-import only parses functions whose text changed; the instrument
+counters ``ast-parsed`` and ``ast-cached`` say how many were which.
+"""
+import hashlib, os, pickle, re
+from collections import namedtuple
+
+from instrument import count
+
+# Bump when the node types or the parser output change
+AST_VERSION = 1
+
+cache_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'sophia-ast')
+
+# Statements
+Assign = namedtuple('Assign', 'name value')
+Command = namedtuple('Command', 'name args blocks')
+Switch = namedtuple('Switch', 'subject branches')
+If = namedtuple('If', 'branches')
+Foreach = namedtuple('Foreach', 'var items block')
+Block = namedtuple('Block', 'statements')
+# Values
+Lit = namedtuple('Lit', 'value')
+Var = namedtuple('Var', 'name')
+Expand = namedtuple('Expand', 'parts')
+Array = namedtuple('Array', 'items')
+Hash = namedtuple('Hash', 'items')
+Splat = namedtuple('Splat', 'name')
+Raw = namedtuple('Raw', 'text')
+
+# A registry change: action is 'set' or 'remove'; type and value are None for removals
+RegistryOp = namedtuple('RegistryOp', 'action path name type value')
+
+_token = re.compile(r'''
+    (?P<ws>[ \t\r\f]+|`\r?\n)
+  | (?P<nl>\n|;)
+  | (?P<block_comment><\#.*?\#>)
+  | (?P<comment>\#[^\n]*)
+  | (?P<here>@(?P<q>["'])[ \t]*\r?\n.*?\r?\n(?P=q)@)
+  | (?P<op>@\(|@\{|\$\(|[{}()\[\],|])
+  | (?P<splat>@\w+)
+  | (?P<var>\$(?:\{[^}]*\}|[\w:?^]+(?:\.\w+)*))
+  | (?P<sq>'(?:[^']|'')*')
+  | (?P<dq>"(?:[^"`]|`.|"")*")
+  | (?P<param>-[A-Za-z_]\w*:?)
+  | (?P<num>(?:0x[0-9A-Fa-f]+|-?\d+)(?=[\s;,)}\]|]|$))
+  | (?P<assign>[-+*/]?=(?=[^=]|$))
+  | (?P<word>(?:[^\s{}()\[\],;|"'`=]|`.)+)
+''', re.VERBOSE | re.DOTALL)
+
+_string_var = re.compile(r'\$(?:\{([^}]*)\}|([\w:?^]+))|`(.)|\$\(')
+_escapes = {'n': '\n', 'r': '\r', 't': '\t', '0': '\0', 'a': '\a', 'b': '\b', 'f': '\f', 'v': '\v'}
+_closing = {'(': ')', '@(': ')', '$(': ')', '{': '}', '@{': '}', '[': ']'}
+_constants = {'$true': True, '$false': False, '$null': None}
+# Switch parameters never take the next token as their value
+_switches = {'force', 'passthru', 'recurse', 'whatif', 'confirm', 'wait', 'nonewwindow', 'verbose'}
+_scope = re.compile(r'^(?:script|local|global|private):', re.I)
+
+
+def tokenize(text):
+    """Return ``[(kind, text)]`` for PowerShell *text*, without whitespace and comments."""
+    tokens = []
+    pos, n = 0, len(text)
+    while pos < n:
+        m = _token.match(text, pos)
+        if not m:
+            # Unbalanced quote: the rest of the line is one word
+            end = text.find('\n', pos)
+            end = n if end < 0 else end
+            tokens.append(('word', text[pos:end]))
+            pos = end
+            continue
+        kind = m.lastgroup if m.lastgroup != 'q' else 'here'
+        if kind not in ('ws', 'comment', 'block_comment'):
+            tokens.append((kind, m.group(kind)))
+        pos = m.end()
+    return tokens
+
+
+def _expand(body):
+    """Return the parts of a double-quoted string body: text and ``Var`` or ``Raw`` nodes."""
+    parts = []
+    text = []
+    pos = 0
+    for m in _string_var.finditer(body):
+        text.append(body[pos:m.start()])
+        pos = m.end()
+        if m.group(3) is not None:
+            text.append(_escapes.get(m.group(3), m.group(3)))
+            continue
+        if ''.join(text):
+            parts.append(''.join(text))
+        text = []
+        if m.group(0) == '$(':
+            # Subexpressions are not evaluated; the rest of the string is opaque
+            parts.append(Raw(body[m.start():]))
+            return parts
+        parts.append(_variable('$' + (m.group(1) or m.group(2))))
+    text.append(body[pos:])
+    if ''.join(text):
+        parts.append(''.join(text))
+    return parts
+
+
+def _variable(name):
+    if name.lower() in _constants:
+        return Lit(_constants[name.lower()])
+    name = name[1:].strip('{}')
+    return Var(_scope.sub('', name).lower())
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset=0):
+        pos = self.pos + offset
+        return self.tokens[pos] if pos < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def skip_newlines(self):
+        while self.peek()[0] == 'nl':
+            self.pos += 1
+
+    def at(self, kind, text=None):
+        token = self.peek()
+        return token[0] == kind and (text is None or token[1].lower() == text)
+
+    def group_text(self):
+        """Consume a bracketed group starting at the current token and return its text."""
+        depth = 0
+        parts = []
+        while self.peek()[0] is not None:
+            kind, text = self.take()
+            parts.append(text)
+            if kind == 'op' and text in _closing:
+                depth += 1
+            elif kind == 'op' and text in (')', '}', ']'):
+                depth -= 1
+                if depth <= 0:
+                    break
+        return ' '.join(parts)
+
+    def script_block(self):
+        """Parse ``{ statements }`` at the current token."""
+        self.skip_newlines()
+        if not self.at('op', '{'):
+            return Block(())
+        self.take()
+        statements = self.statements()
+        if self.at('op', '}'):
+            self.take()
+        return Block(tuple(statements))
+
+    def statements(self):
+        result = []
+        while True:
+            self.skip_newlines()
+            kind, text = self.peek()
+            if kind is None or (kind == 'op' and text in ('}', ')')):
+                return result
+            start = self.pos
+            statement = self.statement()
+            if statement is not None:
+                result.append(statement)
+            if self.pos == start:
+                # Stray token; never loop on it
+                self.take()
+
+    def statement(self):
+        kind, text = self.peek()
+        keyword = text.lower() if kind == 'word' else None
+        if keyword == 'switch':
+            return self.switch()
+        if keyword == 'if':
+            return self.if_statement()
+        if keyword == 'foreach' and self.peek(1) == ('op', '('):
+            return self.foreach()
+        if keyword in ('for', 'while'):
+            self.take()
+            condition = self.group_text()
+            return If(((condition, self.script_block()),))
+        if keyword == 'do':
+            self.take()
+            block = self.script_block()
+            self.skip_newlines()
+            if self.at('word', 'while') or self.at('word', 'until'):
+                self.take()
+                self.group_text()
+            return block
+        if keyword == 'try':
+            self.take()
+            branches = [(None, self.script_block())]
+            while True:
+                save = self.pos
+                self.skip_newlines()
+                if self.at('word', 'catch'):
+                    self.take()
+                    while self.at('op', '[') or self.at('op', ','):
+                        self.take() if self.at('op', ',') else self.group_text()
+                    branches.append(('catch', self.script_block()))
+                elif self.at('word', 'finally'):
+                    self.take()
+                    branches.append((None, self.script_block()))
+                else:
+                    self.pos = save
+                    break
+            return Block(tuple(branches[0][1].statements) + tuple(
+                If(((label, block),)) if label else block for label, block in branches[1:]))
+        if keyword == 'param':
+            self.take()
+            self.group_text()
+            return None
+        if keyword == 'function':
+            self.take()
+            self.take()
+            self.script_block()
+            return None
+        if kind == 'var' and self.peek(1)[0] == 'assign':
+            name = _variable(self.take()[1])
+            op = self.take()[1]
+            value = self.expression()
+            if op != '=' or not isinstance(name, Var):
+                value = Raw(op)
+            return Assign(name.name if isinstance(name, Var) else '', value)
+        return self.pipeline()
+
+    def switch(self):
+        self.take()
+        while self.at('param'):
+            self.take()
+        subject = self.group_text() if self.at('op', '(') else ''
+        self.skip_newlines()
+        branches = []
+        if not self.at('op', '{'):
+            return Switch(subject, ())
+        self.take()
+        while True:
+            self.skip_newlines()
+            kind, text = self.peek()
+            if kind is None:
+                break
+            if kind == 'op' and text == '}':
+                self.take()
+                break
+            if kind == 'op' and text == '{':
+                label = Raw(self.group_text())
+            else:
+                self.take()
+                label = self.string_value(kind, text)
+            branches.append((label.value if isinstance(label, Lit) else None, self.script_block()))
+        return Switch(subject, tuple(branches))
+
+    def if_statement(self):
+        self.take()
+        branches = [(self.group_text(), self.script_block())]
+        while True:
+            save = self.pos
+            self.skip_newlines()
+            if self.at('word', 'elseif'):
+                self.take()
+                branches.append((self.group_text(), self.script_block()))
+            elif self.at('word', 'else'):
+                self.take()
+                branches.append((None, self.script_block()))
+                break
+            else:
+                self.pos = save
+                break
+        return If(tuple(branches))
+
+    def foreach(self):
+        self.take()
+        self.take()
+        var = _variable(self.take()[1]) if self.at('var') else Var('')
+        if self.at('word', 'in'):
+            self.take()
+        items = self.expression(closing=')')
+        if self.at('op', ')'):
+            self.take()
+        return Foreach(var.name if isinstance(var, Var) else '', items, self.script_block())
+
+    def at_end(self, closing=None):
+        kind, text = self.peek()
+        return kind in (None, 'nl') or (kind == 'op' and text in ('}', '|', closing or '}'))
+
+    def expression(self, closing=None):
+        """Parse the right-hand side of an assignment up to the end of the statement."""
+        start = self.pos
+        if self.at('word') and not self.at_end(closing):
+            value = None
+        else:
+            value = self.value_list()
+        if value is None or not self.at_end(closing):
+            # Operators, method calls, commands: not a simple value
+            self.pos = start
+            parts = []
+            depth = 0
+            while self.peek()[0] is not None and (depth > 0 or not self.at_end(closing)):
+                kind, text = self.take()
+                if kind == 'op' and text in _closing:
+                    depth += 1
+                elif kind == 'op' and text in (')', '}', ']'):
+                    depth -= 1
+                parts.append(text)
+            return Raw(' '.join(parts))
+        return value
+
+    def value_list(self):
+        value = self.value()
+        if not self.at('op', ','):
+            return value
+        items = [value]
+        while self.at('op', ','):
+            self.take()
+            self.skip_newlines()
+            items.append(self.value())
+        return Array(tuple(items))
+
+    def string_value(self, kind, text):
+        if kind == 'sq':
+            return Lit(text[1:-1].replace("''", "'"))
+        if kind == 'dq':
+            parts = _expand(text[1:-1].replace('""', '"'))
+            if all(isinstance(part, str) for part in parts):
+                return Lit(''.join(parts))
+            return Expand(tuple(parts))
+        if kind == 'here':
+            body = text[2:-2].strip('\r\n')
+            if text[1] == "'":
+                return Lit(body)
+            parts = _expand(body)
+            return Lit(''.join(parts)) if all(isinstance(part, str) for part in parts) else Expand(tuple(parts))
+        if kind == 'num':
+            return Lit(int(text, 16) if text.lower().startswith('0x') else int(text))
+        if kind == 'var':
+            return _variable(text)
+        if kind == 'splat':
+            return Splat(text[1:].lower())
+        return Lit(text)
+
+    def value(self):
+        """Parse one value: a literal, string, variable, array, hashtable or group."""
+        kind, text = self.peek()
+        if kind == 'op' and text == '@(':
+            self.take()
+            items = []
+            while True:
+                self.skip_newlines()
+                if self.at('op', ')') or self.peek()[0] is None:
+                    break
+                items.append(self.value())
+                if self.at('op', ','):
+                    self.take()
+                elif not self.at('nl') and not self.at('op', ')'):
+                    self.group_text() if self.peek()[1] in _closing else self.take()
+                    items.append(Raw(''))
+            self.take()
+            return Array(tuple(items))
+        if kind == 'op' and text == '@{':
+            self.take()
+            items = []
+            while True:
+                self.skip_newlines()
+                if self.at('op', '}') or self.peek()[0] is None:
+                    break
+                key_kind, key = self.take()
+                key = self.string_value(key_kind, key).value if key_kind in ('word', 'sq', 'dq') else key
+                if self.at('assign'):
+                    self.take()
+                    items.append((str(key).lower(), self.expression(closing='}')))
+            self.take()
+            return Hash(tuple(items))
+        if kind == 'op' and text == '(':
+            save = self.pos
+            self.take()
+            self.skip_newlines()
+            value = self.value_list() if not self.at('word') else None
+            self.skip_newlines()
+            if value is not None and self.at('op', ')'):
+                self.take()
+                if not self.at('word') or not self.peek()[1].startswith('.'):
+                    return value
+            self.pos = save
+            return Raw(self.group_text())
+        if kind == 'op' and text == '[':
+            # Type cast such as [byte[]] or [int]; the value follows
+            cast = self.group_text()
+            if self.at_end() or self.at('param'):
+                return Raw(cast)
+            return self.value()
+        if kind == 'op' and text in ('{', '$('):
+            return Raw(self.group_text())
+        if kind in (None, 'nl', 'op', 'assign'):
+            return Raw('')
+        self.take()
+        return self.string_value(kind, text)
+
+    def pipeline(self):
+        commands = [self.command()]
+        while self.at('op', '|'):
+            self.take()
+            self.skip_newlines()
+            commands.append(self.command())
+        return commands[0] if len(commands) == 1 else Block(tuple(commands))
+
+    def command(self):
+        kind, text = self.peek()
+        if kind == 'word' and text != '&':
+            self.take()
+            name = text
+        elif kind == 'word':
+            self.take()
+            name = self.value()
+            name = name.value if isinstance(name, Lit) else ''
+        else:
+            name = ''
+        args = []
+        blocks = []
+        while not self.at_end():
+            kind, text = self.peek()
+            if kind == 'param':
+                self.take()
+                param = text[1:].rstrip(':').lower()
+                if text.endswith(':') or (param not in _switches and not self.at_end() and not self.at('param')):
+                    args.append((param, self.value_list()))
+                else:
+                    args.append((param, Lit(True)))
+            elif kind == 'op' and text == '{':
+                blocks.append(self.script_block())
+            elif kind == 'op' and text == ')':
+                break
+            else:
+                start = self.pos
+                args.append((None, self.value_list()))
+                if self.pos == start:
+                    self.take()
+        return Command(name, tuple(args), tuple(blocks))
+
+
+def parse_body(body):
+    """Return the ``Block`` for a function body, as yielded by sophia_tokenizer."""
+    parser = _Parser(tokenize(body))
+    parser.skip_newlines()
+    if parser.at('op', '{'):
+        # The body starts at the function's opening brace
+        block = parser.script_block()
+        if parser.peek()[0] is None:
+            return block
+        parser.pos = 0
+    statements = []
+    while parser.peek()[0] is not None:
+        statements.extend(parser.statements())
+        if parser.peek()[0] is not None:
+            # An unmatched closing bracket; carry on after it
+            parser.take()
+    return Block(tuple(statements))
+
+
+def function_ast(body, cache=cache_dir):
+    """Return ``parse_body(body)``, memoized in *cache* by the hash of *body*; ``None`` disables it."""
+    if cache is None:
+        count('ast-parsed')
+        return parse_body(body)
+    digest = hashlib.sha256(b'%d\n' % AST_VERSION + body.encode('utf-8')).hexdigest()
+    path = os.path.join(cache, digest + '.pickle')
+    try:
+        with open(path, 'rb') as f:
+            tree = pickle.load(f)
+        count('ast-cached')
+        return tree
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        pass
+    tree = parse_body(body)
+    count('ast-parsed')
+    os.makedirs(cache, exist_ok=True)
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'wb') as f:
+        pickle.dump(tree, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return tree
+
+
+UNKNOWN = object()
+
+
+def evaluate(value, env):
+    """Return the Python value of a value node, or ``UNKNOWN``."""
+    if isinstance(value, Lit):
+        return value.value
+    if isinstance(value, Var):
+        return env.get(value.name, UNKNOWN)
+    if isinstance(value, Expand):
+        parts = []
+        for part in value.parts:
+            part = part if isinstance(part, str) else evaluate(part, env)
+            if isinstance(part, bool) or not isinstance(part, (str, int)):
+                return UNKNOWN
+            parts.append(str(part))
+        return ''.join(parts)
+    if isinstance(value, Array):
+        items = [evaluate(item, env) for item in value.items]
+        return UNKNOWN if any(item is UNKNOWN for item in items) else items
+    if isinstance(value, Hash):
+        return {key: evaluate(item, env) for key, item in value.items}
+    return UNKNOWN
+
+
+def _merge(env, outcomes):
+    """Update *env* after branches that may or may not have run: disagreeing variables become unknown."""
+    for name in set().union(*outcomes):
+        values = [outcome.get(name, UNKNOWN) for outcome in outcomes]
+        env[name] = values[0] if all(v == values[0] and v is not UNKNOWN for v in values) else UNKNOWN
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def _command_op(command, env):
+    cmdlet = command.name.lower()
+    if cmdlet not in ('new-itemproperty', 'set-itemproperty', 'remove-itemproperty'):
+        return []
+    named = {}
+    positional = []
+    for param, value in command.args:
+        if param is None and isinstance(value, Splat):
+            splat = env.get(value.name)
+            if not isinstance(splat, dict):
+                return []
+            named.update(splat)
+        elif param is None:
+            positional.append(evaluate(value, env))
+        else:
+            named[param] = evaluate(value, env)
+    path = named.get('path', named.get('literalpath', positional[0] if positional else UNKNOWN))
+    name = named.get('name', positional[1] if len(positional) > 1 else UNKNOWN)
+    if cmdlet == 'remove-itemproperty':
+        rtype, value = None, None
+    else:
+        rtype = named.get('propertytype', named.get('type'))
+        value = named.get('value', positional[2] if cmdlet == 'set-itemproperty' and len(positional) > 2 else UNKNOWN)
+        if rtype is None:
+            # Set-ItemProperty creates a string unless the value is a number
+            rtype = 'dword' if isinstance(value, int) and not isinstance(value, bool) else 'string'
+        if not isinstance(rtype, str) or value is UNKNOWN:
+            return []
+    paths, names = _as_list(path), _as_list(name)
+    if any(not isinstance(p, str) for p in paths) or any(not isinstance(n, (str, int)) or isinstance(n, bool)
+                                                        for n in names):
+        return []
+    action = 'remove' if cmdlet == 'remove-itemproperty' else 'set'
+    return [RegistryOp(action, p, str(n), rtype and rtype.lower(), value) for p in paths for n in names]
+
+
+def _walk(statements, env, label, out):
+    for node in statements:
+        if isinstance(node, Assign):
+            if node.name:
+                env[node.name] = evaluate(node.value, env)
+        elif isinstance(node, Command):
+            for op in _command_op(node, env):
+                out.append((label, op))
+            if node.blocks:
+                # ForEach-Object, Invoke-Command and the like; $_ is not known
+                branch = dict(env, **{'_': UNKNOWN, 'psitem': UNKNOWN})
+                for block in node.blocks:
+                    _walk(block.statements, branch, label, out)
+        elif isinstance(node, Block):
+            _walk(node.statements, env, label, out)
+        elif isinstance(node, Switch):
+            by_set = 'parametersetname' in node.subject.lower()
+            outcomes = []
+            for branch_label, block in node.branches:
+                branch = dict(env)
+                branch_set = branch_label if by_set and branch_label and branch_label.lower() != 'default' else label
+                _walk(block.statements, branch, branch_set, out)
+                outcomes.append(branch)
+            _merge(env, outcomes + ([dict(env)] if not by_set else []))
+        elif isinstance(node, If):
+            outcomes = []
+            for _, block in node.branches:
+                branch = dict(env)
+                _walk(block.statements, branch, label, out)
+                outcomes.append(branch)
+            if node.branches[-1][0] is not None:
+                outcomes.append(dict(env))
+            _merge(env, outcomes)
+        elif isinstance(node, Foreach):
+            items = evaluate(node.items, env)
+            outcomes = []
+            for item in (items if isinstance(items, list) else [UNKNOWN if items is UNKNOWN else items]):
+                branch = dict(env)
+                branch[node.var] = item
+                _walk(node.block.statements, branch, label, out)
+                outcomes.append(branch)
+            _merge(env, outcomes + [dict(env)])
+
+
+def registry_operations(tree):
+    """Return ``[(parameter set or None, RegistryOp)]`` in the order the calls appear."""
+    out = []
+    _walk(tree.statements, {}, None, out)
+    return out
+
+
+def parameter_sets(tree):
+    """Return the labels of the ``switch ($PSCmdlet.ParameterSetName)`` branches, in order."""
+    labels = []
+
+    def visit(statements):
+        for node in statements:
+            if isinstance(node, Switch):
+                if 'parametersetname' in node.subject.lower():
+                    labels.extend(label for label, _ in node.branches
+                                  if label and label.lower() != 'default' and label not in labels)
+                for _, block in node.branches:
+                    visit(block.statements)
+            elif isinstance(node, If):
+                for _, block in node.branches:
+                    visit(block.statements)
+            elif isinstance(node, (Block, Foreach)):
+                visit(node.statements if isinstance(node, Block) else node.block.statements)
+            elif isinstance(node, Command):
+                for block in node.blocks:
+                    visit(block.statements)
+    visit(tree.statements)
+    return labels
@@ -0,0 +1,257 @@
+"""Single-pass tokenizer for Sophia Script's Sophia.psm1.
+
+Walks the module once, a block at a time, tracking help comments,
+``function`` headers, ``#region`` markers and brace depth. Each documented
+function is yielded as soon as its closing brace is seen, so callers
+never hold more than one function body and one read block in memory.
+"""
+import re
+from collections import namedtuple
+
+# name: function name, help: text between <# and #>, body: everything from
+# the line after the header up to and including the closing brace,
+# region: innermost enclosing #region title, line: 1-based header line
+SophiaFunction = namedtuple('SophiaFunction', 'name help body region line')
+
+_function_header = re.compile(r'\s*function\s+([\w-]+)\s*(\{)?\s*$', re.IGNORECASE)
+# Lines without quotes, comments, escapes or here-strings need no lexing
+_plain_line = re.compile(r'[^\'"#`@<]*$')
+
+# iter_functions states and the line each of them waits for
+OUTSIDE, HELP, AFTER_HELP, BODY = range(4)
+# A help comment opening on a line of its own, or a region marker
+_outside = re.compile(r'^(?:([^\S\n]*<#[^\S\n]*)$|#(?:end)?region)', re.M)
+_blank_lines = re.compile(r'(?:[^\S\n]*\n)*')
+# The characters a body line can matter for, as a plain class so the search
+# stays on the regex engine's fast path
+_body_event = re.compile(r'[{}@<#]')
+_comment_end = re.compile(r'#>')
+_herestring_end = {'"@': re.compile(r'^"@', re.M), "'@": re.compile(r"^'@", re.M)}
+
+
+def _brace_delta(line, state):
+    """Return ``(delta, state)`` for one line of PowerShell.
+
+    Braces inside strings and comments are ignored. ``state`` carries
+    constructs spanning lines: ``'#>'`` inside a block comment, ``'"@'`` or
+    ``"'@"`` inside a here-string, ``None`` otherwise.
+    """
+    i, n = 0, len(line)
+    if state == '#>':
+        end = line.find('#>')
+        if end < 0:
+            return 0, state
+        i, state = end + 2, None
+    elif state is not None:
+        # Here-string terminators must start at column 0
+        if not line.startswith(state):
+            return 0, state
+        i, state = 2, None
+    elif _plain_line.match(line):
+        return line.count('{') - line.count('}'), None
+
+    delta = 0
+    while i < n:
+        c = line[i]
+        if c == '#':
+            if i == 0 or line[i - 1] in ' \t;{}()':
+                break
+        elif c == '<' and line.startswith('<#', i):
+            end = line.find('#>', i + 2)
+            if end < 0:
+                return delta, '#>'
+            i = end + 2
+            continue
+        elif c == '@' and line[i + 1:i + 2] in ('"', "'") and not line[i + 2:].strip():
+            return delta, line[i + 1] + '@'
+        elif c == "'":
+            i += 1
+            while i < n:
+                if line[i] == "'":
+                    if line[i + 1:i + 2] != "'":
+                        break
+                    i += 1
+                i += 1
+        elif c == '"':
+            i += 1
+            while i < n:
+                if line[i] == '`':
+                    i += 1
+                elif line[i] == '"':
+                    if line[i + 1:i + 2] != '"':
+                        break
+                    i += 1
+                i += 1
+        elif c == '`':
+            i += 1
+        elif c == '{':
+            delta += 1
+        elif c == '}':
+            delta -= 1
+        i += 1
+    return delta, state
+
+
+def _lines(text):
+    """Return *text* without the carriage returns a stream without newline translation leaves at line ends."""
+    return '\n'.join(line.rstrip('\r') for line in text.split('\n')) if '\r' in text else text
+
+
+def iter_functions(stream, block=1 << 16):
+    """Yield a ``SophiaFunction`` for every documented function in the text *stream*.
+
+    A function is recognised when a ``<# ... #>`` help comment is directly
+    followed by a ``function Name`` header. Its body ends when the brace
+    depth returns to zero, or, should the braces not balance, at the next
+    column-0 ``<#`` or ``#region`` line, which is where the old regex
+    stopped.
+
+    The stream is read *block* characters at a time. Each state searches
+    the buffer for the next line that can change it with one compiled
+    pattern, so lines without braces, comments or here-strings never reach
+    Python code; only the lines found are decoded by ``_brace_delta``.
+    """
+    buf = ''
+    limit = 0  # end of the complete lines in buf
+    eof = False
+    # buf[counted] starts line number lineno + 1
+    counted = lineno = 0
+    regions = []
+    mode = OUTSIDE
+    pos = mark = 0
+    help_text = func = None
+    depth = 0
+    opened = False
+    state = None
+
+    while True:
+        if mode == OUTSIDE:
+            keep = pos
+            match = _outside.search(buf, pos, limit)
+            if match:
+                start = match.start()
+                end = buf.find('\n', start, limit)
+                end = limit if end < 0 else end
+                if match.group(1) is None:
+                    line = buf[start:end].rstrip('\r')
+                    if line.startswith('#endregion'):
+                        if regions:
+                            regions.pop()
+                    else:
+                        regions.append(line[len('#region'):].strip())
+                else:
+                    mode = HELP
+                    mark = end + 1
+                pos = end + 1
+                continue
+        elif mode == HELP:
+            keep = mark
+            # A literal search; '#>' mostly only turns up on the closing line
+            found = buf.find('#>', pos, limit)
+            while found >= 0:
+                start = buf.rfind('\n', pos, found) + 1 or pos
+                if not buf[start:found].strip():
+                    break
+                found = buf.find('#>', found + 2, limit)
+            if found >= 0:
+                help_text = _lines(buf[mark:start - 1]) if start > mark else ''
+                end = buf.find('\n', start, limit)
+                pos = (limit if end < 0 else end) + 1
+                mode = AFTER_HELP
+                continue
+        elif mode == AFTER_HELP:
+            pos = _blank_lines.match(buf, pos, limit).end()
+            keep = pos
+            if pos < limit:
+                end = buf.find('\n', pos, limit)
+                end = limit if end < 0 else end
+                header = _function_header.match(buf[pos:end].rstrip('\r'))
+                if header:
+                    lineno += buf.count('\n', counted, pos)
+                    counted = pos
+                    func = (header.group(1), help_text, regions[-1] if regions else None, lineno + 1)
+                    opened = bool(header.group(2))
+                    depth = 1 if opened else 0
+                    state = None
+                    mode = BODY
+                    mark = pos = end + 1
+                else:
+                    # Not a header; the line is looked at again outside any function
+                    mode = OUTSIDE
+                continue
+        else:
+            keep = mark
+            # The body loop runs once per line found, so it stays tight
+            search, plain, find, rfind = _body_event.search, _plain_line.match, buf.find, buf.rfind
+            while True:
+                if state is None:
+                    match = search(buf, pos, limit)
+                else:
+                    match = (_comment_end if state == '#>' else _herestring_end[state]).search(buf, pos, limit)
+                if match is None:
+                    break
+                found = match.start()
+                start = rfind('\n', pos, found) + 1 or pos
+                end = find('\n', found, limit)
+                if end < 0:
+                    end = limit
+                line = buf[start:end]
+                pos = end + 1
+                if state is None:
+                    if line[0] in '#<' and (line.startswith('#region') or (
+                            line.startswith('<#') and not line[2:].strip())):
+                        name, help_, region, line_number = func
+                        yield SophiaFunction(name, help_, _lines(buf[mark:start - 1]) if start > mark else '',
+                                             region, line_number)
+                        mode = OUTSIDE
+                        pos = start
+                        break
+                    if plain(line):
+                        delta = line.count('{') - line.count('}')
+                    elif '{' in line or '}' in line or '<#' in line or '@' in line:
+                        delta, state = _brace_delta(line.rstrip('\r'), state)
+                    else:
+                        # Found by a '#' or '<' that is neither a block comment nor a boundary
+                        continue
+                else:
+                    delta, state = _brace_delta(line.rstrip('\r'), state)
+                depth += delta
+                if delta > 0:
+                    opened = True
+                if opened and depth <= 0:
+                    name, help_, region, line_number = func
+                    yield SophiaFunction(name, help_, _lines(buf[mark:end]), region, line_number)
+                    mode = OUTSIDE
+                    state = None
+                    break
+            if mode != BODY:
+                continue
+
+        # Nothing more in the complete lines: read on, dropping what is no longer needed
+        if eof:
+            break
+        pos = max(pos, limit)
+        data = stream.read(block)
+        if keep > counted:
+            lineno += buf.count('\n', counted, keep)
+            counted = keep
+        buf = buf[keep:] + data
+        pos -= keep
+        mark -= keep
+        counted -= keep
+        if data:
+            limit = buf.rfind('\n') + 1
+        else:
+            eof = True
+            limit = len(buf)
+
+    if mode == BODY:
+        name, help_, region, line_number = func
+        body = buf[mark:]
+        yield SophiaFunction(name, help_, _lines(body[:-1] if body.endswith('\n') else body), region, line_number)
+
+
+def read_functions(path):
+    """Stream the functions of the Sophia module at *path*."""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        yield from iter_functions(f)
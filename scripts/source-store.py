@@ -0,0 +1,56 @@
+"""Add, list and locate upstream source snapshots in .cache/sources.
+
+    python scripts/source-store.py add sophia Sophia.psm1 --version 6.0.2
+    python scripts/source-store.py list
+    python scripts/source-store.py path winutil latest
+
+The importers add every file they are given themselves; ``add`` stores
+one ahead of time or gives it a version label (Sophia's own .VERSION is
+picked up automatically). ``list`` shows the manifest and the last
+successful import of each tool. ``path`` prints the stored file for a
+reference: latest, a version or a hash prefix. See source_store.
+"""
+import argparse, os
+
+from source_store import KINDS, SourceStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help='copy a file into the store')
+    add.add_argument('kind', choices=KINDS)
+    add.add_argument('path')
+    add.add_argument('--version', help='version label to find it by later')
+    listing = commands.add_parser('list', help='list stored snapshots and the last imports')
+    listing.add_argument('kind', nargs='?', choices=KINDS)
+    locate = commands.add_parser('path', help='print the stored file for a reference')
+    locate.add_argument('kind', choices=KINDS)
+    locate.add_argument('ref', help='latest, a version or a hash prefix')
+    args = parser.parse_args()
+
+    store = SourceStore()
+    if args.command == 'add':
+        if not os.path.isfile(args.path):
+            parser.error('%s is not a file' % args.path)
+        record = store.add(args.kind, args.path, args.version)
+        print('%s %s %s' % (record['kind'], record['sha256'][:12], record['version'] or '-'))
+    elif args.command == 'path':
+        try:
+            print(store.object_path(store.find(args.kind, args.ref)['sha256']))
+        except LookupError as e:
+            parser.error(str(e))
+    else:
+        snapshots = store.snapshots(args.kind)
+        print('%-8s %-12s %-12s %10s  %-20s %s' % ('kind', 'sha256', 'version', 'bytes', 'added', 'origin'))
+        for record in snapshots:
+            print('%-8s %-12s %-12s %10d  %-20s %s' % (
+                record['kind'], record['sha256'][:12], record['version'] or '-', record['bytes'],
+                record['added'], record['origin']))
+        for tool, last in sorted(store.manifest['imports'].items()):
+            print('Last %s: %s from %s, %d files' % (
+                tool, last['finished'], ', '.join(sha256[:12] for sha256 in last['inputs']), len(last['files'])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""Content-addressed store of upstream source snapshots.
+
+The importers read Sophia.psm1 and WinUtil's tweaks.json from wherever
+someone last downloaded them. The store keeps every snapshot they were
+given under .cache/sources/objects/<sha256>, with manifest.json listing
+each one's kind, size, version label and origin, so an import can be
+repeated from ``latest``, a version label or a hash prefix without the
+original file or a network connection.
+
+Two more things are keyed by a snapshot's hash:
+
+- ``derived`` pickles what an importer computes from a snapshot alone
+  (tokenized Sophia functions, the filtered WinUtil tweaks) to
+  derived/<sha256>.<name>.pickle item by item while passing them on, so a
+  replay streams them back without reading the source.
+- ``unchanged``/``record_import`` remember the inputs of each tool's last
+  successful import and the files it produced, so a run with the same
+  inputs can stop before doing any work.
+"""
+import hashlib, json, os, pickle, re, shutil, time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+store_dir = os.path.join(root, '.cache', 'sources')
+
+MANIFEST_VERSION = 1
+# Bump when the objects stored by derived() change shape
+DERIVED_VERSION = 2
+KINDS = ('sophia', 'winutil')
+
+# Sophia.psm1 names its release in the module help
+_sophia_version = re.compile(r'^\s*\.VERSION\s*\n\s*(\S+)', re.M)
+
+
+def digest(*values):
+    """Return the SHA-256 of *values* as JSON, for hashing code tables and import inputs."""
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def detect_version(kind, path):
+    """Return the upstream version named inside the file at *path*, or None."""
+    if kind != 'sophia':
+        return None
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        match = _sophia_version.search(f.read(1 << 14))
+    return match.group(1) if match else None
+
+
+class SourceStore:
+    def __init__(self, directory=store_dir):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            manifest = {}
+        if manifest.get('version') != MANIFEST_VERSION:
+            manifest = {'version': MANIFEST_VERSION, 'snapshots': [], 'imports': {}}
+        self.manifest = manifest
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = '%s.%d.tmp' % (self.manifest_path, os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+            f.write('\n')
+        os.replace(tmp, self.manifest_path)
+
+    def object_path(self, sha256):
+        return os.path.join(self.directory, 'objects', sha256[:2], sha256)
+
+    def add(self, kind, path, version=None):
+        """Copy the file at *path* into the store and return its snapshot record.
+
+        A file already stored under the same kind keeps its record; a new
+        *version* label replaces the old one.
+        """
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                h.update(chunk)
+        sha256 = h.hexdigest()
+        target = self.object_path(sha256)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp = '%s.%d.tmp' % (target, os.getpid())
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, target)
+        version = version or detect_version(kind, path)
+        for record in self.manifest['snapshots']:
+            if record['kind'] == kind and record['sha256'] == sha256:
+                if version and record.get('version') != version:
+                    record['version'] = version
+                    self._save()
+                return record
+        record = {
+            'kind': kind,
+            'sha256': sha256,
+            'bytes': os.path.getsize(target),
+            'version': version,
+            'added': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'origin': os.path.abspath(path),
+        }
+        self.manifest['snapshots'].append(record)
+        self._save()
+        return record
+
+    def snapshots(self, kind=None):
+        """Return the snapshot records of *kind* (or all), oldest first."""
+        return [record for record in self.manifest['snapshots'] if kind is None or record['kind'] == kind]
+
+    def find(self, kind, ref):
+        """Return the snapshot of *kind* that *ref* names: ``latest``, a version label or a hash prefix.
+
+        Raises LookupError when nothing or more than one snapshot matches.
+        """
+        records = self.snapshots(kind)
+        if ref == 'latest':
+            matches = records[-1:]
+        else:
+            # Several snapshots can carry one label, say a re-released version; the newest wins
+            matches = [record for record in records if record.get('version') == ref][-1:]
+            if not matches and len(ref) >= 6:
+                matches = [record for record in records if record['sha256'].startswith(ref.lower())]
+        if not matches:
+            raise LookupError('no %s snapshot matches %r in %s' % (kind, ref, os.path.relpath(self.directory)))
+        if len(matches) > 1:
+            raise LookupError('%r matches %d %s snapshots; use a longer hash' % (ref, len(matches), kind))
+        if not os.path.exists(self.object_path(matches[0]['sha256'])):
+            raise LookupError('%s snapshot %s is listed but missing from the store' % (kind, matches[0]['sha256'][:12]))
+        return matches[0]
+
+    def resolve(self, kind, spec, version=None):
+        """Return ``(stored path, record)`` for *spec*: a file to store first, or a ``find`` reference."""
+        if os.path.isfile(spec):
+            record = self.add(kind, spec, version)
+        else:
+            record = self.find(kind, spec)
+        return self.object_path(record['sha256']), record
+
+    def derived(self, sha256, name, build):
+        """Yield the items of ``build()`` for the snapshot *sha256*, pickled under *name* after the first call.
+
+        Items are pickled one at a time as they are yielded and read back the
+        same way, so neither a first nor a repeated import holds them all.
+        The pickle only replaces the previous one once ``build()`` runs out.
+        *name* must change whenever what ``build`` yields would, for example
+        by including a hash of the code tables it filters with.
+        """
+        path = os.path.join(self.directory, 'derived', '%s.%s.pickle' % (sha256, name))
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            f = None
+        if f is not None:
+            with f:
+                try:
+                    version = pickle.load(f)
+                except (EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+                    version = None
+                if version == DERIVED_VERSION:
+                    while True:
+                        try:
+                            yield pickle.load(f)
+                        except EOFError:
+                            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            with open(tmp, 'wb') as f:
+                pickle.dump(DERIVED_VERSION, f, pickle.HIGHEST_PROTOCOL)
+                for item in build():
+                    pickle.dump(item, f, pickle.HIGHEST_PROTOCOL)
+                    yield item
+            os.replace(tmp, path)
+        finally:
+            # A caller that stops early leaves an incomplete pickle behind
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def unchanged(self, tool, key, outdir):
+        """True when *tool*'s last import had the inputs hashed as *key* and its files under *outdir* still exist."""
+        last = self.manifest['imports'].get(tool)
+        return bool(last and last['key'] == key and all(
+            os.path.exists(os.path.join(outdir, relpath)) for relpath in last['files']))
+
+    def record_import(self, tool, key, inputs, files):
+        """Remember a successful import by *tool* of the snapshots *inputs* that wrote *files*."""
+        self.manifest['imports'][tool] = {
+            'key': key,
+            'inputs': inputs,
+            'files': sorted(files),
+            'finished': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        }
+        self._save()
@@ -0,0 +1,105 @@
+"""Sync GitHub star counts for catalog apps and fonts.
+
+Python replacement for sync-github-stars.mjs. Repositories are looked up
+concurrently (see github_stars) and revalidated with the ETags kept in
+catalog/metadata/github-etags.json, so unchanged repositories cost no
+rate limit. Entries that cannot be fetched keep their previous count in
+catalog/metadata/github-stars.yaml.
+
+Set GITHUB_TOKEN to raise the rate limit from 60 to 5000 requests/hour.
+--api-url points the sync at another server, such as a local stub.
+"""
+import argparse, datetime, json, os, re, time
+
+from catalog_loader import catalog_dir, load_catalog
+from github_stars import API_URL, FETCHED, NOT_MODIFIED, RATE_LIMITED, sync_stars
+from node_compat import dump_scalar, load
+
+stars_path = os.path.join(catalog_dir, 'metadata', 'github-stars.yaml')
+etags_path = os.path.join(catalog_dir, 'metadata', 'github-etags.json')
+
+_github = re.compile(r'github\.com/([^/]+/[^/]+)')
+
+
+def github_repos():
+    """Return ``(key, repo)`` for every app and font linking a GitHub repository."""
+    repos = []
+    for entry in load_catalog(sections=('apps', 'fonts')):
+        github = entry.links.get('github')
+        match = _github.search(github) if isinstance(github, str) else None
+        if match:
+            repos.append(('%s/%s' % (entry.section[:-1], entry.id), match.group(1)))
+    return repos
+
+
+def dump_stars(stars):
+    """Format *stars* like js-yaml's dump with sortKeys."""
+    lines = []
+    for key in sorted(stars):
+        lines.append('%s:' % dump_scalar(key))
+        for field in sorted(stars[key]):
+            lines.append('  %s: %s' % (dump_scalar(field), dump_scalar(stars[key][field])))
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--api-url', default=API_URL, help='GitHub API base URL (default: %(default)s)')
+    parser.add_argument('-j', '--concurrency', type=int, default=8, help='requests in flight (default: %(default)s)')
+    parser.add_argument('--max-wait', type=float, default=60,
+                        help='longest rate-limit pause in seconds before giving up (default: %(default)s)')
+    args = parser.parse_args()
+
+    repos = github_repos()
+    print('Found %d entries with GitHub links.\n' % len(repos))
+
+    existing = {}
+    if os.path.exists(stars_path):
+        with open(stars_path, 'r', encoding='utf-8') as f:
+            existing = load(f) or {}
+    etags = {}
+    if os.path.exists(etags_path):
+        with open(etags_path, 'r', encoding='utf-8') as f:
+            etags = json.load(f)
+
+    keys_by_repo = {}
+    for key, repo in repos:
+        keys_by_repo.setdefault(repo, []).append(key)
+
+    def report(repo, outcome, stars, etag, status):
+        detail = '{:,}'.format(stars) if stars is not None else '%s (%s)' % (outcome, status)
+        if outcome == NOT_MODIFIED:
+            detail += ' (not modified)'
+        for key in keys_by_repo[repo]:
+            print('  %s (%s)... %s' % (key, repo, detail))
+
+    start = time.perf_counter()
+    results = sync_stars(keys_by_repo, etags, args.api_url, os.environ.get('GITHUB_TOKEN'),
+                         args.concurrency, args.max_wait, report)
+    elapsed = time.perf_counter() - start
+
+    stars = dict(existing)
+    for key, repo in repos:
+        outcome, count, _, _ = results[repo]
+        if outcome in (FETCHED, NOT_MODIFIED):
+            stars[key] = {'repo': repo, 'stars': count}
+
+    header = '# GitHub star counts for catalog entries.\n# Auto-generated by: python scripts/sync-github-stars.py\n' \
+             '# Last updated: %s\n\n' % datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+    with open(stars_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(header + dump_stars(stars))
+    with open(etags_path, 'w', encoding='utf-8', newline='') as f:
+        json.dump(etags, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+    outcomes = [outcome for outcome, _, _, _ in results.values()]
+    print('\nSynced %d repos in %.1fs: %d fetched, %d not modified, %d failed, %d rate limited.' % (
+        len(results), elapsed, outcomes.count(FETCHED), outcomes.count(NOT_MODIFIED),
+        len(outcomes) - outcomes.count(FETCHED) - outcomes.count(NOT_MODIFIED) - outcomes.count(RATE_LIMITED),
+        outcomes.count(RATE_LIMITED)))
+    if RATE_LIMITED in outcomes:
+        print('Set GITHUB_TOKEN env var to increase rate limit (5000/hr vs 60/hr).')
+
+
+if __name__ == '__main__':
+    main()
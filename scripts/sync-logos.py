@@ -0,0 +1,107 @@
+"""Fetch catalog logos and build the sprite atlases for the gallery.
+
+Python replacement for sync-logos.mjs. Missing logos are fetched on a
+thread pool into catalog/logos; with --refresh existing logos are fetched
+again too, and only replaced when the content hash differs. Then every
+logo is downsampled into the 1x/2x atlases in public/logos, together
+with manifest.json, which index.astro reads at build time.
+
+--no-fetch skips the network and only rebuilds the atlases. The URL
+templates can point at a local fixture server (see bench-logos.py):
+
+    python scripts/bench-logos.py --serve 8766
+    python scripts/sync-logos.py --favicon-url 'http://127.0.0.1:8766/favicon/{domain}' \\
+        --avatar-url 'http://127.0.0.1:8766/avatar/{owner}'
+"""
+import argparse, glob, os, tempfile, time
+
+from logos import (AVATAR_URL, FAVICON_URL, build_sprites, fetch_logos, logo_entries, logos_dir, public_dir,
+                   read_originals, sha256)
+
+
+def write_if_changed(path, data):
+    """Atomically replace *path* with *data* unless it already holds those bytes; True when written."""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return True
+
+
+def fetch(entries, originals, args):
+    if not args.refresh:
+        skipped = sum(1 for entry in entries if entry[0] in originals)
+        entries = [entry for entry in entries if entry[0] not in originals]
+    else:
+        skipped = 0
+    downloaded = unchanged = failed = 0
+    for entry_id, source, data in fetch_logos(entries, args.jobs, args.favicon_url, args.avatar_url):
+        if data is None:
+            print('  %s... no source' % entry_id)
+            failed += 1
+        elif entry_id in originals and sha256(originals[entry_id]) == sha256(data):
+            unchanged += 1
+        else:
+            write_if_changed(os.path.join(logos_dir, '%s.png' % entry_id), data)
+            originals[entry_id] = data
+            print('  %s... %s' % (entry_id, source))
+            downloaded += 1
+    print('Fetched: %d downloaded, %d unchanged, %d skipped, %d no source.' % (
+        downloaded, unchanged, skipped, failed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--no-fetch', action='store_true', help='only rebuild the atlases from catalog/logos')
+    parser.add_argument('--refresh', action='store_true', help='also re-fetch logos that already exist')
+    parser.add_argument('-j', '--jobs', type=int, default=16, help='parallel downloads (default: %(default)s)')
+    parser.add_argument('--columns', type=int, default=16, help='tiles per atlas row (default: %(default)s)')
+    parser.add_argument('--favicon-url', default=FAVICON_URL, help='favicon URL template with {domain}')
+    parser.add_argument('--avatar-url', default=AVATAR_URL, help='GitHub avatar URL template with {owner}')
+    args = parser.parse_args()
+
+    originals = read_originals()
+    if not args.no_fetch:
+        entries = logo_entries()
+        print('Found %d catalog entries.\n' % len(entries))
+        start = time.perf_counter()
+        fetch(entries, originals, args)
+        print('Fetch took %.1fs.\n' % (time.perf_counter() - start))
+
+    start = time.perf_counter()
+    files, stats = build_sprites(originals, args.columns)
+    for entry_id in stats['failed']:
+        print('  %s... unreadable image, left out of the atlas' % entry_id)
+
+    written = [name for name, data in sorted(files.items())
+               if write_if_changed(os.path.join(public_dir, name), data if isinstance(data, bytes)
+                                   else data.encode('utf-8'))]
+    for stale in glob.glob(os.path.join(public_dir, 'atlas-*.webp')):
+        if os.path.basename(stale) not in files:
+            os.unlink(stale)
+
+    original_bytes = sum(len(data) for data in originals.values())
+    atlas_bytes = {name: len(data) for name, data in files.items() if name.endswith('.webp')}
+    print('Atlases: %d logos, %d resized, %d from cache, %d files written in %.1fs.' % (
+        stats['logos'] - len(stats['failed']), stats['resized'], stats['cached'], len(written),
+        time.perf_counter() - start))
+    print('  originals: %d requests, %d bytes' % (len(originals), original_bytes))
+    for name in sorted(atlas_bytes):
+        print('  %s: %d bytes' % (name, atlas_bytes[name]))
+
+
+if __name__ == '__main__':
+    main()
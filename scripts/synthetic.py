@@ -0,0 +1,306 @@
+"""Synthetic catalogs and upstream inputs for the benchmarks.
+
+Everything is derived from a seed, so two runs with the same arguments
+produce byte-identical trees and timings can be compared across commits.
+
+``synthetic_entries`` multiplies real catalog entries: each copy past the
+originals gets made-up words in its name, tags and description, a new
+category and, for tweaks, its own registry keys, so vocabularies and
+registry sets grow with the catalog the way they would with real entries.
+``synthetic_categories`` grafts a deep made-up tree next to the real
+categories.yaml, ``write_catalog`` lays all of it out as a catalog/
+directory, and ``sophia_module`` and ``winutil_export`` build inputs for
+the importers. ``reg_export`` writes a regedit-style snapshot for
+reg_snapshot.
+"""
+import io, json, os, random
+
+import yaml
+
+from catalog_validator import flatten_categories
+
+_syllables = ('ka', 'lo', 'mi', 'ne', 'ru', 'ta', 'vo', 'zi', 'pe', 'qua', 'dri', 'sto', 'fen', 'gal', 'hum')
+
+
+def made_up_word(rng):
+    return ''.join(rng.choice(_syllables) for _ in range(rng.randint(2, 4)))
+
+
+def synthetic_categories(tree, depth, fanout, seed=0):
+    """Return a copy of the categories.yaml *tree* with a made-up subtree *depth* levels deep.
+
+    Every synthetic node has *fanout* children, so the graft adds
+    ``fanout ** depth`` leaves.
+    """
+    rng = random.Random(seed)
+
+    def level(remaining):
+        children = {}
+        while len(children) < fanout:
+            children.setdefault(made_up_word(rng).capitalize(), {'sort': (len(children) + 1) * 10})
+        if remaining > 1:
+            for node in children.values():
+                node['children'] = level(remaining - 1)
+        return children
+
+    tree = dict(tree)
+    if depth > 0:
+        tree['Synthetic'] = {'sort': 990, 'pattern': 'drill-down', 'children': level(depth)}
+    return tree
+
+
+def synthetic_entries(entries, count, categories=None, seed=0):
+    """Return *count* entries cycling through *entries*, varying every copy past the originals.
+
+    Copies keep the class of the entry they were made from and get a
+    category picked from *categories* when given.
+    """
+    rng = random.Random(seed)
+    tag_pool = sorted({tag for entry in entries for tag in entry.tags})
+    categories = sorted(categories) if categories else None
+    result = []
+    for n in range(count):
+        entry = entries[n % len(entries)]
+        data = dict(entry.data)
+        if n >= len(entries):
+            data['name'] = '%s %s' % (entry.name, made_up_word(rng).capitalize())
+            data['tags'] = list(entry.tags[:2]) + rng.sample(tag_pool, min(2, len(tag_pool))) + [made_up_word(rng)]
+            data['description'] = '%s %s' % (data.get('description') or '', ' '.join(
+                made_up_word(rng) for _ in range(3)))
+            if categories:
+                data['category'] = rng.choice(categories)
+            if entry.section == 'tweaks' and entry.registry:
+                data['registry'] = [dict(item, key='%s\\Synthetic%d' % (item.get('key'), n))
+                                    for item in entry.registry]
+        directory, filename = os.path.split(entry.relpath)
+        relpath = '%s/%s-%d.yaml' % (directory, os.path.splitext(filename)[0], n) if n >= len(entries) else entry.relpath
+        result.append(type(entry)(relpath, data))
+    return result
+
+
+def write_catalog(directory, entries, categories):
+    """Write *entries* and the *categories* tree as a catalog/ directory at *directory*."""
+    with open(os.path.join(directory, 'categories.yaml'), 'w', encoding='utf-8') as f:
+        yaml.safe_dump(categories, f, sort_keys=False, allow_unicode=True)
+    for entry in entries:
+        path = os.path.join(directory, *entry.relpath.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(entry.data, f, sort_keys=False, allow_unicode=True, width=1000)
+
+
+def category_leaves(tree):
+    """Return the category paths in *tree* that have no children."""
+    paths = flatten_categories(tree)
+    return {path for path in paths if not any(other.startswith(path + '/') for other in paths)}
+
+
+SOPHIA_FUNCTION = '''<#
+\t.SYNOPSIS
+\tSynthetic tweak number {n}
+
+\t.PARAMETER Enable
+\tEnable tweak {n}
+
+\t.PARAMETER Disable
+\tDisable tweak {n} (default value)
+
+\t.EXAMPLE
+\t{name} -Enable
+
+\t.NOTES
+\tCurrent user
+#>
+function {name}
+{{
+\tparam
+\t(
+\t\t[Parameter(
+\t\t\tMandatory = $true,
+\t\t\tParameterSetName = "Enable"
+\t\t)]
+\t\t[switch]
+\t\t$Enable,
+
+\t\t[Parameter(
+\t\t\tMandatory = $true,
+\t\t\tParameterSetName = "Disable"
+\t\t)]
+\t\t[switch]
+\t\t$Disable
+\t)
+
+\t# Remove a stale "{{value}}" left by older builds
+\tRemove-ItemProperty -Path HKCU:\\Software\\Synthetic\\Tweak{n} -Name Legacy -Force -ErrorAction Ignore
+
+\tswitch ($PSCmdlet.ParameterSetName)
+\t{{
+\t\t"Enable"
+\t\t{{
+\t\t\tif (-not (Test-Path -Path HKCU:\\Software\\Synthetic\\Tweak{n}))
+\t\t\t{{
+\t\t\t\tNew-Item -Path HKCU:\\Software\\Synthetic\\Tweak{n} -Force
+\t\t\t}}
+\t\t\tNew-ItemProperty -Path HKCU:\\Software\\Synthetic\\Tweak{n} -Name Enabled -PropertyType DWord -Value 1 -Force
+\t\t\tNew-ItemProperty -Path "HKLM:\\SOFTWARE\\Policies\\Synthetic" -Name "Tweak{n}" -PropertyType String -Value "On" -Force
+\t\t}}
+\t\t"Disable"
+\t\t{{
+\t\t\tNew-ItemProperty -Path HKCU:\\Software\\Synthetic\\Tweak{n} -Name Enabled -PropertyType DWord -Value 0 -Force
+\t\t\tRemove-ItemProperty -Path "HKLM:\\SOFTWARE\\Policies\\Synthetic" -Name "Tweak{n}" -Force -ErrorAction Ignore
+\t\t}}
+\t}}
+}}
+'''
+
+# Only the default set writes; the other one removes the value
+SOPHIA_DEFAULT_ONLY_FUNCTION = '''<#
+\t.SYNOPSIS
+\tSynthetic removal number {n}
+
+\t.PARAMETER Disable
+\tDisable removal {n}
+
+\t.PARAMETER Enable
+\tEnable removal {n} (default value)
+
+\t.EXAMPLE
+\t{name} -Disable
+
+\t.NOTES
+\tCurrent user
+#>
+function {name}
+{{
+\tparam
+\t(
+\t\t[Parameter(
+\t\t\tMandatory = $true,
+\t\t\tParameterSetName = "Disable"
+\t\t)]
+\t\t[switch]
+\t\t$Disable,
+
+\t\t[Parameter(
+\t\t\tMandatory = $true,
+\t\t\tParameterSetName = "Enable"
+\t\t)]
+\t\t[switch]
+\t\t$Enable
+\t)
+
+\tswitch ($PSCmdlet.ParameterSetName)
+\t{{
+\t\t"Disable"
+\t\t{{
+\t\t\tRemove-ItemProperty -Path HKCU:\\Software\\Synthetic\\Removal{n} -Name Enabled -Force -ErrorAction Ignore
+\t\t}}
+\t\t"Enable"
+\t\t{{
+\t\t\tNew-ItemProperty -Path HKCU:\\Software\\Synthetic\\Removal{n} -Name Enabled -PropertyType DWord -Value 1 -Force
+\t\t}}
+\t}}
+}}
+'''
+
+
+def sophia_module(functions, names=(), per_region=25, disabled=0, default_only=0):
+    """Return the text of a Sophia-like module with *functions* functions.
+
+    The first functions take their names from *names*, so an importer with
+    metadata for those names converts them; the rest are ``Tweak<n>``.
+    *default_only* ``Removal<n>`` functions, whose only writing parameter
+    set is the default one, close the last region. *disabled*
+    commented-out blocks follow the last function, the way upstream parks
+    code it has switched off; no function header follows any of them.
+    """
+    out = io.StringIO()
+    out.write('<#\n\t.SYNOPSIS\n\tSynthetic Sophia module\n#>\n\n')
+    names = list(names)
+    for n in range(functions):
+        if n % per_region == 0:
+            if n:
+                # Commented-out code between functions, as upstream keeps around
+                out.write('<#\n\tNew-ItemProperty -Path HKCU:\\Software\\Old -Name Gone -PropertyType DWord -Value 0 -Force\n#>\n')
+                out.write('#endregion Region%d\n\n' % (n // per_region - 1))
+            out.write('#region Region%d\n' % (n // per_region))
+        out.write(SOPHIA_FUNCTION.format(n=n, name=names[n] if n < len(names) else 'Tweak%d' % n))
+        out.write('\n')
+    for n in range(default_only):
+        out.write(SOPHIA_DEFAULT_ONLY_FUNCTION.format(n=n, name='Removal%d' % n))
+        out.write('\n')
+    out.write('#endregion Region%d\n' % ((functions - 1) // per_region))
+    for n in range(disabled):
+        out.write('\n<#\n\tSet-ItemProperty -Path HKCU:\\Software\\Disabled -Name Value%d -Value 0\n#>\n' % n)
+    return out.getvalue()
+
+
+def winutil_export(count, names=(), seed=0):
+    """Return the text of a WinUtil tweaks.json with *count* tweaks, named from *names* first."""
+    rng = random.Random(seed)
+    names = list(names)
+    tweaks = {}
+    for n in range(count):
+        key = names[n] if n < len(names) else 'WPFTweaksSynthetic%d' % n
+        tweak = {
+            'Content': '%s %s' % (made_up_word(rng).capitalize(), key),
+            'Description': ' '.join(made_up_word(rng) for _ in range(8)),
+            'category': 'Essential Tweaks',
+            'panel': '1',
+            'registry': [{
+                'Path': 'HKLM:\\SOFTWARE\\Synthetic\\%d' % n,
+                'Name': 'Value%d' % i,
+                'Type': rng.choice(('DWord', 'String')),
+                'Value': '1',
+                'OriginalValue': rng.choice(('0', '<RemoveEntry>')),
+            } for i in range(rng.randint(1, 4))],
+        }
+        if n % 5 == 0:
+            tweak['InvokeScript'] = ['Write-Host "tweak %d"' % n]
+        tweaks[key] = tweak
+    return json.dumps(tweaks, indent=2) + '\n'
+
+
+def _reg_line(name, data, width=80):
+    """Return a .reg value line wrapped like regedit wraps long hex data."""
+    line = '%s=%s' % ('@' if name == '' else '"%s"' % name.replace('\\', '\\\\').replace('"', '\\"'), data)
+    if not data.startswith('hex') or len(line) <= width:
+        return line
+    parts, current = [], ''
+    for item in line.split(','):
+        if current and len(current) + len(item) + 2 > width - 2:
+            parts.append(current + ',\\')
+            current = '  ' + item
+        else:
+            current = current + ',' + item if current else item
+    return '\r\n'.join(parts + [current])
+
+
+def reg_export(path, writes, noise_keys, seed=0):
+    """Write a regedit-style UTF-16 export of *writes* hidden among *noise_keys* made-up keys.
+
+    *writes* is ``{key: [(name, data)]}`` with the data in .reg notation.
+    The noise keys have a mix of strings, dwords and long binary values,
+    like a CLSID tree.
+    """
+    rng = random.Random(seed)
+    keys = list(writes)
+    slots = sorted(rng.randrange(noise_keys + 1) for _ in keys)
+    with open(path, 'w', encoding='utf-16', newline='') as f:
+        f.write('Windows Registry Editor Version 5.00\r\n\r\n')
+        k = 0
+        for n in range(noise_keys + 1):
+            while k < len(keys) and slots[k] == n:
+                f.write('[%s]\r\n' % keys[k])
+                f.write(''.join(_reg_line(name, data) + '\r\n' for name, data in writes[keys[k]]))
+                f.write('\r\n')
+                k += 1
+            if n == noise_keys:
+                break
+            f.write('[HKEY_LOCAL_MACHINE\\SOFTWARE\\Classes\\CLSID\\{%08X-%04X-%04X-%012X}\\%s]\r\n' % (
+                rng.getrandbits(32), rng.getrandbits(16), rng.getrandbits(16), rng.getrandbits(48),
+                made_up_word(rng).capitalize()))
+            f.write('@="%s %s \xe9t\xe9"\r\n' % (made_up_word(rng), made_up_word(rng)))
+            f.write('"ThreadingModel"="Both"\r\n"Flags"=dword:%08x\r\n' % rng.getrandbits(32))
+            f.write(_reg_line('Data', 'hex:' + ','.join('%02x' % rng.getrandbits(8) for _ in range(rng.randint(8, 96)))))
+            f.write('\r\n\r\n')
@@ -0,0 +1,147 @@
+"""YAML emitter for the perch-gallery tweak schema.
+
+Shared by the importers so every generated tweak is quoted the same way.
+Scalars are checked with precompiled character classes and the results
+for repeated strings (hive paths, value names, type names) are memoized.
+
+Quoting follows the rules the importers always used, so regenerated files
+do not churn, and additionally quotes anything YAML would otherwise read
+back as a different value: numbers and booleans in strings, control
+characters, surrounding whitespace.
+"""
+import functools, re
+
+# Characters that have always made a value quoted
+_special = re.compile(r'[:{}\[\],"\'&#*?|\-><!%@`]')
+# Characters that need a double-quoted escape
+_unprintable = r'\x00-\x08\x0a-\x1f\x7f-\x9f\u2028\u2029\ud800-\udfff\ufeff\ufffe\uffff'
+_control = re.compile('[%s]' % _unprintable)
+_escape = re.compile(r'[\\"%s]' % _unprintable)
+_escapes = {'\\': '\\\\', '"': '\\"', '\0': '\\0', '\t': '\\t', '\n': '\\n', '\r': '\\r'}
+# Plain scalars that YAML 1.1 or 1.2 resolve to something other than a string
+_implicit = re.compile(r'''(?x)^(?:
+    ~ | = | << | null | Null | NULL
+  | y | Y | yes | Yes | YES | n | N | no | No | NO
+  | true | True | TRUE | false | False | FALSE | on | On | ON | off | Off | OFF
+  | [-+]?[0-9][0-9_]* | [-+]?0[xob][0-9a-fA-F_]+
+  | [-+]?(?:[0-9][0-9_]*)?\.[0-9_]*(?:[eE][-+]?[0-9]+)?
+  | [-+]?[0-9][0-9_]*[eE][-+]?[0-9]+
+  | [-+]?\.(?:inf|Inf|INF) | \.(?:nan|NaN|NAN)
+  | [-+]?[0-9][0-9_]*(?::[0-5]?[0-9])+(?:\.[0-9_]*)?
+  | [0-9]{4}-[0-9]{1,2}-[0-9]{1,2}(?:[Tt\ ].*)?
+)$''')
+# Plain scalars that would not parse back as the same string
+_plain_unsafe = re.compile(r'^[-?:,\[\]{}#&*!|>\'"%@`\s]|:\s|\s#|:$|\s$')
+_flow_unsafe = re.compile(r'[,\[\]{}:]')
+
+
+def _escape_char(m):
+    c = m.group()
+    if c in _escapes:
+        return _escapes[c]
+    return '\\x%02x' % ord(c) if ord(c) < 0x100 else '\\u%04x' % ord(c)
+
+
+def double_quote(s):
+    if not _escape.search(s):
+        return '"%s"' % s
+    return '"%s"' % _escape.sub(_escape_char, s)
+
+
+def single_quote(s):
+    return "'%s'" % s.replace("'", "''")
+
+
+def _format_str(v):
+    if v == '':
+        return '""'
+    if _control.search(v):
+        return double_quote(v)
+    # Use single quotes for values with backslashes to avoid YAML escape issues
+    if '\\' in v:
+        return single_quote(v)
+    if _special.search(v) or _implicit.match(v) or v != v.strip():
+        return double_quote(v)
+    return v
+
+
+@functools.lru_cache(maxsize=4096, typed=True)
+def format_value(v):
+    """Format a registry name or value as a YAML scalar."""
+    if v is None:
+        return 'null'
+    if isinstance(v, bool):
+        return 'true' if v else 'false'
+    if isinstance(v, int):
+        return str(v)
+    return _format_str(str(v))
+
+
+@functools.lru_cache(maxsize=4096)
+def format_plain(v, flow=False):
+    """Format a key, category or tag, leaving it unquoted whenever YAML allows."""
+    if (not v or _control.search(v) or _plain_unsafe.search(v) or _implicit.match(v)
+            or (flow and _flow_unsafe.search(v))):
+        return double_quote(v) if _control.search(v) else single_quote(v)
+    return v
+
+
+@functools.lru_cache(maxsize=1024)
+def _flow_list(items):
+    return '[%s]' % ', '.join(str(i) if isinstance(i, int) else format_plain(i, True) for i in items)
+
+
+def flow_list(items):
+    return _flow_list(tuple(items))
+
+
+_head = (
+    'type: tweak\n'
+    'name: %s\n'
+    'category: %s\n'
+    'tags: %s\n'
+    'description: %s\n'
+    'reversible: %s\n'
+    'profiles: %s\n'
+    'windows-versions: %s\n'
+    'source: %s\n'
+)
+_entry = (
+    '  - key: %s\n'
+    '    name: %s\n'
+    '    value: %s\n'
+    '    type: %s\n'
+    '    default-value: %s\n'
+)
+
+
+def render_tweak(tweak):
+    """Return the YAML document for a *tweak* dict.
+
+    Keys: name, category, tags, description, profiles, windows-versions,
+    source, registry (dicts with key, name, value, type, default-value) and
+    optionally reversible (default true) and note, a comment placed before
+    the registry list.
+    """
+    parts = [_head % (
+        format_value(tweak['name']),
+        format_plain(tweak['category']),
+        flow_list(tweak['tags']),
+        double_quote(tweak['description']),
+        'true' if tweak.get('reversible', True) else 'false',
+        flow_list(tweak['profiles']),
+        flow_list(tweak['windows-versions']),
+        format_plain(tweak['source']),
+    )]
+    if tweak.get('note'):
+        parts.append('# %s\n' % tweak['note'])
+    parts.append('registry:\n')
+    for entry in tweak['registry']:
+        parts.append(_entry % (
+            format_plain(entry['key']),
+            format_value(entry['name']),
+            format_value(entry['value']),
+            format_plain(entry['type']),
+            format_value(entry.get('default-value')),
+        ))
+    return ''.join(parts)
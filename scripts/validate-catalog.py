@@ -0,0 +1,33 @@
+"""Validate catalog entries against the gallery schema.
+
+Python port of validate-catalog.mjs with the same rules and messages (see
+catalog_validator). The schema and category set are compiled once and the
+entries come from catalog_loader, which parses changed files in a thread
+pool and serves the rest from its cache. Duplicate ids and entries missing
+from, or unknown to, catalog/index.yaml are reported as well.
+
+--format json prints one machine-readable report instead of the text
+listing. The exit status is 1 when there are errors.
+"""
+import argparse, os, sys, time
+
+from catalog_loader import cache_path, catalog_dir, load_catalog
+from catalog_validator import Schema, report, validate_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--format', choices=('text', 'json'), default='text', help='report format')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='reader threads')
+    parser.add_argument('--no-index', action='store_true', help='skip the catalog/index.yaml cross-check')
+    parser.add_argument('--no-cache', action='store_true', help='re-read every entry and leave the cache alone')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    catalog = load_catalog(cache=None if args.no_cache else cache_path, jobs=args.jobs)
+    issues = validate_catalog(catalog, Schema.load(), None if args.no_index else os.path.join(catalog_dir, 'index.yaml'))
+    sys.exit(1 if report(issues, catalog, time.perf_counter() - start, args.format) else 0)
+
+
+if __name__ == '__main__':
+    main()
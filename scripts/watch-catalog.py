@@ -0,0 +1,90 @@
+"""Keep catalog/index.yaml and the validation results current while editing.
+
+Loads the catalog once (through the entry cache), then waits for file
+events: inotify on Linux, polling elsewhere or with --poll. Each debounced
+batch re-parses and re-validates only the files that changed, moves their
+rows in the in-memory index and rewrites catalog/index.yaml when its text
+changed, so ``astro dev`` picks it up within milliseconds of a save (see
+catalog_watch). The output is the same as generate-index.py's; the issues
+are validate-catalog.py's, apart from the index cross-check, which holds
+by construction.
+
+Run it next to ``npm run dev``; stop it with Ctrl+C. The shards in
+build/index are left to generate-index.py.
+"""
+import argparse, os, sys, time
+
+from catalog_index import index_path
+from catalog_validator import ERROR, format_issue
+from catalog_watch import LiveCatalog, changes, open_watcher
+
+
+def write_index(text, path=index_path):
+    """Write *text* to *path* unless it already holds it; return True when written."""
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            if f.read() == text:
+                return False
+    except FileNotFoundError:
+        pass
+    # Replace in one step so the dev server never reads half a file
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    os.replace(tmp, path)
+    return True
+
+
+def totals(issues):
+    error_count = sum(1 for issue in issues if issue.level == ERROR)
+    return '%d errors, %d warnings' % (error_count, len(issues) - error_count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--poll', action='store_true', help='poll for changes instead of using inotify')
+    parser.add_argument('--interval', type=float, default=0.5, help='seconds between polls (default: %(default)s)')
+    parser.add_argument('--debounce', type=float, default=100,
+                        help='ms without events before a batch is applied (default: %(default)s)')
+    parser.add_argument('--no-index', action='store_true', help='only validate, leave catalog/index.yaml alone')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    live = LiveCatalog()
+    watcher = open_watcher(live.directory, poll=args.poll, interval=args.interval)
+    issues = live.all_issues()
+    for issue in issues:
+        print(format_issue(issue), file=sys.stderr)
+    wrote = not args.no_index and write_index(live.render_index())
+    counts = live.counts()
+    print('Watching %s (%s): %d apps, %d fonts, %d tweaks, %s%s, ready in %.0f ms' % (
+        os.path.relpath(live.directory), 'inotify' if hasattr(watcher, 'fd') else 'polling',
+        counts['apps'], counts['fonts'], counts['tweaks'], totals(issues),
+        '; rewrote index.yaml' if wrote else '', (time.perf_counter() - start) * 1000))
+    sys.stdout.flush()
+
+    try:
+        for batch in changes(watcher, args.debounce / 1000):
+            start = time.perf_counter()
+            changed, reloaded = live.update(batch)
+            if not changed and not reloaded:
+                continue
+            for relpath in changed:
+                for issue in live.file_issues(relpath):
+                    print(format_issue(issue), file=sys.stderr)
+            issues = live.all_issues()
+            wrote = not args.no_index and write_index(live.render_index())
+            print('[%s] %s%s: %s%s in %.1f ms' % (
+                time.strftime('%H:%M:%S'),
+                ', '.join(changed[:3]) + (' and %d more' % (len(changed) - 3) if len(changed) > 3 else ''),
+                '%scategories.yaml' % (', ' if changed else '') if reloaded else '',
+                totals(issues), '; rewrote index.yaml' if wrote else '', (time.perf_counter() - start) * 1000))
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""WinUtil tweak metadata and conversion shared by the importers.
+
+Turns the members of WinUtil's tweaks.json into perch-gallery tweak YAML
+through a generator pipeline, one tweak at a time.
+"""
+import re
+
+import tweak_yaml
+from instrument import count, stage, timed
+from json_stream import iter_object_items
+
+SOURCE = 'winutil'
+
+
+def slugify(name):
+    s = name.lower().strip()
+    s = re.sub(r'[^a-z0-9\s-]', '', s)
+    s = re.sub(r'[\s]+', '-', s)
+    s = re.sub(r'-+', '-', s)
+    return s.strip('-')
+
+
+def convert_path(p):
+    return p.replace(':\\', '\\')
+
+
+def convert_type(t):
+    return t.lower()
+
+
+def convert_value(v, typ):
+    if v == '<RemoveEntry>':
+        return None
+    if typ.lower() == 'dword':
+        try:
+            return int(v)
+        except (ValueError, TypeError):
+            return v
+    return v
+
+
+# (category, tags, profiles, windows-versions)
+tweak_meta = {
+    # WPFToggle* keys (preference toggles)
+    'WPFToggleNumLock': ('Input/Keyboard', ['keyboard', 'numlock', 'startup'], ['power-user'], [10, 11]),
+    'WPFToggleVerboseLogon': ('System/Diagnostics', ['diagnostics', 'logon', 'verbose'], ['developer'], [10, 11]),
+    'WPFToggleStartMenuRecommendations': ('Search/Start Menu', ['start-menu', 'recommendations', 'declutter'], ['power-user'], [11]),
+    'WPFToggleHideSettingsHome': ('System/Settings', ['settings', 'home-page', 'declutter'], ['power-user'], [11]),
+    'WPFToggleMultiplaneOverlay': ('System/Graphics', ['graphics', 'multiplane-overlay', 'performance'], ['power-user'], [10, 11]),
+    'WPFToggleNewOutlook': ('System/Settings', ['outlook', 'microsoft', 'mail'], ['power-user'], [11]),
+    'WPFToggleS3Sleep': ('Power/Sleep', ['power', 'sleep', 's3', 'standby'], ['power-user'], [10, 11]),
+    'WPFToggleTaskbarSearch': ('Taskbar/Declutter', ['taskbar', 'search', 'declutter'], ['power-user'], [10, 11]),
+    'WPFToggleTaskView': ('Taskbar/Declutter', ['taskbar', 'task-view', 'declutter'], ['power-user'], [10, 11]),
+    'WPFToggleDetailedBSoD': ('System/Diagnostics', ['bsod', 'diagnostics', 'crash'], ['developer'], [10, 11]),
+    'WPFToggleDisableCrossDeviceResume': ('Privacy/Sync', ['privacy', 'cross-device', 'sync', 'resume'], ['power-user'], [11]),
+    # WPFTweaks* keys (essential/advanced tweaks)
+    'WPFTweaksActivity': ('Privacy/Tracking', ['privacy', 'activity-history', 'telemetry'], ['power-user'], [10, 11]),
+    'WPFTweaksBraveDebloat': ('Browsers/Debloat', ['brave', 'browser', 'debloat'], ['power-user'], [10, 11]),
+    'WPFTweaksConsumerFeatures': ('Privacy/Advertising', ['privacy', 'consumer-features', 'suggestions'], ['power-user'], [10, 11]),
+    'WPFTweaksDisableBGapps': ('Performance/Background', ['performance', 'background-apps', 'resources'], ['power-user'], [10, 11]),
+    'WPFTweaksDisableFSO': ('Performance/Gaming', ['gaming', 'fullscreen', 'performance'], ['power-user'], [10, 11]),
+    'WPFTweaksDisableNotifications': ('Taskbar/Declutter', ['taskbar', 'notifications', 'calendar', 'declutter'], ['power-user'], [10, 11]),
+    'WPFTweaksEdgeDebloat': ('Browsers/Debloat', ['edge', 'browser', 'debloat', 'microsoft'], ['power-user'], [10, 11]),
+    'WPFTweaksEndTaskOnTaskbar': ('Taskbar/Productivity', ['taskbar', 'end-task', 'right-click'], ['developer', 'power-user'], [11]),
+    'WPFTweaksIPv46': ('Networking/Protocol', ['networking', 'ipv4', 'ipv6'], ['power-user'], [10, 11]),
+    'WPFTweaksLocation': ('Privacy/Tracking', ['privacy', 'location', 'tracking'], ['power-user'], [10, 11]),
+    'WPFTweaksStorage': ('System/Storage', ['storage', 'storage-sense', 'cleanup'], ['power-user'], [10, 11]),
+    'WPFTweaksUTC': ('System/Clock', ['clock', 'utc', 'dual-boot', 'linux'], ['developer'], [10, 11]),
+    'WPFTweaksWPBT': ('Security/Firmware', ['security', 'firmware', 'wpbt'], ['power-user'], [10, 11]),
+    'WPFTweaksHiber': ('Power/Hibernation', ['power', 'hibernation', 'disk-space'], ['power-user'], [10, 11]),
+    'WPFTweaksTelemetry': ('Privacy/Telemetry', ['privacy', 'telemetry', 'microsoft'], ['power-user'], [10, 11]),
+    'WPFTweaksRestorePoint': ('System/Backup', ['backup', 'restore-point', 'system-protection'], ['power-user'], [10, 11]),
+    'WPFTweaksDisplay': ('Performance/Visual', ['performance', 'visual-effects', 'animations'], ['power-user'], [10, 11]),
+    'WPFTweaksRazerBlock': ('System/Bloatware', ['razer', 'bloatware', 'driver'], ['power-user'], [10, 11]),
+    'WPFTweaksDisableIPv6': ('Networking/Protocol', ['networking', 'ipv6', 'disable'], ['power-user'], [10, 11]),
+    'WPFTweaksTeredo': ('Networking/Protocol', ['networking', 'teredo', 'ipv6', 'tunnel'], ['power-user'], [10, 11]),
+}
+
+def read_tweaks(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from iter_object_items(f, strict=False)
+
+
+def importable(tweaks):
+    """Keep the tweaks with registry entries and a tweak_meta entry, uncounted."""
+    for key, tweak in tweaks:
+        if 'registry' in tweak and key in tweak_meta:
+            yield key, tweak
+
+
+def without_existing(tweaks, index):
+    """Drop tweaks the dedup *index* finds in the catalog under another source."""
+    for key, tweak in tweaks:
+        registry = [(entry.get('Path', ''), entry.get('Name', '')) for entry in tweak.get('registry') or ()]
+        with stage('dedup'):
+            found = index.find(tweak.get('Content', '').strip(), registry, source=SOURCE)
+        if found:
+            count('duplicates')
+            continue
+        yield key, tweak
+
+
+def with_meta(tweaks):
+    for key, tweak in tweaks:
+        if 'registry' not in tweak:
+            count('without-registry')
+            continue
+        with stage('meta'):
+            meta = tweak_meta.get(key)
+        if not meta:
+            count('without-meta')
+            continue
+        yield key, tweak, meta
+
+
+def render_one(tweak, meta):
+    """Return ``(relpath, text)`` for one WinUtil tweak and its tweak_meta entry."""
+    category, tags, profiles, versions = meta
+    name = tweak['Content'].strip()
+    registry = []
+    for entry in tweak['registry']:
+        typ = entry.get('Type', 'DWord')
+        registry.append({
+            'key': convert_path(entry['Path']),
+            'name': entry.get('Name', ''),
+            'value': convert_value(entry.get('Value', ''), typ),
+            'type': convert_type(entry.get('Type', 'dword')),
+            'default-value': convert_value(entry.get('OriginalValue', ''), typ),
+        })
+    text = tweak_yaml.render_tweak({
+        'name': name,
+        'category': category,
+        'tags': tags,
+        'description': tweak.get('Description', name),
+        'profiles': profiles,
+        'windows-versions': versions,
+        'source': SOURCE,
+        'note': ('NOTE: WinUtil also has InvokeScript/UndoScript for this tweak (not imported)'
+                 if 'InvokeScript' in tweak else None),
+        'registry': registry,
+    })
+    return slugify(name) + '.yaml', text
+
+
+def render(tweaks):
+    for key, tweak, meta in tweaks:
+        with stage('render'):
+            rendered = render_one(tweak, meta)
+        yield rendered
+
+
+def iter_tweaks(path, index, tweaks=None):
+    """Yield ``(relpath, text)`` for every importable tweak in the export at *path*.
+
+    *relpath* is relative to catalog/tweaks. Pass *tweaks* to use
+    ``(key, tweak)`` pairs already read from it.
+    """
+    if tweaks is None:
+        tweaks = timed(read_tweaks(path), 'read')
+    return render(with_meta(without_existing(tweaks, index)))